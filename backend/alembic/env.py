@@ -11,8 +11,8 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 
 from alembic import context
-from env import SQL_DATABASE, SQL_HOST, SQL_PASSWORD, SQL_PORT, SQL_USER
-from models import metadata
+from gomoku.env import SQL_DATABASE, SQL_HOST, SQL_PASSWORD, SQL_PORT, SQL_USER
+from gomoku.sql.models import metadata
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,45 @@
+"""add player_games
+
+Revision ID: 8b2e4c6d1a57
+Revises: 3f1c2a7d9b10
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8b2e4c6d1a57"
+down_revision: Union[str, Sequence[str], None] = "3f1c2a7d9b10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "player_games",
+        sa.Column("player_id", sa.String(length=64), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=False),
+        sa.Column("game_id", sa.String(length=36), nullable=False),
+        sa.Column("opponent_id", sa.String(length=64), nullable=False),
+        sa.Column("color", sa.String(length=5), nullable=False),
+        sa.Column("result", sa.String(length=4), nullable=False),
+        sa.Column("reason", sa.String(length=8), nullable=False),
+        sa.Column("moves", sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint(
+            "player_id",
+            "finished_at",
+            "game_id",
+            name="pk_player_games",
+            postgresql_include=["opponent_id", "color", "result", "reason", "moves"],
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("player_games")
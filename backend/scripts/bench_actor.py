@@ -0,0 +1,141 @@
+"""对比耗时计算放在事件循环上和经由对局 actor 放到执行器中时，其他对局的延迟
+
+一局“重”对局每步之后做一次耗时的局面分析，其余对局正常落子。
+报告其余对局的落子延迟和事件循环延迟分位数。
+
+用法: python scripts/bench_actor.py [--games 200] [--duration 5] [--work-ms 200]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+
+sys.path.insert(0, str(SRC_DIR))
+# gomoku 的日志文件路径相对于 src 目录
+os.chdir(SRC_DIR)
+(ROOT_DIR / "logs").mkdir(exist_ok=True)
+
+BOARD_SIZE = 15
+
+
+def analyse(board: list[list[str]], work_ms: float) -> int:
+    """模拟耗时的局面分析，纯 Python 计算约 work_ms 毫秒"""
+    deadline = time.perf_counter() + work_ms / 1000
+    count = 0
+    while time.perf_counter() < deadline:
+        for row in board:
+            count += row.count("empty")
+    return count
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+
+def setup_games(state, games: int) -> list[tuple[str, str, str]]:
+    """创建若干局已开始的游戏，返回 (游戏 ID, 黑方, 白方) 列表"""
+    result = []
+    for i in range(games):
+        black, white = f"black-{i}", f"white-{i}"
+        room_id = state.create_room(black)
+        state.join_room(white, room_id)
+        state.set_ready(white, True)
+        game_id = state.start_game(black)
+        result.append((game_id, black, white))
+    return result
+
+
+async def play(state, game: tuple[str, str, str], stop: float, latencies: list[float]):
+    """轮流落子直到时间结束，棋盘下满后停止"""
+    _, black, white = game
+    cells = [(x, y) for y in range(BOARD_SIZE) for x in range(BOARD_SIZE)]
+    # 按行交错落子，避免过早连成五子
+    cells = cells[::2] + cells[1::2]
+    for i, (x, y) in enumerate(cells):
+        if time.perf_counter() >= stop:
+            return
+        start = time.perf_counter()
+        if not await state.submit_move(black if i % 2 == 0 else white, x, y):
+            return
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def heavy(state, game_id: str, mode: str, work_ms: float, stop: float) -> int:
+    """重对局持续进行局面分析，返回完成的次数"""
+    board = state._game_state[game_id].data.board
+    count = 0
+    while time.perf_counter() < stop:
+        if mode == "inline":
+            analyse(board, work_ms)
+        else:
+            await state.run_in_game(game_id, analyse, board, work_ms)
+        count += 1
+        await asyncio.sleep(0)
+    return count
+
+
+async def measure_lag(stop: float, samples: list[float], interval: float = 0.005):
+    loop = asyncio.get_running_loop()
+    while time.perf_counter() < stop:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(loop.time() - expected, 0.0))
+
+
+async def run(
+    mode: str, games: int, duration: float, work_ms: float, executor: Executor | None
+):
+    from gomoku.state.server_state import ServerState
+
+    state = ServerState()
+    state.executor = executor
+    all_games = setup_games(state, games + 1)
+    heavy_game, light_games = all_games[0], all_games[1:]
+
+    stop = time.perf_counter() + duration
+    latencies: list[float] = []
+    lags: list[float] = []
+    results = await asyncio.gather(
+        heavy(state, heavy_game[0], mode, work_ms, stop),
+        measure_lag(stop, lags),
+        *(play(state, game, stop, latencies) for game in light_games),
+    )
+    ms = [x * 1000 for x in latencies]
+    lag_ms = [x * 1000 for x in lags]
+    print(
+        f"{mode:8s} analyses={results[0]:4d} moves={len(ms):6d} "
+        f"move ms p50={statistics.median(ms) if ms else 0:7.2f} "
+        f"p99={percentile(ms, 0.99):7.2f} max={max(ms, default=0):7.2f} | "
+        f"loop lag ms p50={statistics.median(lag_ms) if lag_ms else 0:7.2f} "
+        f"p99={percentile(lag_ms, 0.99):7.2f} max={max(lag_ms, default=0):7.2f}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--work-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    await run("inline", args.games, args.duration, args.work_ms, None)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        await run("thread", args.games, args.duration, args.work_ms, executor)
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        await run("process", args.games, args.duration, args.work_ms, executor)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
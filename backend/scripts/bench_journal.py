@@ -0,0 +1,78 @@
+"""对比开启与关闭状态变更日志时的落子吞吐量
+
+用法: python scripts/bench_journal.py [--games 2000] [--moves 100]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+
+sys.path.insert(0, str(SRC_DIR))
+# gomoku 的日志文件路径相对于 src 目录
+os.chdir(SRC_DIR)
+(ROOT_DIR / "logs").mkdir(exist_ok=True)
+
+
+def setup_games(state, games: int) -> list[tuple[str, str]]:
+    """创建若干局已开始的游戏，返回 (黑方, 白方) 列表"""
+    pairs = []
+    for i in range(games):
+        black, white = f"black-{i}", f"white-{i}"
+        room_id = state.create_room(black)
+        state.join_room(white, room_id)
+        state.set_ready(white, True)
+        state.start_game(black)
+        pairs.append((black, white))
+    return pairs
+
+
+async def run(journal_dir: Path | None, games: int, moves: int) -> float:
+    from gomoku.state.journal import Journal
+    from gomoku.state.server_state import ServerState
+
+    state = ServerState()
+    if journal_dir is not None:
+        state.journal = Journal(journal_dir, 0)
+    pairs = setup_games(state, games)
+    if state.journal is not None:
+        await state.journal.flush()
+
+    cells = [(x, y) for y in range(15) for x in range(15)][:moves]
+    start = time.perf_counter()
+    total = 0
+    for i, (x, y) in enumerate(cells):
+        for black, white in pairs:
+            state.make_move(black if i % 2 == 0 else white, x, y)
+            total += 1
+        # 模拟请求之间让出事件循环
+        await asyncio.sleep(0)
+    if state.journal is not None:
+        await state.journal.flush()
+    elapsed = time.perf_counter() - start
+    if state.journal is not None:
+        await state.journal.close()
+    return total / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--moves", type=int, default=100)
+    args = parser.parse_args()
+
+    off = await run(None, args.games, args.moves)
+    with tempfile.TemporaryDirectory() as tmp:
+        on = await run(Path(tmp), args.games, args.moves)
+    print(f"journal off: {off:12,.0f} moves/s")
+    print(f"journal on:  {on:12,.0f} moves/s ({on / off:.0%} of off)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
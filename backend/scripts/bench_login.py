@@ -0,0 +1,122 @@
+"""登录高峰时的吞吐量和事件循环延迟
+
+模拟一批并发登录，其中一部分是未知用户（直接拒绝，不计算哈希）。
+分别在事件循环上直接校验密码和经由有界线程池校验，
+报告完成的登录数、被拒绝的登录数、登录延迟和事件循环延迟分位数。
+不访问数据库，用户表用内存中的字典代替。
+
+用法: python scripts/bench_login.py [--logins 200] [--unknown 0.3] [--workers 2]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+
+sys.path.insert(0, str(SRC_DIR))
+# gomoku 的日志文件路径相对于 src 目录
+os.chdir(SRC_DIR)
+(ROOT_DIR / "logs").mkdir(exist_ok=True)
+
+PASSWORD = "correct horse battery staple"
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+
+async def measure_lag(stop: asyncio.Event, samples: list[float], interval=0.005):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(loop.time() - expected, 0.0))
+
+
+async def run(
+    mode: str, users: dict[str, str], names: list[str], workers: int, max_pending: int
+):
+    from gomoku.passwords import PasswordHasher, PasswordHasherBusy, verify_password
+
+    hasher = PasswordHasher(workers=workers, max_pending=max_pending)
+    latencies: list[float] = []
+    lags: list[float] = []
+    outcome = {"ok": 0, "unknown": 0, "busy": 0}
+
+    async def login(name: str):
+        start = time.perf_counter()
+        # 模拟数据库查询
+        await asyncio.sleep(0.001)
+        encoded = users.get(name)
+        if encoded is None:
+            outcome["unknown"] += 1
+            return
+        try:
+            if mode == "inline":
+                valid = verify_password(PASSWORD, encoded)
+            else:
+                valid = await hasher.verify(PASSWORD, encoded)
+        except PasswordHasherBusy:
+            outcome["busy"] += 1
+            return
+        assert valid
+        outcome["ok"] += 1
+        latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_lag(stop, lags))
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await asyncio.gather(*(login(name) for name in names))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await lag_task
+    hasher.close()
+
+    ms = [x * 1000 for x in latencies]
+    lag_ms = [x * 1000 for x in lags]
+    print(
+        f"{mode:8s} ok={outcome['ok']:4d} unknown={outcome['unknown']:4d} "
+        f"busy={outcome['busy']:4d} logins/s={outcome['ok'] / elapsed:7.1f} "
+        f"login ms p50={statistics.median(ms) if ms else 0:8.1f} "
+        f"p99={percentile(ms, 0.99):8.1f} | "
+        f"loop lag ms p50={statistics.median(lag_ms) if lag_ms else 0:7.2f} "
+        f"p99={percentile(lag_ms, 0.99):7.2f} max={max(lag_ms, default=0):7.2f}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--unknown", type=float, default=0.3)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=32)
+    args = parser.parse_args()
+
+    from gomoku.passwords import hash_password
+
+    encoded = hash_password(PASSWORD)
+    users = {f"user-{i}": encoded for i in range(args.logins)}
+    names = [
+        f"unknown-{i}" if random.random() < args.unknown else f"user-{i}"
+        for i in range(args.logins)
+    ]
+
+    await run("inline", users, names, args.workers, args.max_pending)
+    # 不限制排队数，所有登录都会完成
+    await run("pool", users, names, args.workers, args.logins)
+    await run("bounded", users, names, args.workers, args.max_pending)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+"""从对局记录生成开局库
+
+对局记录为 JSON 行，每行一局：
+    {"moves": [112, 113, ...], "winner": "black" | "white" | null}
+moves 为落子顺序（黑先），每步为 y * 15 + x，与对局历史接口的格式相同。
+"-" 表示从标准输入读取。也可以用 --database 直接读取数据库中的对局历史。
+
+只统计每局的前 --max-ply 步，局数少于 --min-games 的走法不写入。
+开局库先写入临时文件再替换，运行中的服务器重启后使用新的开局库。
+
+用法:
+    python scripts/build_opening_book.py games.jsonl --max-ply 12 --min-games 3
+    python scripts/build_opening_book.py --database
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, TextIO
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+
+sys.path.insert(0, str(SRC_DIR))
+# 命令行中的相对路径相对于启动时的目录
+START_DIR = Path.cwd()
+# gomoku 的日志文件路径相对于 src 目录
+os.chdir(SRC_DIR)
+(ROOT_DIR / "logs").mkdir(exist_ok=True)
+
+# 黑方记录中的结果 -> 胜方
+WINNERS = {
+    "win": "black",
+    "loss": "white",
+    "draw": None,
+}
+
+
+def read_records(f: TextIO) -> Iterator[tuple[list[int], str | None]]:
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            yield list(record["moves"]), record.get("winner")
+        except (ValueError, KeyError, TypeError):
+            print(f"skipping malformed record on line {line_number}", file=sys.stderr)
+
+
+async def read_database(batch: int = 1000):
+    """按黑方的记录读取每局一次，流式读取，不把整张表读入内存"""
+    from sqlalchemy import select
+
+    from gomoku.sql.database import readonly_engine
+    from gomoku.sql.models import player_games_table
+
+    columns = player_games_table.c
+    stmt = select(columns.moves, columns.result).where(columns.color == "black")
+    async with readonly_engine.connect() as conn:
+        result = await conn.stream(stmt.execution_options(yield_per=batch))
+        async for row in result:
+            yield list(row.moves), WINNERS[row.result]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("inputs", nargs="*", help="JSON 行文件，- 为标准输入")
+    parser.add_argument("--database", action="store_true", help="读取对局历史表")
+    parser.add_argument("--output", help="默认为 OPENING_BOOK_PATH")
+    parser.add_argument("--max-ply", type=int, default=12)
+    parser.add_argument("--min-games", type=int, default=2)
+    args = parser.parse_args()
+    if not args.inputs and not args.database:
+        parser.error("no game records given")
+
+    from gomoku.engine.book import (
+        BookBuilder,
+        OpeningBook,
+        board_from_moves,
+        write_book,
+    )
+    from gomoku.env import OPENING_BOOK_PATH
+
+    output = START_DIR / args.output if args.output else SRC_DIR / OPENING_BOOK_PATH
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    builder = BookBuilder(args.max_ply)
+    skipped = 0
+    start = time.perf_counter()
+
+    def add(moves: list[int], winner: str | None):
+        nonlocal skipped
+        if board_from_moves(moves) is None:
+            skipped += 1
+            return
+        builder.add_game(moves, winner)
+
+    for name in args.inputs:
+        if name == "-":
+            for moves, winner in read_records(sys.stdin):
+                add(moves, winner)
+            continue
+        with open(START_DIR / name, encoding="utf-8") as f:
+            for moves, winner in read_records(f):
+                add(moves, winner)
+    if args.database:
+        async for moves, winner in read_database():
+            add(moves, winner)
+
+    records = write_book(output, builder.entries(args.min_games))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{builder.games} games ({skipped} skipped) -> {records} records, "
+        f"{output.stat().st_size / 2**20:.1f} MiB in {elapsed:.2f}s: {output}"
+    )
+
+    # 打开开局库的耗时与大小无关，查询为二分查找
+    t0 = time.perf_counter()
+    book = OpeningBook(output)
+    opened = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    root_moves = book.lookup(bytes(225))
+    looked_up = time.perf_counter() - t0
+    print(
+        f"open {opened * 1000:.2f}ms, empty-board lookup {looked_up * 1e6:.0f}us, "
+        f"{len(root_moves)} book moves"
+    )
+    book.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,241 @@
+"""把录制的流量重放到一个新的服务器上，用于在相同负载下比较不同版本的延迟和内存
+
+录制：以 TRAFFIC_CAPTURE_PATH=<文件> 启动服务器，停机时录制文件写入完毕。
+
+重放目标：
+- 默认在进程内新建 ServerState 直接调用。不运行匹配循环，按录制的结果配对，
+  房间 ID 由固定的种子分配，重放结果完全确定。
+- --url 连接本地运行的服务器，调用对应的 HTTP 接口，匹配由服务器自己完成。
+  服务器需要使用与本工具相同的 JWT_SECRET；设置 ROOM_ID_SEED 可以让房间 ID 确定。
+  加速重放时，同一玩家的请求可能触发服务器的限流。
+
+--speed 为重放速度的倍数，0 表示不等待，尽快重放。
+报告与录制结果不一致的调用数、每种调用的延迟分位数、落后于计划的时间和内存。
+
+用法:
+    python scripts/replay_traffic.py capture.bin --speed 10
+    python scripts/replay_traffic.py capture.bin --url http://127.0.0.1:8000 --speed 1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Protocol
+from urllib.parse import urlencode
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+
+sys.path.insert(0, str(SRC_DIR))
+# 命令行中的相对路径相对于启动时的目录
+START_DIR = Path.cwd()
+# gomoku 的日志文件路径相对于 src 目录
+os.chdir(SRC_DIR)
+(ROOT_DIR / "logs").mkdir(exist_ok=True)
+
+from soak_test import HttpTransport, percentile, read_rss  # noqa: E402
+
+# 调用名 -> 接口路径，match_players 由服务器自己完成，不发送
+HTTP_PATHS = {
+    "create_room": "/api/room/create-room",
+    "join_room": "/api/room/join-room",
+    "leave_room": "/api/room/leave-room",
+    "set_ready": "/api/room/set-ready",
+    "kick_player": "/api/room/kick-player",
+    "start_game": "/api/room/start-game",
+    "make_move": "/api/game/make-move",
+    "join_matchmaking": "/api/matchmaking/join",
+    "leave_matchmaking": "/api/matchmaking/leave",
+}
+
+
+class Clock(Protocol):
+    def start(self): ...
+
+    async def wait_until(self, t: float) -> float:
+        """等待到录制时间 t 对应的时刻，返回已经落后于计划的秒数"""
+        ...
+
+
+class ScaledClock:
+    """按录制时间的 1/speed 等待"""
+
+    def __init__(self, speed: float):
+        self.speed = speed
+        self._start = 0.0
+
+    def start(self):
+        self._start = time.perf_counter()
+
+    async def wait_until(self, t: float) -> float:
+        delay = self._start + t / self.speed - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+            return 0.0
+        return -delay
+
+
+class ImmediateClock:
+    """不等待，尽快重放"""
+
+    def start(self):
+        pass
+
+    async def wait_until(self, t: float) -> float:
+        # 仍然让出事件循环，以便测量循环延迟
+        await asyncio.sleep(0)
+        return 0.0
+
+
+class StateTarget:
+    """在进程内的新 ServerState 上重放"""
+
+    def __init__(self, seed: int):
+        from gomoku.state.room_id_manager import room_id_manager
+        from gomoku.state.server_state import ServerState
+
+        room_id_manager.reseed(seed)
+        self.state = ServerState()
+        # 匹配结果来自录制，不运行匹配循环
+        self.state._matchmaking_task.cancel()
+        self.room_ids: dict[str, str] = {}
+
+    async def apply(self, record) -> bool:
+        from gomoku.state.traffic import apply_record
+
+        return apply_record(self.state, record, self.room_ids)
+
+    def rss(self) -> int:
+        return read_rss()
+
+
+class HttpTarget:
+    """通过 HTTP 接口在运行中的服务器上重放"""
+
+    def __init__(self, url: str, server_pid: int | None):
+        self.transport = HttpTransport(url)
+        self.server_pid = server_pid
+        self.room_ids: dict[str, str] = {}
+        self.tokens: dict[str, str] = {}
+        self.ips: dict[str, str] = {}
+
+    def _client(self, player: str) -> tuple[str, str]:
+        """每个录制的玩家使用独立的令牌和地址"""
+        from gomoku.jwt import create_token
+
+        if player not in self.tokens:
+            n = len(self.tokens) + 1
+            self.tokens[player] = create_token(f"replay-{player}")
+            self.ips[player] = f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+        return self.tokens[player], self.ips[player]
+
+    async def apply(self, record) -> bool:
+        if record.op == "match_players":
+            return record.success
+        args = record.args
+        path = HTTP_PATHS[record.op]
+        body: dict = {}
+        if record.op == "join_room":
+            if args[1] not in self.room_ids:
+                return False
+            body = {"roomId": self.room_ids[args[1]]}
+        elif record.op == "set_ready":
+            body = {"isReady": args[1]}
+        elif record.op == "kick_player":
+            path += "?" + urlencode({"kicked_player_id": f"replay-{args[1]}"})
+        elif record.op == "make_move":
+            body = {"x": args[1], "y": args[2]}
+        token, ip = self._client(args[0])
+        status, data = await self.transport.request(
+            "POST", path, ip, token=token, body=body
+        )
+        if status != 200:
+            return False
+        response = json.loads(data)
+        if record.op == "create_room" and record.room_id:
+            self.room_ids[record.room_id] = response["roomId"]
+        return response.get("success", True)
+
+    def rss(self) -> int:
+        return read_rss(self.server_pid) if self.server_pid else 0
+
+
+async def measure_lag(stop: asyncio.Event, samples: list[float], interval=0.005):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(loop.time() - expected, 0.0))
+
+
+async def replay(capture: Path, target, clock: Clock):
+    from gomoku.state.traffic import read_capture
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    mismatches: Counter[str] = Counter()
+    behind: list[float] = []
+    lags: list[float] = []
+    rss_before = target.rss()
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_lag(stop, lags))
+    clock.start()
+    start = time.perf_counter()
+    count = 0
+    for record in read_capture(capture):
+        behind.append(await clock.wait_until(record.time))
+        t0 = time.perf_counter()
+        success = await target.apply(record)
+        latencies[record.op].append(time.perf_counter() - t0)
+        if success != record.success:
+            mismatches[record.op] += 1
+        count += 1
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await lag_task
+
+    print(f"replayed {count} calls in {elapsed:.2f}s ({count / elapsed:.0f}/s)")
+    print(f"mismatched results: {sum(mismatches.values())} {dict(mismatches)}")
+    for op, samples in sorted(latencies.items()):
+        ms = [x * 1000 for x in samples]
+        print(
+            f"  {op:18s} n={len(ms):7d} ms p50={statistics.median(ms):8.3f} "
+            f"p99={percentile(sorted(ms), 0.99):8.3f} max={max(ms):8.3f}"
+        )
+    lag_ms = sorted(x * 1000 for x in lags)
+    print(
+        f"behind schedule ms max={max(behind, default=0) * 1000:.1f} | "
+        f"loop lag ms p50={percentile(lag_ms, 0.5):.2f} "
+        f"p99={percentile(lag_ms, 0.99):.2f}"
+    )
+    rss_after = target.rss()
+    if rss_after:
+        print(
+            f"rss MiB before={rss_before / 2**20:.1f} after={rss_after / 2**20:.1f}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("capture", type=Path)
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0, help="进程内重放的房间 ID 种子")
+    parser.add_argument("--url", help="连接运行中的服务器，而不是进程内重放")
+    parser.add_argument("--server-pid", type=int, help="读取该进程的内存")
+    args = parser.parse_args()
+
+    clock = ImmediateClock() if args.speed <= 0 else ScaledClock(args.speed)
+    if args.url:
+        target = HttpTarget(args.url, args.server_pid)
+    else:
+        target = StateTarget(args.seed)
+    await replay(START_DIR / args.capture, target, clock)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,448 @@
+"""SSE 连接规模压测
+
+在进程内直接调用 ASGI 应用，或者连接本地运行的 uvicorn，模拟：
+- 若干对玩家匿名登录、建房、加入、准备、开始游戏并持续落子
+- 大量观战者匿名登录后保持 /api/sse/game 长连接
+
+定期报告每连接内存、事件循环延迟、落子到推送的端到端延迟分位数和错误率。
+
+用法:
+    python scripts/soak_test.py --readers 10000 --games 100 --duration 300
+    python scripts/soak_test.py --url http://127.0.0.1:8000 --server-pid 1234
+
+连接 uvicorn 时，每个模拟客户端会带上不同的 X-Forwarded-For，
+需要以 --proxy-headers --forwarded-allow-ips='*' 启动 uvicorn，否则会触发按 IP 限流。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable
+from urllib.parse import urlencode, urlsplit
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+SRC_DIR = ROOT_DIR / "src"
+
+BOARD_SIZE = 15
+# 保留的端到端延迟样本数
+LATENCY_SAMPLES = 100_000
+
+FrameCallback = Callable[[dict], None]
+
+
+def read_rss(pid: int | None = None) -> int:
+    """读取进程的常驻内存，单位字节"""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+class SSEParser:
+    """把字节流切分为 SSE 帧，忽略注释（心跳）"""
+
+    def __init__(self, on_frame: FrameCallback):
+        self.buffer = b""
+        self.on_frame = on_frame
+
+    def feed(self, data: bytes):
+        self.buffer += data
+        *frames, self.buffer = self.buffer.split(b"\n\n")
+        for frame in frames:
+            for line in frame.split(b"\n"):
+                if line.startswith(b"data: "):
+                    self.on_frame(json.loads(line[6:]))
+
+
+class AsgiTransport:
+    """在进程内直接调用 ASGI 应用"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _scope(self, method: str, path: str, params: dict, headers: list, ip: str):
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(params).encode(),
+            "headers": headers,
+            "client": (ip, 50000),
+            "server": ("soak", 80),
+            "root_path": "",
+        }
+
+    async def request(
+        self, method: str, path: str, ip: str, token=None, body=None
+    ) -> tuple[int, bytes]:
+        headers = [(b"content-type", b"application/json")]
+        if token is not None:
+            headers.append((b"authorization", f"Bearer {token}".encode()))
+        payload = json.dumps(body or {}).encode()
+        sent = False
+        status = 0
+        chunks = []
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": payload, "more_body": False}
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            else:
+                chunks.append(message.get("body", b""))
+
+        await self.app(self._scope(method, path, {}, headers, ip), receive, send)
+        return status, b"".join(chunks)
+
+    async def stream(
+        self, path: str, params: dict, ip: str, on_frame: FrameCallback
+    ) -> int:
+        """打开 SSE 流并一直读取，直到被取消；返回非 200 的状态码"""
+        parser = SSEParser(on_frame)
+        started: asyncio.Future[int] = asyncio.get_running_loop().create_future()
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                started.set_result(message["status"])
+            else:
+                parser.feed(message.get("body", b""))
+
+        task = asyncio.create_task(
+            self.app(self._scope("GET", path, params, [], ip), receive, send)
+        )
+        try:
+            status = await started
+            if status != 200:
+                return status
+            await task
+            return status
+        finally:
+            disconnected.set()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+class HttpTransport:
+    """通过最简单的 HTTP/1.1 客户端连接 uvicorn，每个请求一个连接"""
+
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+
+    async def _open(self, method: str, path: str, ip: str, headers: dict, body=b""):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}"]
+        headers = {**headers, "X-Forwarded-For": ip, "Content-Length": len(body)}
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        status_line = await reader.readline()
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            key, _, value = line.decode().partition(":")
+            response_headers[key.strip().lower()] = value.strip()
+        return reader, writer, status, response_headers
+
+    async def _read_body(self, reader, headers, on_data: Callable[[bytes], None]):
+        if headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await reader.readline()).strip(), 16)
+                if size == 0:
+                    return
+                on_data(await reader.readexactly(size))
+                await reader.readexactly(2)
+        else:
+            on_data(await reader.readexactly(int(headers.get("content-length", 0))))
+
+    async def request(
+        self, method: str, path: str, ip: str, token=None, body=None
+    ) -> tuple[int, bytes]:
+        headers = {"Content-Type": "application/json", "Connection": "close"}
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = json.dumps(body or {}).encode()
+        reader, writer, status, response_headers = await self._open(
+            method, path, ip, headers, payload
+        )
+        chunks: list[bytes] = []
+        try:
+            await self._read_body(reader, response_headers, chunks.append)
+        finally:
+            writer.close()
+        return status, b"".join(chunks)
+
+    async def stream(
+        self, path: str, params: dict, ip: str, on_frame: FrameCallback
+    ) -> int:
+        parser = SSEParser(on_frame)
+        reader, writer, status, headers = await self._open(
+            "GET", f"{path}?{urlencode(params)}", ip, {"Accept": "text/event-stream"}
+        )
+        try:
+            if status == 200:
+                await self._read_body(reader, headers, parser.feed)
+            return status
+        finally:
+            writer.close()
+
+
+class Soak:
+    def __init__(self, transport, args):
+        self.transport = transport
+        self.args = args
+        self.errors: Counter[str] = Counter()
+        self.requests: Counter[str] = Counter()
+        self.games: list[str] = []
+        self.games_ready = asyncio.Event()
+        # (game_id, x, y) -> 发出落子请求的时间
+        self.move_sent_at: dict[tuple[str, int, int], float] = {}
+        self.latencies: list[float] = []
+        self.deliveries = 0
+        self.lag_samples: list[float] = []
+        self.open_streams = 0
+        self.stream_errors = 0
+        self.moves = 0
+        self._ip_counter = 0
+
+    def next_ip(self) -> str:
+        """为每个模拟客户端分配一个不同的地址"""
+        self._ip_counter += 1
+        n = self._ip_counter
+        return f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+
+    async def call(self, name: str, path: str, ip: str, token=None, body=None):
+        self.requests[name] += 1
+        try:
+            status, data = await self.transport.request(
+                "POST", path, ip, token=token, body=body
+            )
+        except Exception:
+            self.errors[name] += 1
+            return None
+        if status != 200:
+            self.errors[name] += 1
+            return None
+        return json.loads(data)
+
+    async def login(self, ip: str) -> str | None:
+        data = await self.call("login", "/api/auth/login-anonymous", ip)
+        return data["accessToken"] if data else None
+
+    async def play_games(self):
+        """持续保持 --games 局游戏在进行"""
+        await asyncio.gather(*(self.play_forever(i) for i in range(self.args.games)))
+
+    async def play_forever(self, index: int):
+        while True:
+            await self.play_one_game()
+            await asyncio.sleep(1)
+
+    async def play_one_game(self):
+        ip = self.next_ip()
+        black, white = await self.login(ip), await self.login(ip)
+        if black is None or white is None:
+            return
+        room = await self.call("create_room", "/api/room/create-room", ip, black)
+        if not room or not room["success"]:
+            return
+        room_id = room["roomId"]
+        await self.call(
+            "join_room", "/api/room/join-room", ip, white, {"roomId": room_id}
+        )
+        await self.call(
+            "set_ready", "/api/room/set-ready", ip, white, {"isReady": True}
+        )
+        game = await self.call("start_game", "/api/room/start-game", ip, black)
+        if not game or not game["success"]:
+            return
+        game_id = game["gameId"]
+        self.games.append(game_id)
+        self.games_ready.set()
+
+        cells = [(x, y) for y in range(BOARD_SIZE) for x in range(BOARD_SIZE)]
+        random.shuffle(cells)
+        tokens = [black, white]
+        for turn, (x, y) in enumerate(cells):
+            await asyncio.sleep(self.args.move_interval * random.uniform(0.5, 1.5))
+            self.move_sent_at[(game_id, x, y)] = time.perf_counter()
+            result = await self.call(
+                "make_move", "/api/game/make-move", ip, tokens[turn % 2], {"x": x, "y": y}
+            )
+            if not result or not result["success"]:
+                # 游戏已结束或被拒绝，换一局
+                return
+            self.moves += 1
+
+    def on_game_frame(self, game_id: str, frame: dict):
+        if frame.get("type") != "update":
+            return
+        change = frame["change"]
+        sent_at = self.move_sent_at.get((game_id, change["x"], change["y"]))
+        if sent_at is None:
+            return
+        self.deliveries += 1
+        latency = time.perf_counter() - sent_at
+        if len(self.latencies) < LATENCY_SAMPLES:
+            self.latencies.append(latency)
+        else:
+            # 蓄水池抽样
+            i = random.randrange(self.deliveries)
+            if i < LATENCY_SAMPLES:
+                self.latencies[i] = latency
+
+    async def reader(self):
+        ip = self.next_ip()
+        token = await self.login(ip)
+        if token is None:
+            return
+        await self.games_ready.wait()
+        game_id = random.choice(self.games)
+        self.open_streams += 1
+        try:
+            status = await self.transport.stream(
+                "/api/sse/game",
+                {"token": token, "gameId": game_id},
+                ip,
+                lambda frame: self.on_game_frame(game_id, frame),
+            )
+            if status != 200:
+                self.stream_errors += 1
+        except Exception:
+            self.stream_errors += 1
+        finally:
+            self.open_streams -= 1
+
+    async def open_readers(self) -> list[asyncio.Task]:
+        tasks = []
+        batch = max(1, int(self.args.ramp_rate / 10))
+        for i in range(self.args.readers):
+            tasks.append(asyncio.create_task(self.reader()))
+            if (i + 1) % batch == 0:
+                await asyncio.sleep(0.1)
+        return tasks
+
+    async def measure_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(0.1)
+            self.lag_samples.append(loop.time() - start - 0.1)
+
+    def prune_pending(self):
+        cutoff = time.perf_counter() - 60
+        stale = [k for k, t in self.move_sent_at.items() if t < cutoff]
+        for k in stale:
+            del self.move_sent_at[k]
+
+    def report(self, elapsed: float, baseline_rss: int):
+        rss = read_rss(self.args.server_pid)
+        per_conn = (rss - baseline_rss) / self.open_streams if self.open_streams else 0
+        lags = sorted(self.lag_samples)
+        latencies = sorted(self.latencies)
+        total_requests = sum(self.requests.values())
+        total_errors = sum(self.errors.values())
+        print(
+            f"[{elapsed:7.1f}s] streams={self.open_streams} "
+            f"stream_errors={self.stream_errors} moves={self.moves} "
+            f"deliveries={self.deliveries}"
+        )
+        print(
+            f"          rss={rss / 2**20:.1f}MiB "
+            f"per_connection={per_conn / 1024:.1f}KiB"
+        )
+        print(
+            f"          loop lag ms p50={percentile(lags, 0.5) * 1000:.1f} "
+            f"p99={percentile(lags, 0.99) * 1000:.1f} "
+            f"max={(lags[-1] if lags else 0) * 1000:.1f}"
+        )
+        print(
+            f"          move->delivery ms p50={percentile(latencies, 0.5) * 1000:.1f} "
+            f"p90={percentile(latencies, 0.9) * 1000:.1f} "
+            f"p99={percentile(latencies, 0.99) * 1000:.1f} "
+            f"max={(latencies[-1] if latencies else 0) * 1000:.1f}"
+        )
+        error_rate = total_errors / total_requests if total_requests else 0
+        print(
+            f"          requests={total_requests} errors={total_errors} "
+            f"({error_rate:.2%}) {dict(self.errors)}"
+        )
+        self.lag_samples.clear()
+
+    async def run(self):
+        baseline_rss = read_rss(self.args.server_pid)
+        start = time.perf_counter()
+        background = [
+            asyncio.create_task(self.measure_lag()),
+            asyncio.create_task(self.play_games()),
+        ]
+        readers = await self.open_readers()
+        try:
+            while (elapsed := time.perf_counter() - start) < self.args.duration:
+                await asyncio.sleep(self.args.report_interval)
+                self.prune_pending()
+                self.report(time.perf_counter() - start, baseline_rss)
+        finally:
+            for task in background + readers:
+                task.cancel()
+            await asyncio.gather(*background, *readers, return_exceptions=True)
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--url", help="连接已运行的服务器，不指定则在进程内运行")
+    parser.add_argument("--server-pid", type=int, help="服务器进程 ID，用于读取内存")
+    parser.add_argument("--readers", type=int, default=10_000)
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--move-interval", type=float, default=1.0, help="秒")
+    parser.add_argument("--ramp-rate", type=float, default=1000, help="每秒新建连接")
+    parser.add_argument("--duration", type=float, default=300, help="秒")
+    parser.add_argument("--report-interval", type=float, default=10, help="秒")
+    args = parser.parse_args()
+
+    if args.url:
+        transport = HttpTransport(args.url)
+    else:
+        sys.path.insert(0, str(SRC_DIR))
+        # gomoku 的日志文件路径相对于 src 目录
+        os.chdir(SRC_DIR)
+        (ROOT_DIR / "logs").mkdir(exist_ok=True)
+        from gomoku.main import app
+
+        transport = AsgiTransport(app)
+
+    await Soak(transport, args).run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,8 @@
+import atexit
+import json
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 import colorlog
 
@@ -6,10 +10,26 @@ logger = logging.getLogger(__name__)
 uvicorn_logger = logging.getLogger("uvicorn")
 
 
-def setup_logging(logger: logging.Logger):
-    # 清空现有处理器
-    logger.handlers.clear()
+class JsonLinesFormatter(logging.Formatter):
+    """文件日志格式：每行一个 JSON 对象，便于检索，不含颜色控制字符"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
 
+
+def create_listener() -> QueueListener:
+    """在后台线程中输出日志，控制台带颜色，文件为 JSON 行"""
     # 控制台处理器（带颜色）
     handler = colorlog.StreamHandler()
     handler.setFormatter(
@@ -24,25 +44,37 @@ def setup_logging(logger: logging.Logger):
             },
         )
     )
+
+    # 文件处理器
+    file_handler = logging.FileHandler("../logs/app.log", encoding="utf-8")
+    file_handler.setFormatter(JsonLinesFormatter())
+
+    return QueueListener(log_queue, handler, file_handler, respect_handler_level=True)
+
+
+def setup_logging(logger: logging.Logger):
+    """日志记录只放入队列，格式化和写入都在监听线程中进行"""
+    # 清空现有处理器
+    logger.handlers.clear()
     logger.setLevel(logging.INFO)
-    logger.addHandler(handler)
+    logger.addHandler(queue_handler)
+
+
+class _RawQueueHandler(QueueHandler):
+    """不在事件循环线程上格式化消息，只保证记录可以安全地跨线程传递"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 参数可能在之后被修改，先合并为字符串；异常信息保留给格式化器处理
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
-    # 文件处理器（带颜色）
-    file_handler = logging.FileHandler("../logs/app.log")
-    file_handler.setFormatter(
-        colorlog.ColoredFormatter(
-            "%(log_color)s%(levelname)-8s%(reset)s %(name)s %(message)s",
-            log_colors={
-                "DEBUG": "cyan",
-                "INFO": "green",
-                "WARNING": "yellow",
-                "ERROR": "red",
-                "CRITICAL": "red,bg_white",
-            },
-        )
-    )
-    logger.addHandler(file_handler)
 
+log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+queue_handler = _RawQueueHandler(log_queue)
+log_listener = create_listener()
+log_listener.start()
+atexit.register(log_listener.stop)
 
 setup_logging(logger)
 setup_logging(uvicorn_logger)
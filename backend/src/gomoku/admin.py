@@ -0,0 +1,21 @@
+"""管理接口的认证"""
+
+import hmac
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
+
+from gomoku.env import ADMIN_TOKEN
+from gomoku.jwt import security
+
+
+async def require_admin(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> None:
+    """校验 Authorization: Bearer <ADMIN_TOKEN>，未配置 ADMIN_TOKEN 时拒绝所有请求"""
+    if not ADMIN_TOKEN or not hmac.compare_digest(
+        credentials.credentials.encode(), ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required."
+        )
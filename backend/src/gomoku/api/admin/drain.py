@@ -0,0 +1,31 @@
+from pathlib import Path
+
+from fastapi import Depends
+
+from gomoku.admin import require_admin
+from gomoku.env import SNAPSHOT_PATH
+from gomoku.state.room_id_manager import room_id_manager
+from gomoku.state.server_state import server_state
+from gomoku.state.snapshot import write_snapshot
+from gomoku.utils.auto_alias_model import ResponseModel
+from gomoku.utils.sse import stream_registry
+
+
+class Response(ResponseModel):
+    closed_streams: int
+    snapshot_records: int
+    snapshot_bytes: int
+    snapshot_ms: float
+
+
+async def handle(_=Depends(require_admin)) -> Response:
+    """进入排空模式，关闭所有 SSE 流并写入快照"""
+    server_state.start_draining()
+    closed = stream_registry.close_all()
+    stats = write_snapshot(server_state, room_id_manager, Path(SNAPSHOT_PATH))
+    return Response(
+        closed_streams=closed,
+        snapshot_records=stats.records,
+        snapshot_bytes=stats.bytes,
+        snapshot_ms=stats.seconds * 1000,
+    )
@@ -0,0 +1,52 @@
+from typing import Literal
+
+from fastapi import Depends, HTTPException, status
+
+from gomoku.admin import require_admin
+from gomoku.heap_inspector import heap_inspector
+from gomoku.utils.auto_alias_model import ResponseModel
+
+METHOD = "GET"
+
+MAX_LIMIT = 200
+
+
+class AllocationDiff(ResponseModel):
+    location: str
+    size_diff: int
+    size: int
+    count_diff: int
+    count: int
+
+
+class Response(ResponseModel):
+    entries: list[AllocationDiff]
+
+
+async def handle(
+    old_id: int,
+    new_id: int,
+    limit: int = 20,
+    key_type: Literal["lineno", "filename", "traceback"] = "lineno",
+    _=Depends(require_admin),
+) -> Response:
+    """按分配位置比较两个快照，按增长的字节数从大到小排列"""
+    entries = heap_inspector.diff(
+        old_id, new_id, min(max(limit, 1), MAX_LIMIT), key_type
+    )
+    if entries is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No such snapshot."
+        )
+    return Response(
+        entries=[
+            AllocationDiff(
+                location=entry.location,
+                size_diff=entry.size_diff,
+                size=entry.size,
+                count_diff=entry.count_diff,
+                count=entry.count,
+            )
+            for entry in entries
+        ]
+    )
@@ -0,0 +1,21 @@
+from fastapi import Depends, HTTPException, status
+
+from gomoku.admin import require_admin
+from gomoku.heap_inspector import heap_inspector
+from gomoku.utils.auto_alias_model import ResponseModel
+
+
+class Response(ResponseModel):
+    id: int
+    taken_at: float
+    traced_bytes: int
+
+
+async def handle(_=Depends(require_admin)) -> Response:
+    """拍摄 tracemalloc 快照，返回的 ID 用于比较"""
+    if not heap_inspector.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Heap inspection is off."
+        )
+    info = heap_inspector.take_snapshot()
+    return Response(id=info.id, taken_at=info.taken_at, traced_bytes=info.traced_bytes)
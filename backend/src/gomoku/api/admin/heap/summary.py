@@ -0,0 +1,55 @@
+import gc
+
+from fastapi import Depends, HTTPException, status
+
+from gomoku.admin import require_admin
+from gomoku.heap_inspector import heap_inspector
+from gomoku.state.room_id_manager import room_id_manager
+from gomoku.state.server_state import server_state
+from gomoku.utils.auto_alias_model import ResponseModel
+
+METHOD = "GET"
+
+
+class Container(ResponseModel):
+    name: str
+    count: int
+    approx_bytes: int
+
+
+class Snapshot(ResponseModel):
+    id: int
+    taken_at: float
+    traced_bytes: int
+
+
+class Response(ResponseModel):
+    containers: list[Container]
+    gc_counts: list[int]
+    traced_bytes: int
+    peak_bytes: int
+    snapshots: list[Snapshot]
+
+
+async def handle(_=Depends(require_admin)) -> Response:
+    """各状态容器的对象数和近似大小"""
+    if not heap_inspector.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Heap inspection is off."
+        )
+    current, peak = heap_inspector.traced_memory()
+    return Response(
+        containers=[
+            Container(
+                name=stats.name, count=stats.count, approx_bytes=stats.approx_bytes
+            )
+            for stats in heap_inspector.container_stats(server_state, room_id_manager)
+        ],
+        gc_counts=list(gc.get_count()),
+        traced_bytes=current,
+        peak_bytes=peak,
+        snapshots=[
+            Snapshot(id=info.id, taken_at=info.taken_at, traced_bytes=info.traced_bytes)
+            for info in heap_inspector.snapshots()
+        ],
+    )
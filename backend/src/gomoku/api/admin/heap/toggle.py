@@ -0,0 +1,31 @@
+from fastapi import Depends
+
+from gomoku.admin import require_admin
+from gomoku.heap_inspector import DEFAULT_FRAMES, heap_inspector
+from gomoku.utils.auto_alias_model import RequestModel, ResponseModel
+
+# tracemalloc 记录的栈帧数上限
+MAX_FRAMES = 32
+
+
+class Request(RequestModel):
+    enabled: bool
+    frames: int = DEFAULT_FRAMES
+
+
+class Response(ResponseModel):
+    enabled: bool
+    traced_bytes: int
+    peak_bytes: int
+
+
+async def handle(request: Request, _=Depends(require_admin)) -> Response:
+    """开启或关闭内存诊断，关闭时丢弃所有快照"""
+    if request.enabled:
+        heap_inspector.enable(min(max(request.frames, 1), MAX_FRAMES))
+    else:
+        heap_inspector.disable()
+    current, peak = heap_inspector.traced_memory()
+    return Response(
+        enabled=heap_inspector.enabled, traced_bytes=current, peak_bytes=peak
+    )
@@ -0,0 +1,57 @@
+from fastapi import Depends
+
+from gomoku.admin import require_admin
+from gomoku.tracing import SPANS, route_metrics
+from gomoku.utils.auto_alias_model import ResponseModel
+
+METHOD = "GET"
+
+
+class Span(ResponseModel):
+    endpoint: str
+    span: str
+    count: int
+    mean_ms: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class Response(ResponseModel):
+    since: float
+    spans: list[Span]
+
+
+async def handle(reset: bool = False, _=Depends(require_admin)) -> Response:
+    """各接口各阶段的耗时分布，按 total 的总耗时从高到低排列；reset 为真时之后重新统计"""
+    histograms = route_metrics.histograms
+    totals = {
+        endpoint: histogram.total
+        for (endpoint, span), histogram in histograms.items()
+        if span == "total"
+    }
+    keys = sorted(
+        histograms,
+        key=lambda key: (-totals.get(key[0], 0.0), key[0], SPANS.index(key[1])),
+    )
+    response = Response(
+        since=route_metrics.since,
+        spans=[
+            Span(
+                endpoint=endpoint,
+                span=span,
+                count=histogram.count,
+                mean_ms=histogram.total / histogram.count * 1000,
+                p50_ms=histogram.percentile(0.5) * 1000,
+                p90_ms=histogram.percentile(0.9) * 1000,
+                p99_ms=histogram.percentile(0.99) * 1000,
+                max_ms=histogram.max * 1000,
+            )
+            for endpoint, span in keys
+            for histogram in (histograms[(endpoint, span)],)
+        ],
+    )
+    if reset:
+        route_metrics.reset()
+    return response
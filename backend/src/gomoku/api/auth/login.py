@@ -0,0 +1,45 @@
+from fastapi import HTTPException, status
+from pydantic import Field
+
+from gomoku.jwt import create_token
+from gomoku.passwords import PasswordHasherBusy, password_hasher
+from gomoku.rate_limit import RateLimit
+from gomoku.sql.database import readonly_engine
+from gomoku.sql.users import get_login
+from gomoku.utils.auto_alias_model import RequestModel, ResponseModel
+
+RATE_LIMIT = RateLimit(rate=0.5, burst=5)
+
+
+class Request(RequestModel):
+    name: str = Field(min_length=1, max_length=50)
+    password: str = Field(min_length=1, max_length=128)
+
+
+class Response(ResponseModel):
+    access_token: str
+
+
+def invalid_credentials() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid name or password."
+    )
+
+
+async def handle(request: Request) -> Response:
+    async with readonly_engine.connect() as conn:
+        row = await get_login(conn, request.name)
+    # 未知用户直接拒绝，不占用哈希线程
+    if row is None:
+        raise invalid_credentials()
+    try:
+        valid = await password_hasher.verify(request.password, row.password_hash)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress.",
+            headers={"Retry-After": "1"},
+        )
+    if not valid:
+        raise invalid_credentials()
+    return Response(access_token=create_token(str(row.id)))
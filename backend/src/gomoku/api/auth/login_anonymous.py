@@ -4,10 +4,13 @@ import uuid
 from fastapi import APIRouter, Depends
 
 from gomoku.jwt import create_token, get_current_user
+from gomoku.rate_limit import RateLimit
 from gomoku.utils.auto_alias_model import RequestModel, ResponseModel
 
 logger = logging.getLogger(__name__)
 
+RATE_LIMIT = RateLimit(rate=0.5, burst=5)
+
 
 class Response(ResponseModel):
     access_token: str
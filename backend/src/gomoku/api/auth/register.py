@@ -0,0 +1,39 @@
+from fastapi import HTTPException, status
+from pydantic import Field
+
+from gomoku.jwt import create_token
+from gomoku.passwords import PasswordHasherBusy, password_hasher
+from gomoku.rate_limit import RateLimit
+from gomoku.sql.users import create_user
+from gomoku.utils.auto_alias_model import RequestModel, ResponseModel
+
+RATE_LIMIT = RateLimit(rate=0.2, burst=3)
+
+
+class Request(RequestModel):
+    name: str = Field(min_length=1, max_length=50)
+    email: str = Field(min_length=3, max_length=100)
+    # 限制长度，避免超长密码占用哈希线程
+    password: str = Field(min_length=8, max_length=128)
+
+
+class Response(ResponseModel):
+    access_token: str
+
+
+async def handle(request: Request) -> Response:
+    try:
+        password_hash = await password_hasher.hash(request.password)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress.",
+            headers={"Retry-After": "1"},
+        )
+    user_id = await create_user(request.name, request.email, password_hash)
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Name or email already registered.",
+        )
+    return Response(access_token=create_token(str(user_id)))
@@ -0,0 +1,84 @@
+import uuid
+
+from fastapi import Depends, HTTPException, status
+
+from gomoku.engine.book import board_from_moves, opening_book
+from gomoku.engine.hints import board_bytes
+from gomoku.engine.search import BOARD_SIZE
+from gomoku.jwt import get_current_user
+from gomoku.rate_limit import RateLimit
+from gomoku.state.server_state import server_state
+from gomoku.utils.auto_alias_model import ResponseModel
+
+METHOD = "GET"
+
+RATE_LIMIT = RateLimit(rate=5, burst=20)
+
+MAX_MOVES = 50
+
+
+class BookMove(ResponseModel):
+    x: int
+    y: int
+    games: int
+    # 以走这一步的一方计算
+    wins: int
+    draws: int
+
+
+class Response(ResponseModel):
+    # 按局数从多到少排列，局面不在开局库中时为空
+    moves: list[BookMove]
+
+
+def invalid_moves() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid moves."
+    )
+
+
+def parse_moves(moves: str) -> list[int]:
+    """逗号分隔的落子顺序，每步为 y * 15 + x，与对局历史中的格式相同"""
+    if not moves:
+        return []
+    try:
+        parsed = [int(move) for move in moves.split(",")]
+    except ValueError:
+        raise invalid_moves()
+    if len(parsed) > MAX_MOVES:
+        raise invalid_moves()
+    return parsed
+
+
+async def handle(
+    game_id: str | None = None,
+    moves: str | None = None,
+    player_id=Depends(get_current_user),
+) -> Response:
+    """开局库中的走法：game_id 为进行中对局的当前局面，否则为 moves 摆出的局面"""
+    if game_id is not None:
+        queue_id = f"book:{uuid.uuid4()}"
+        try:
+            _, game = server_state.subscribe_game(game_id, queue_id)
+        except KeyError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="No such game."
+            )
+        server_state.unsubscribe_game(game_id, queue_id)
+        cells = board_bytes(game)
+    else:
+        cells = board_from_moves(parse_moves(moves or ""))
+        if cells is None:
+            raise invalid_moves()
+    return Response(
+        moves=[
+            BookMove(
+                x=move.move % BOARD_SIZE,
+                y=move.move // BOARD_SIZE,
+                games=move.games,
+                wins=move.wins,
+                draws=move.draws,
+            )
+            for move in opening_book.lookup(cells)
+        ]
+    )
@@ -0,0 +1,69 @@
+from fastapi import Depends, HTTPException, status
+
+from gomoku.engine.hints import GameNotPlaying, HintServiceBusy, hint_service
+from gomoku.engine.search import BOARD_SIZE
+from gomoku.env import HINT_MAX_MS
+from gomoku.jwt import get_current_user
+from gomoku.rate_limit import RateLimit
+from gomoku.utils.auto_alias_model import ResponseModel
+
+METHOD = "GET"
+
+RATE_LIMIT = RateLimit(rate=0.5, burst=3)
+
+MIN_BUDGET_MS = 10
+
+
+class Response(ResponseModel):
+    success: bool
+    # 没有可走的位置时为 None
+    x: int | None = None
+    y: int | None = None
+    # 以当前轮到的一方的视角计算
+    score: int
+    # 时间预算内完整搜索的深度
+    depth: int
+    nodes: int
+    table_hits: int
+    # 搜索期间对局有新的落子，提示对应的是旧局面
+    cancelled: bool
+    # 走法来自开局库，没有搜索
+    book: bool
+
+
+async def handle(
+    game_id: str, budget_ms: int = 500, player_id=Depends(get_current_user)
+) -> Response:
+    """在 budget_ms 毫秒内为当前轮到的一方搜索最佳走法"""
+    budget_ms = min(max(budget_ms, MIN_BUDGET_MS), HINT_MAX_MS)
+    try:
+        hint = await hint_service.hint(game_id, budget_ms)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No such game."
+        )
+    except GameNotPlaying:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Game is not in progress."
+        )
+    except HintServiceBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many hints in progress.",
+            headers={"Retry-After": "1"},
+        )
+    result = hint.result
+    x = y = None
+    if result.move is not None:
+        y, x = divmod(result.move, BOARD_SIZE)
+    return Response(
+        success=not hint.cancelled,
+        x=x,
+        y=y,
+        score=result.score,
+        depth=result.depth,
+        nodes=result.nodes,
+        table_hits=result.table_hits,
+        cancelled=hint.cancelled,
+        book=result.book,
+    )
@@ -0,0 +1,22 @@
+from fastapi import Depends
+
+from gomoku.jwt import get_current_user
+from gomoku.rate_limit import RateLimit
+from gomoku.state.server_state import server_state
+from gomoku.utils.auto_alias_model import RequestModel, ResponseModel
+
+RATE_LIMIT = RateLimit(rate=5, burst=10)
+
+
+class Request(RequestModel):
+    x: int
+    y: int
+
+
+class Response(ResponseModel):
+    success: bool
+
+
+async def handle(request: Request, current_user=Depends(get_current_user)) -> Response:
+    success = await server_state.submit_move(current_user, request.x, request.y)
+    return Response(success=success)
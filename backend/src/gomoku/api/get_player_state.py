@@ -1,21 +1,22 @@
-from dataclasses import asdict
 from typing import Literal
 
 from fastapi import Depends
 
 from gomoku.jwt import get_current_user
+from gomoku.rate_limit import RateLimit
 from gomoku.state.server_state import server_state
-from gomoku.utils.auto_alias_model import RequestModel, ResponseModel
+from gomoku.utils.auto_alias_model import ResponseModel
+from gomoku.utils.sse import EncodedResponse
+
+RATE_LIMIT = RateLimit(rate=5, burst=20)
 
 
 class Response(ResponseModel):
-    status: Literal["idle", "in_room", "in_game"]
+    status: Literal["idle", "in_room", "in_game", "in_matchmaking"]
     room_id: str | None = None
     game_id: str | None = None
 
 
-async def handle(player_id=Depends(get_current_user)) -> dict:
-    player_state = server_state._player_state.get(player_id)
-    if player_state is None:
-        return {"id": player_id, "status": "idle"}
-    return asdict(player_state)
+async def handle(player_id=Depends(get_current_user)) -> EncodedResponse:
+    """单次查询玩家状态，需要持续跟踪时使用 /api/sse/player"""
+    return EncodedResponse(server_state._player_state.current(player_id))
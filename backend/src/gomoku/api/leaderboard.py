@@ -0,0 +1,41 @@
+from fastapi import Depends
+
+from gomoku.jwt import get_current_user
+from gomoku.leaderboard import leaderboard
+from gomoku.rate_limit import RateLimit
+from gomoku.utils.auto_alias_model import ResponseModel
+
+METHOD = "GET"
+
+RATE_LIMIT = RateLimit(rate=2, burst=10)
+
+MAX_LIMIT = 100
+
+
+class LeaderboardEntry(ResponseModel):
+    rank: int
+    player_id: str
+    rating: float
+
+
+class Response(ResponseModel):
+    total: int
+    entries: list[LeaderboardEntry]
+    my_rank: int | None = None
+    my_rating: float | None = None
+
+
+async def handle(
+    limit: int = 20, offset: int = 0, player_id=Depends(get_current_user)
+) -> Response:
+    limit = min(max(limit, 0), MAX_LIMIT)
+    offset = max(offset, 0)
+    return Response(
+        total=len(leaderboard),
+        entries=[
+            LeaderboardEntry(rank=rank, player_id=entry_id, rating=rating)
+            for rank, entry_id, rating in leaderboard.top(limit, offset)
+        ],
+        my_rank=leaderboard.rank(player_id),
+        my_rating=leaderboard.rating(player_id),
+    )
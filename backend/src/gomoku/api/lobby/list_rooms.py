@@ -0,0 +1,48 @@
+from fastapi import Depends
+
+from gomoku.jwt import get_current_user
+from gomoku.rate_limit import RateLimit
+from gomoku.state.server_state import server_state
+from gomoku.utils.auto_alias_model import ResponseModel
+
+METHOD = "GET"
+
+RATE_LIMIT = RateLimit(rate=2, burst=10)
+
+MAX_LIMIT = 100
+
+
+class LobbyRoom(ResponseModel):
+    id: str
+    host: str
+    players: int
+    capacity: int
+    seq: int
+
+
+class Response(ResponseModel):
+    total: int
+    rooms: list[LobbyRoom]
+    # 下一页的游标，作为 after 参数传入；没有更多房间时为 None
+    next_cursor: int | None = None
+
+
+async def handle(
+    after: int = 0, limit: int = 20, player_id=Depends(get_current_user)
+) -> Response:
+    limit = min(max(limit, 1), MAX_LIMIT)
+    rooms = server_state.lobby.page(after, limit)
+    return Response(
+        total=len(server_state.lobby),
+        rooms=[
+            LobbyRoom(
+                id=room.id,
+                host=room.host,
+                players=room.players,
+                capacity=room.capacity,
+                seq=room.seq,
+            )
+            for room in rooms
+        ],
+        next_cursor=rooms[-1].seq if len(rooms) == limit else None,
+    )
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from gomoku.jwt import get_current_user
+from gomoku.match_history import decode_cursor, encode_cursor, load_history
+from gomoku.rate_limit import RateLimit
+from gomoku.sql.database import get_readonly_connection
+from gomoku.utils.auto_alias_model import ResponseModel
+
+METHOD = "GET"
+
+RATE_LIMIT = RateLimit(rate=2, burst=10)
+
+MAX_LIMIT = 100
+
+
+class HistoryEntry(ResponseModel):
+    game_id: str
+    finished_at: datetime
+    opponent_id: str
+    color: str
+    result: str
+    reason: str
+    # 落子顺序，每步为 y * 15 + x
+    moves: list[int]
+
+
+class Response(ResponseModel):
+    entries: list[HistoryEntry]
+    # 下一页的游标，作为 cursor 参数传入；没有更多对局时为 None
+    next_cursor: str | None = None
+
+
+async def handle(
+    player_id: str | None = None,
+    cursor: str | None = None,
+    limit: int = 20,
+    current_user=Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_readonly_connection),
+) -> Response:
+    """玩家的对局历史，从新到旧，默认为当前玩家"""
+    limit = min(max(limit, 1), MAX_LIMIT)
+    after = None
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        if after is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
+            )
+    entries = await load_history(conn, player_id or current_user, limit, after)
+    return Response(
+        entries=[
+            HistoryEntry(
+                game_id=entry.game_id,
+                finished_at=entry.finished_at,
+                opponent_id=entry.opponent_id,
+                color=entry.color,
+                result=entry.result,
+                reason=entry.reason,
+                moves=list(entry.moves),
+            )
+            for entry in entries
+        ],
+        next_cursor=encode_cursor(entries[-1]) if len(entries) == limit else None,
+    )
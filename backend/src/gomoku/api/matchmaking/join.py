@@ -0,0 +1,20 @@
+from fastapi import Depends
+
+from gomoku.jwt import get_current_user
+from gomoku.rate_limit import RateLimit
+from gomoku.rating import rating_store
+from gomoku.state.server_state import server_state
+from gomoku.utils.auto_alias_model import ResponseModel
+
+RATE_LIMIT = RateLimit(rate=1, burst=5)
+
+
+class Response(ResponseModel):
+    success: bool
+    rating: float
+
+
+async def handle(current_user=Depends(get_current_user)) -> Response:
+    rating = await rating_store.load(current_user)
+    success = server_state.join_matchmaking(current_user, rating.rating)
+    return Response(success=success, rating=rating.rating)
@@ -0,0 +1,17 @@
+from fastapi import Depends
+
+from gomoku.jwt import get_current_user
+from gomoku.rate_limit import RateLimit
+from gomoku.state.server_state import server_state
+from gomoku.utils.auto_alias_model import ResponseModel
+
+RATE_LIMIT = RateLimit(rate=1, burst=5)
+
+
+class Response(ResponseModel):
+    success: bool
+
+
+async def handle(current_user=Depends(get_current_user)) -> Response:
+    success = server_state.leave_matchmaking(current_user)
+    return Response(success=success)
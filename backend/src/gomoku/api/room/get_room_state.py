@@ -0,0 +1,22 @@
+from fastapi import Depends, HTTPException, status
+
+from gomoku.jwt import get_current_user
+from gomoku.rate_limit import RateLimit
+from gomoku.state.server_state import server_state
+from gomoku.utils.sse import EncodedResponse
+
+METHOD = "GET"
+
+NO_RESPONSE_MODEL = True
+
+RATE_LIMIT = RateLimit(rate=2, burst=10)
+
+
+async def handle(room_id: str, player_id=Depends(get_current_user)) -> EncodedResponse:
+    """房间的完整状态，客户端发现差量版本不连续时用它重新同步"""
+    room = server_state._room_state.get(room_id)
+    if room is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No such room."
+        )
+    return EncodedResponse(room.data)
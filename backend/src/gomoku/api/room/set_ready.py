@@ -1,9 +1,12 @@
 from fastapi import Depends
 
 from gomoku.jwt import get_current_user
+from gomoku.rate_limit import RateLimit
 from gomoku.state.server_state import server_state
 from gomoku.utils.auto_alias_model import RequestModel, ResponseModel
 
+RATE_LIMIT = RateLimit(rate=4, burst=10)
+
 
 class Request(RequestModel):
     is_ready: bool
@@ -1,9 +1,12 @@
 from fastapi import Depends
 
 from gomoku.jwt import get_current_user
-from gomoku.state.server_state import server_state
+from gomoku.rate_limit import RateLimit
+from gomoku.state.server_state import default_time_control, server_state
 from gomoku.utils.auto_alias_model import RequestModel, ResponseModel
 
+RATE_LIMIT = RateLimit(rate=1, burst=5)
+
 
 class Response(ResponseModel):
     success: bool
@@ -11,7 +14,9 @@ class Response(ResponseModel):
 
 
 async def handle(player_id=Depends(get_current_user)) -> Response:
-    game_id = server_state.start_game(player_id)
+    game_id = server_state.start_game(
+        player_id, time_control=default_time_control()
+    )
     success = game_id is not None
     if game_id is None:
         game_id = ""
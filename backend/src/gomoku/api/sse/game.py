@@ -1,28 +1,66 @@
 import asyncio
-from dataclasses import asdict
+import uuid
+from dataclasses import dataclass
+from typing import Literal
 
 from fastapi import APIRouter, Depends, Query
 from fastapi.responses import StreamingResponse
 
 from gomoku.jwt import get_current_user_from_query
-from gomoku.state.server_state import server_state
-from gomoku.utils.sse import sse_event_generator
+from gomoku.rate_limit import RateLimit
+from gomoku.state.server_state import GameEvent, GameState, server_state
+from gomoku.utils.encoder import camel_encoded
+from gomoku.utils.sse import (
+    CLOSE,
+    HEARTBEAT,
+    sse_event_generator,
+    stream_registry,
+)
 
 METHOD = "GET"
 
 NO_RESPONSE_MODEL = True
 
+RATE_LIMIT = RateLimit(rate=0.5, burst=5)
+
+MAX_STREAMS_PER_PLAYER = 3
+
+
+@camel_encoded
+@dataclass
+class GameEventInitial:
+    state: GameState
+    type: Literal["initial"] = "initial"
+
+
+@camel_encoded
+@dataclass
+class GameEventUpdate:
+    change: GameEvent
+    type: Literal["update"] = "update"
+
 
 async def event_generator(game_id: str, player_id: str):
-    queue, current_state = server_state.subscribe_game(game_id, player_id)
-    try:
+    # 每个流使用独立的队列，同一玩家可以同时打开多个流
+    queue_id = f"{player_id}:{uuid.uuid4()}"
+    queue, current_state = server_state.subscribe_game(game_id, queue_id)
+    with stream_registry.track(
+        "game", queue, lambda: server_state.unsubscribe_game(game_id, queue_id)
+    ) as stream:
         # Yield initial state
-        yield {"type": "initial", "state": asdict(current_state)}
+        yield GameEventInitial(state=current_state)
         while True:
             change = await queue.get()
-            yield {"type": "update", "change": asdict(change)}
-    finally:
-        server_state.unsubscribe_game(game_id, player_id)
+            if change is HEARTBEAT:
+                yield HEARTBEAT
+                stream.mark_heartbeat_sent()
+                continue
+            if change is CLOSE:
+                break
+            yield GameEventUpdate(change=change)
+            stream.mark_sent()
+            if change.type == "game_over":
+                break
 
 
 async def handle(game_id: str, player_id: str = Depends(get_current_user_from_query)):
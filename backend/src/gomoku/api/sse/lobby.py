@@ -0,0 +1,49 @@
+import uuid
+
+from fastapi import Depends
+from fastapi.responses import StreamingResponse
+
+from gomoku.jwt import get_current_user_from_query
+from gomoku.rate_limit import RateLimit
+from gomoku.state.server_state import server_state
+from gomoku.utils.sse import (
+    CLOSE,
+    HEARTBEAT,
+    sse_event_generator,
+    stream_registry,
+)
+
+METHOD = "GET"
+
+NO_RESPONSE_MODEL = True
+
+RATE_LIMIT = RateLimit(rate=0.5, burst=5)
+
+MAX_STREAMS_PER_PLAYER = 3
+
+
+async def event_generator(player_id: str):
+    # 队列中是大厅已编码好的帧，所有观察者共享，这里原样发出
+    queue_id = f"{player_id}:{uuid.uuid4()}"
+    queue, initial_frame = server_state.lobby.subscribe(queue_id)
+    with stream_registry.track(
+        "lobby", queue, lambda: server_state.lobby.unsubscribe(queue_id)
+    ) as stream:
+        yield initial_frame
+        while True:
+            frame = await queue.get()
+            if frame is HEARTBEAT:
+                yield HEARTBEAT
+                stream.mark_heartbeat_sent()
+                continue
+            if frame is CLOSE:
+                break
+            yield frame
+            stream.mark_sent()
+
+
+async def handle(player_id: str = Depends(get_current_user_from_query)):
+    return StreamingResponse(
+        sse_event_generator(event_generator(player_id)),
+        media_type="text/event-stream",
+    )
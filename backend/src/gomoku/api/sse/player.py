@@ -0,0 +1,57 @@
+import uuid
+
+from fastapi import Depends
+from fastapi.responses import StreamingResponse
+
+from gomoku.jwt import get_current_user_from_query
+from gomoku.rate_limit import RateLimit
+from gomoku.state.server_state import server_state
+from gomoku.utils.sse import (
+    CLOSE,
+    HEARTBEAT,
+    sse_event_generator,
+    stream_registry,
+)
+
+METHOD = "GET"
+
+NO_RESPONSE_MODEL = True
+
+RATE_LIMIT = RateLimit(rate=0.5, burst=5)
+
+MAX_STREAMS_PER_PLAYER = 3
+
+
+async def event_generator(player_id: str):
+    queue_id = f"{player_id}:{uuid.uuid4()}"
+    queue, current_state = server_state.subscribe_player(player_id, queue_id)
+    with stream_registry.track(
+        "player", queue, lambda: server_state.unsubscribe_player(player_id, queue_id)
+    ) as stream:
+        yield current_state
+        while True:
+            state = await queue.get()
+            if state is HEARTBEAT:
+                yield HEARTBEAT
+                stream.mark_heartbeat_sent()
+                continue
+            if state is CLOSE:
+                break
+            # 只有最新的状态有意义，跳过队列中已经过时的状态
+            while not queue.empty():
+                following = queue.get_nowait()
+                if following is CLOSE:
+                    yield state
+                    return
+                if following is not HEARTBEAT:
+                    state = following
+            yield state
+            stream.mark_sent()
+
+
+async def handle(player_id: str = Depends(get_current_user_from_query)):
+    """玩家自己的状态，连接时推送当前状态，之后在进入或离开房间、对局和匹配时推送"""
+    return StreamingResponse(
+        sse_event_generator(event_generator(player_id)),
+        media_type="text/event-stream",
+    )
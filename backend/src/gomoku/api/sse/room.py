@@ -1,32 +1,118 @@
 import asyncio
-from dataclasses import asdict
+import uuid
+from dataclasses import dataclass
+from typing import Literal
 
 from fastapi import APIRouter, Depends, Query
 from fastapi.responses import StreamingResponse
 
 from gomoku.jwt import get_current_user_from_query
-from gomoku.state.server_state import server_state
-from gomoku.utils.sse import sse_event_generator
+from gomoku.rate_limit import RateLimit
+from gomoku.state.server_state import (
+    RoomState,
+    RoomStateChange,
+    RoomStateChangeUpdate,
+    server_state,
+)
+from gomoku.utils.encoder import camel_encoded
+from gomoku.utils.sse import (
+    CLOSE,
+    HEARTBEAT,
+    sse_event_generator,
+    stream_registry,
+)
 
 METHOD = "GET"
 
 NO_RESPONSE_MODEL = True
 
+RATE_LIMIT = RateLimit(rate=0.5, burst=5)
 
-async def event_generator(room_id: str, player_id: str):
-    queue, current_state = server_state.subscribe_room(room_id, player_id)
-    try:
+MAX_STREAMS_PER_PLAYER = 3
+
+# 合并窗口的上限，单位毫秒
+MAX_COALESCE_MS = 1000
+
+
+@camel_encoded
+@dataclass
+class RoomEventInitial:
+    state: RoomState
+    type: Literal["initial"] = "initial"
+
+
+# 可以合并的房间变更
+MERGEABLE_TYPES = ("update", "diff")
+
+
+def drain_updates(queue: asyncio.Queue) -> tuple[int, RoomStateChange | None]:
+    """取出队列中已有的可合并变更
+
+    遇到 delete、game_start 或关闭标记时停止，返回 (取出的变更数, 该事件)"""
+    count = 0
+    while not queue.empty():
+        change = queue.get_nowait()
+        if change is HEARTBEAT:
+            continue
+        if change is CLOSE or change.type not in MERGEABLE_TYPES:
+            return count, change
+        count += 1
+    return count, None
+
+
+async def event_generator(
+    room_id: str, player_id: str, coalesce_ms: int = 0, full: bool = False
+):
+    # 每个流使用独立的队列，同一玩家可以同时打开多个流
+    queue_id = f"{player_id}:{uuid.uuid4()}"
+    queue, current_state = server_state.subscribe_room(room_id, queue_id)
+    with stream_registry.track(
+        "room", queue, lambda: server_state.unsubscribe_room(room_id, queue_id)
+    ) as stream:
         # Yield initial state
-        yield {"type": "initial", "state": asdict(current_state)}
+        yield RoomEventInitial(state=current_state)
         while True:
             change = await queue.get()
-            yield asdict(change)
-    finally:
-        server_state.unsubscribe_room(room_id, player_id)
+            if change is HEARTBEAT:
+                yield HEARTBEAT
+                stream.mark_heartbeat_sent()
+                continue
+            if change is CLOSE:
+                break
+            following = None
+            if coalesce_ms > 0 and change.type in MERGEABLE_TYPES:
+                # 等待一个窗口，把期间到达的变更合并为一个完整状态
+                await asyncio.sleep(coalesce_ms / 1000)
+                merged, following = drain_updates(queue)
+                if merged:
+                    change = RoomStateChangeUpdate(new_state=current_state)
+            if full and change.type == "diff":
+                # current_state 是房间的当前状态，总是最新的
+                change = RoomStateChangeUpdate(new_state=current_state)
+            yield change
+            stream.mark_sent()
+            if following is CLOSE:
+                break
+            if following is not None:
+                yield following
+                stream.mark_sent()
+                break
+            # 房间已删除或已开始游戏，之后不会再有事件
+            if change.type not in MERGEABLE_TYPES:
+                break
+
 
+async def handle(
+    room_id: str,
+    coalesce_ms: int = 0,
+    full: bool = False,
+    player_id: str = Depends(get_current_user_from_query),
+):
+    """默认推送字段级差量，full 为 True 时每次变更都推送完整状态
 
-async def handle(room_id: str, player_id: str = Depends(get_current_user_from_query)):
+    coalesce_ms 大于 0 时，该窗口内的多个变更合并为一次完整状态推送"""
+    coalesce_ms = min(max(coalesce_ms, 0), MAX_COALESCE_MS)
     return StreamingResponse(
-        sse_event_generator(event_generator(room_id, player_id)),
+        sse_event_generator(event_generator(room_id, player_id, coalesce_ms, full)),
         media_type="text/event-stream",
     )
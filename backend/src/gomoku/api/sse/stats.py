@@ -0,0 +1,32 @@
+from fastapi import Depends
+
+from gomoku.admin import require_admin
+from gomoku.utils.auto_alias_model import ResponseModel
+from gomoku.utils.sse import stream_registry
+
+METHOD = "GET"
+
+
+class StreamKindStats(ResponseModel):
+    count: int
+    oldest_age: float  # 秒
+    median_age: float  # 秒
+
+
+class Response(ResponseModel):
+    total: int
+    kinds: dict[str, StreamKindStats]
+
+
+async def handle(_=Depends(require_admin)) -> Response:
+    """各类 SSE 流的数量和存活时间，仅管理员可读"""
+    stats = stream_registry.stats()
+    return Response(
+        total=sum(s.count for s in stats.values()),
+        kinds={
+            kind: StreamKindStats(
+                count=s.count, oldest_age=s.oldest_age, median_age=s.median_age
+            )
+            for kind, s in stats.items()
+        },
+    )
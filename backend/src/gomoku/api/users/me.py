@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from gomoku.jwt import get_current_user
+from gomoku.rate_limit import RateLimit
+from gomoku.sql.database import get_readonly_connection
+from gomoku.sql.users import get_user
+from gomoku.utils.auto_alias_model import ResponseModel
+
+METHOD = "GET"
+
+RATE_LIMIT = RateLimit(rate=5, burst=20)
+
+
+class Response(ResponseModel):
+    player_id: str
+    # 匿名玩家没有账号，以下字段为 None
+    anonymous: bool
+    name: str | None = None
+    email: str | None = None
+    created_at: datetime | None = None
+
+
+async def handle(
+    player_id=Depends(get_current_user),
+    conn: AsyncConnection = Depends(get_readonly_connection),
+) -> Response:
+    """当前玩家的账号信息，读取经过用户缓存，不开启事务"""
+    # 注册用户的玩家 ID 为 users 表的 ID，匿名玩家为 UUID
+    if not player_id.isdigit():
+        return Response(player_id=player_id, anonymous=True)
+    user = await get_user(conn, int(player_id))
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No such user."
+        )
+    return Response(
+        player_id=player_id,
+        anonymous=False,
+        name=user.name,
+        email=user.email,
+        created_at=user.created_at,
+    )
@@ -2,16 +2,31 @@ import functools
 import inspect
 import logging
 import os
+import time
 from pathlib import Path
 from typing import Optional
 
 import fastapi.params
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.requests import Request
 from pydantic import BaseModel
 from pydantic.alias_generators import to_camel
 
+from gomoku.env import EXECUTOR_MAX_CONCURRENCY
+from gomoku.jwt import get_current_user, get_current_user_from_query
+from gomoku.offload import endpoint_executor
+from gomoku.rate_limit import RateLimit, rate_limiter, stream_limiter
+from gomoku.tracing import TracedRoute, current_trace, time_dependency
+
 logger = logging.getLogger(__name__)
 
+# 认证玩家身份的依赖，限流时据此取得玩家 ID
+AUTH_DEPENDENCIES = (get_current_user, get_current_user_from_query)
+# 计时的认证依赖，每个依赖只包装一次，handler 和限流共享同一个依赖缓存
+TIMED_AUTH_DEPENDENCIES = {
+    dependency: time_dependency(dependency) for dependency in AUTH_DEPENDENCIES
+}
+
 
 def snake_to_kebab(name: str) -> str:
     """Convert snake_case to kebab-case: get_game_state -> get-game-state"""
@@ -44,6 +59,8 @@ def create_get_handler_with_signature(original_handle):
     async def dynamic_handler(**kwargs):
         try:
             return await original_handle(**kwargs)
+        except HTTPException:
+            raise
         except Exception as e:
             # You may want to log `endpoint_path` here for debugging
             raise HTTPException(400, str(e))
@@ -54,6 +71,90 @@ def create_get_handler_with_signature(original_handle):
     return dynamic_handler
 
 
+def find_auth_dependency(handle) -> tuple[str, object] | None:
+    """查找 handler 中用于认证玩家的依赖参数，返回 (参数名, 依赖函数)"""
+    for param_name, param in inspect.signature(handle).parameters.items():
+        if isinstance(param.default, fastapi.params.Depends) and (
+            param.default.dependency in AUTH_DEPENDENCIES
+        ):
+            return param_name, param.default.dependency
+    return None
+
+
+def create_rate_limit_dependency(endpoint_path: str, limit: RateLimit, auth_dependency):
+    """
+    Create a route dependency that applies per-player and per-IP token buckets.
+    The auth dependency is shared with the handler through FastAPI's per-request
+    dependency cache, so the token is only verified once.
+    """
+    if auth_dependency is None:
+
+        async def ip_dependency(request: Request):
+            ip = request.client.host if request.client else None
+            rate_limiter.check(endpoint_path, limit, ip)
+
+        return ip_dependency
+
+    async def player_dependency(
+        request: Request, player_id: str = Depends(auth_dependency)
+    ):
+        ip = request.client.host if request.client else None
+        rate_limiter.check(endpoint_path, limit, ip, player_id)
+
+    return player_dependency
+
+
+def limit_concurrent_streams(original_handle, max_streams: int, player_param: str):
+    """Wrap a streaming handler so each player can hold at most `max_streams` responses."""
+
+    @functools.wraps(original_handle)
+    async def limited_handler(**kwargs):
+        slot = stream_limiter.acquire(kwargs[player_param], max_streams)
+        if slot is None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many open streams.",
+            )
+        try:
+            response = await original_handle(**kwargs)
+        except BaseException:
+            slot.release()
+            raise
+        response.body_iterator = stream_limiter.wrap_body(response.body_iterator, slot)
+        return response
+
+    return limited_handler
+
+
+def trace_handler(original_handle, auth: tuple[str, object] | None):
+    """Wrap a handler to record its time and arguments on the current request trace,
+    and replace its auth dependency with the timed one."""
+    sig = inspect.signature(original_handle)
+    if auth is not None:
+        param_name, dependency = auth
+        params = dict(sig.parameters)
+        params[param_name] = params[param_name].replace(
+            default=Depends(TIMED_AUTH_DEPENDENCIES[dependency])
+        )
+        sig = sig.replace(parameters=list(params.values()))
+
+    @functools.wraps(original_handle)
+    async def traced_handler(**kwargs):
+        trace = current_trace.get()
+        if trace is None:
+            return await original_handle(**kwargs)
+        trace.arguments = kwargs
+        start = time.perf_counter()
+        try:
+            return await original_handle(**kwargs)
+        finally:
+            trace.handler_end = time.perf_counter()
+            trace.handler = trace.handler_end - start
+
+    traced_handler.__signature__ = sig  # type: ignore
+    return traced_handler
+
+
 def load_api_routes(api_dir: Path, project_root: Path, base_prefix: str) -> APIRouter:
     """
     Automatically load API endpoints from Python files under `api_dir`.
@@ -64,8 +165,18 @@ def load_api_routes(api_dir: Path, project_root: Path, base_prefix: str) -> APIR
     - For GET: define `async def handle(param1: str, param2: int = 0) -> Response`
     - For POST: define `Request` (Pydantic model) and `async def handle(request: Request) -> Response`
     - Define `Response` Pydantic model for both
+    - To rate limit: define `RATE_LIMIT = RateLimit(rate=..., burst=...)`,
+      applied per player (if the handler depends on auth) and per IP
+    - For streaming responses: define `MAX_STREAMS_PER_PLAYER = n` to cap
+      concurrent streams per player
+    - For CPU-bound handlers: define `EXECUTOR = "thread"` or `"process"` and a
+      plain `def handle(...)`; dependencies still run on the event loop, the
+      handler runs in a shared bounded pool, see gomoku.offload. Optionally define
+      `MAX_CONCURRENCY = n` to cap its in-flight calls (default EXECUTOR_MAX_CONCURRENCY)
+    - Every route records auth, handler, serialization and first-byte times
+      per endpoint, see gomoku.tracing
     """
-    main_router = APIRouter()
+    main_router = APIRouter(route_class=TracedRoute)
 
     for py_file in api_dir.rglob("*.py"):
         if py_file.name.startswith("_") or py_file.name == "api_loader.py":
@@ -93,21 +204,60 @@ def load_api_routes(api_dir: Path, project_root: Path, base_prefix: str) -> APIR
                     )
 
             handle_func = getattr(loaded_module, "handle")
+            auth = find_auth_dependency(handle_func)
+
+            executor = getattr(loaded_module, "EXECUTOR", None)
+            max_streams = getattr(loaded_module, "MAX_STREAMS_PER_PLAYER", None)
+            if executor is not None:
+                if max_streams is not None:
+                    raise ValueError(
+                        f"{module_str} 不能同时定义 EXECUTOR 和 MAX_STREAMS_PER_PLAYER"
+                    )
+                handle_func = endpoint_executor.wrap(
+                    handle_func,
+                    executor,
+                    endpoint_path,
+                    getattr(loaded_module, "MAX_CONCURRENCY", EXECUTOR_MAX_CONCURRENCY),
+                )
+
+            if max_streams is not None:
+                if auth is None:
+                    raise ValueError(
+                        f"{module_str} 定义了 MAX_STREAMS_PER_PLAYER，但 handle 没有认证依赖"
+                    )
+                handle_func = limit_concurrent_streams(handle_func, max_streams, auth[0])
+
+            dependencies = []
+            rate_limit = getattr(loaded_module, "RATE_LIMIT", None)
+            if rate_limit is not None:
+                dependencies.append(
+                    Depends(
+                        create_rate_limit_dependency(
+                            endpoint_path,
+                            rate_limit,
+                            TIMED_AUTH_DEPENDENCIES[auth[1]] if auth else None,
+                        )
+                    )
+                )
 
             if method == "GET":
-                handler = create_get_handler_with_signature(handle_func)
+                handler = trace_handler(
+                    create_get_handler_with_signature(handle_func), auth
+                )
                 main_router.add_api_route(
                     endpoint_path,
                     handler,
                     methods=["GET"],
                     response_model=ResponseModel,
+                    dependencies=dependencies,
                 )
             else:  # POST
                 main_router.add_api_route(
                     endpoint_path,
-                    handle_func,
+                    trace_handler(handle_func, auth),
                     methods=["POST"],
                     response_model=ResponseModel,
+                    dependencies=dependencies,
                 )
 
             logger.info(f"已注册 {method} {endpoint_path}")
@@ -0,0 +1,231 @@
+"""开局库
+
+开局库是按键排序的定长记录文件，用 mmap 只读打开，查询时在映射上二分查找，
+不把文件读入内存。启动只需打开文件，所有进程（各个服务器进程和提示搜索进程）
+通过页缓存共享同一份物理内存，开局库再大，启动时间和每个进程的内存也不变。
+
+局面的键是 8 种对称变换（旋转、翻转）下 Zobrist 哈希的最小值，对称的局面共用记录；
+记录中的走法也是变换到标准方向后的位置，查询时再变换回实际方向。
+
+    文件头: MAGIC + 版本号(u16) + 记录长度(u16) + 记录数(u64)
+    记录:   键(u64) + 走法(u16) + 填充(u16) + 局数(u32) + 胜局数(u32) + 和局数(u32)
+
+胜负以走这一步的一方计算。开局库由 scripts/build_opening_book.py 生成，
+替换文件后需要重启服务器才会使用新的开局库。
+"""
+
+import logging
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from gomoku.engine.search import BOARD_SIZE, CELLS, ZOBRIST
+from gomoku.env import OPENING_BOOK_PATH
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"GMKB"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sHHQ")
+_RECORD = struct.Struct("<QHxxIII")
+_KEY = struct.Struct("<Q")
+
+_LAST = BOARD_SIZE - 1
+# 8 种对称变换，SYMMETRIES[s][idx] 为格子 idx 变换后的位置
+SYMMETRIES = [
+    tuple(
+        ty * BOARD_SIZE + tx
+        for y in range(BOARD_SIZE)
+        for x in range(BOARD_SIZE)
+        for tx, ty in (transform(x, y),)
+    )
+    for transform in (
+        lambda x, y: (x, y),
+        lambda x, y: (_LAST - x, y),
+        lambda x, y: (x, _LAST - y),
+        lambda x, y: (_LAST - x, _LAST - y),
+        lambda x, y: (y, x),
+        lambda x, y: (_LAST - y, x),
+        lambda x, y: (y, _LAST - x),
+        lambda x, y: (_LAST - y, _LAST - x),
+    )
+]
+# INVERSE[s][idx] 为变换 s 之前的位置
+INVERSE = [
+    tuple(sorted(range(CELLS), key=lambda idx: symmetry[idx]))
+    for symmetry in SYMMETRIES
+]
+
+
+@dataclass
+class BookMove:
+    move: int  # y * 15 + x
+    games: int
+    wins: int
+    draws: int
+
+
+def position_hashes(cells: bytes) -> list[int]:
+    """局面在 8 种对称变换下的哈希"""
+    hashes = [0] * len(SYMMETRIES)
+    for idx, stone in enumerate(cells):
+        if stone:
+            for s, symmetry in enumerate(SYMMETRIES):
+                hashes[s] ^= ZOBRIST[symmetry[idx]][stone]
+    return hashes
+
+
+def canonical(hashes: list[int]) -> tuple[int, list[int]]:
+    """返回 (键, 得到该键的变换)，对称的局面有多个变换得到同一个键"""
+    key = min(hashes)
+    return key, [s for s, h in enumerate(hashes) if h == key]
+
+
+def board_from_moves(moves: Iterable[int]) -> bytes | None:
+    """按落子顺序（黑先）摆出棋盘，有越界或重复的落子时返回 None"""
+    cells = bytearray(CELLS)
+    for ply, move in enumerate(moves):
+        if not 0 <= move < CELLS or cells[move]:
+            return None
+        cells[move] = 1 if ply % 2 == 0 else 2
+    return bytes(cells)
+
+
+def write_book(path: Path, entries: Iterable[tuple[int, int, int, int, int]]) -> int:
+    """把 (键, 走法, 局数, 胜局数, 和局数) 排序后写入开局库，返回记录数
+
+    先写入临时文件再替换，正在使用旧文件的进程不受影响"""
+    records = sorted(entries)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, _RECORD.size, len(records)))
+        for record in records:
+            f.write(_RECORD.pack(*record))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class BookBuilder:
+    """从对局记录统计开局库，只统计前 max_ply 步"""
+
+    def __init__(self, max_ply: int):
+        self.max_ply = max_ply
+        self.games = 0
+        # (键, 标准方向的走法) -> [局数, 胜局数, 和局数]
+        self._stats: dict[tuple[int, int], list[int]] = {}
+
+    def add_game(self, moves: Iterable[int], winner: str | None):
+        """moves 为落子顺序（黑先），winner 为 black、white 或 None（和局）"""
+        self.games += 1
+        hashes = [0] * len(SYMMETRIES)
+        for ply, move in enumerate(moves):
+            if ply >= self.max_ply:
+                break
+            color = "black" if ply % 2 == 0 else "white"
+            key, symmetries = canonical(hashes)
+            # 对称的局面中，等价的走法统一记为编号最小的位置
+            book_move = min(SYMMETRIES[s][move] for s in symmetries)
+            stats = self._stats.get((key, book_move))
+            if stats is None:
+                stats = self._stats[(key, book_move)] = [0, 0, 0]
+            stats[0] += 1
+            if winner is None:
+                stats[2] += 1
+            elif winner == color:
+                stats[1] += 1
+            stone = 1 if color == "black" else 2
+            for s, symmetry in enumerate(SYMMETRIES):
+                hashes[s] ^= ZOBRIST[symmetry[move]][stone]
+
+    def entries(self, min_games: int) -> Iterable[tuple[int, int, int, int, int]]:
+        for (key, move), (games, wins, draws) in self._stats.items():
+            if games >= min_games:
+                yield key, move, games, wins, draws
+
+
+class OpeningBook:
+    """只读的开局库，文件不存在或格式不正确时为空"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.records = 0
+        self._mmap: mmap.mmap | None = None
+        if not path.exists():
+            return
+        try:
+            with open(path, "rb") as f:
+                # 空文件不能 mmap，比文件头还短的文件也无法解析
+                if os.fstat(f.fileno()).st_size < _HEADER.size:
+                    raise ValueError("file shorter than header")
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, record_size, records = _HEADER.unpack_from(self._mmap, 0)
+        except (OSError, ValueError, struct.error) as e:
+            logger.error(f"Unreadable opening book {path} ({e}), ignoring it")
+            self.close()
+            return
+        expected = _HEADER.size + records * record_size
+        if (
+            magic != MAGIC
+            or version != VERSION
+            or record_size != _RECORD.size
+            or len(self._mmap) < expected
+        ):
+            # 开局库只是辅助，格式不正确时不使用，不影响启动
+            logger.error(f"Unsupported opening book {path}, ignoring it")
+            self.close()
+            return
+        self.records = records
+        logger.info(f"Opened opening book {path} with {records} records")
+
+    def __len__(self) -> int:
+        return self.records
+
+    def _key_at(self, index: int) -> int:
+        return _KEY.unpack_from(self._mmap, _HEADER.size + index * _RECORD.size)[0]
+
+    def _lower_bound(self, key: int) -> int:
+        low, high = 0, self.records
+        while low < high:
+            mid = (low + high) // 2
+            if self._key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def lookup(self, cells: bytes) -> list[BookMove]:
+        """局面的所有开局库走法，按局数从多到少排列"""
+        if not self.records:
+            return []
+        key, symmetries = canonical(position_hashes(cells))
+        inverse = INVERSE[symmetries[0]]
+        moves = []
+        index = self._lower_bound(key)
+        while index < self.records:
+            record_key, move, games, wins, draws = _RECORD.unpack_from(
+                self._mmap, _HEADER.size + index * _RECORD.size
+            )
+            if record_key != key:
+                break
+            moves.append(BookMove(inverse[move], games, wins, draws))
+            index += 1
+        # 键冲突或文件与棋盘不一致时，不返回已经有棋子的位置
+        moves = [m for m in moves if not cells[m.move]]
+        moves.sort(key=lambda m: m.games, reverse=True)
+        return moves
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self.records = 0
+
+
+# 全局单例
+opening_book = OpeningBook(Path(OPENING_BOOK_PATH))
@@ -0,0 +1,150 @@
+"""走法提示
+
+搜索在独立的进程池中进行，不占用事件循环，也不经过对局的 actor，
+提示再慢也不会阻塞落子。所有搜索进程共享同一张置换表。
+
+搜索期间订阅对局，对局有新的落子或结束时，通过共享内存中的取消标志
+通知搜索进程提前停止，此时提示已经过时，结果标记为 cancelled。
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from gomoku.engine.search import BLACK, WHITE, SearchResult
+from gomoku.engine.transposition import CANCEL_SLOTS, SharedTranspositionTable
+from gomoku.engine.worker import init_worker, run_search
+from gomoku.env import HINT_TT_ENTRIES, HINT_WORKERS
+from gomoku.state.server_state import GameState, server_state
+
+logger = logging.getLogger(__name__)
+
+_STONES = {"empty": 0, "black": BLACK, "white": WHITE}
+
+
+class HintServiceBusy(Exception):
+    """同时进行的搜索过多"""
+
+
+class GameNotPlaying(Exception):
+    """对局不存在或已经结束"""
+
+
+@dataclass
+class Hint:
+    result: SearchResult
+    # 搜索期间对局发生了变化，结果对应的是旧局面
+    cancelled: bool
+
+
+def board_bytes(game: GameState) -> bytes:
+    return bytes(_STONES[cell] for row in game.board for cell in row)
+
+
+class HintService:
+    """在进程池中搜索提示，进程池和置换表在第一次使用时创建"""
+
+    def __init__(self, workers: int = HINT_WORKERS, entries: int = HINT_TT_ENTRIES):
+        self.workers = workers
+        self.entries = entries
+        # 排队的搜索也占用槽位，槽位数同时限制了排队长度
+        self.max_pending = min(CANCEL_SLOTS, workers * 8)
+        self.table: SharedTranspositionTable | None = None
+        self._executor: ProcessPoolExecutor | None = None
+        self._free_slots = list(range(self.max_pending))
+
+    @property
+    def pending(self) -> int:
+        return self.max_pending - len(self._free_slots)
+
+    def _start(self):
+        self.table = SharedTranspositionTable.create(self.entries)
+        # spawn 的子进程不继承事件循环和服务器状态
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(self.table.shm.name, self.table.entries),
+        )
+        logger.info(
+            f"Started {self.workers} hint workers, "
+            f"transposition table {self.table.entries} entries"
+        )
+
+    async def hint(self, game_id: str, budget_ms: float) -> Hint:
+        """为当前轮到的一方搜索提示，对局不存在时抛出 KeyError"""
+        if not self._free_slots:
+            raise HintServiceBusy()
+        queue_id = f"hint:{uuid.uuid4()}"
+        queue, game = server_state.subscribe_game(game_id, queue_id)
+        try:
+            if game.status != "playing":
+                raise GameNotPlaying()
+            if self._executor is None:
+                self._start()
+            return await self._search(queue, game, budget_ms)
+        finally:
+            server_state.unsubscribe_game(game_id, queue_id)
+
+    async def _search(
+        self, queue: asyncio.Queue, game: GameState, budget_ms: float
+    ) -> Hint:
+        table = self.table
+        slot = self._free_slots.pop()
+        table.set_cancelled(slot, False)
+        loop = asyncio.get_running_loop()
+        work = self._executor.submit(
+            run_search,
+            board_bytes(game),
+            _STONES[game.current_turn],
+            budget_ms,
+            slot,
+        )
+        # 搜索进程停下之后才能把槽位交给下一个搜索，请求被取消时搜索可能仍在进行
+        work.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self._free_slots.append, slot)
+        )
+        future = asyncio.wrap_future(work)
+
+        cancelled = False
+        changed = asyncio.ensure_future(self._wait_for_change(queue))
+        try:
+            await asyncio.wait({future, changed}, return_when=asyncio.FIRST_COMPLETED)
+            if not future.done():
+                cancelled = True
+                table.set_cancelled(slot, True)
+            result = await future
+        except asyncio.CancelledError:
+            # 请求被取消（如客户端断开），让搜索进程尽快停下
+            table.set_cancelled(slot, True)
+            raise
+        finally:
+            changed.cancel()
+        return Hint(result=result, cancelled=cancelled)
+
+    @staticmethod
+    async def _wait_for_change(queue: asyncio.Queue):
+        """等到对局有新的落子或结束，忽略心跳等其他消息"""
+        while True:
+            event = await queue.get()
+            if getattr(event, "type", None) in ("move", "game_over"):
+                return
+
+    def close(self):
+        """停止所有进行中的搜索，等待搜索进程退出后释放置换表"""
+        if self.table is not None:
+            for slot in range(self.max_pending):
+                self.table.set_cancelled(slot, True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self.table is not None:
+            self.table.close()
+            self.table = None
+
+
+# 全局单例
+hint_service = HintService()
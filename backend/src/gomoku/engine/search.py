@@ -0,0 +1,288 @@
+"""提示搜索
+
+负极大值 + alpha-beta 剪枝的迭代加深搜索，在时间预算内逐层加深，
+返回最后一个完整搜索的深度的最佳走法。搜索结果写入共享置换表，
+同一局面之后的搜索（无论在哪个进程）从表中的结果和最佳走法开始。
+
+本模块不依赖服务器状态，由 gomoku.engine.worker 在搜索进程中调用。棋盘为 225 字节，0 空，1 黑，2 白。
+"""
+
+import random
+import time
+from dataclasses import dataclass
+
+from gomoku.engine.transposition import (
+    EXACT,
+    LOWER,
+    NO_MOVE,
+    UPPER,
+    SharedTranspositionTable,
+)
+
+BOARD_SIZE = 15
+CELLS = BOARD_SIZE * BOARD_SIZE
+
+EMPTY, BLACK, WHITE = 0, 1, 2
+
+WIN_SCORE = 10_000_000
+FIVE = 1_000_000
+# (连子数, 两端空位数) -> 分值，只看连续的棋子
+_SHAPE_SCORES = {
+    (4, 2): 100_000,
+    (4, 1): 10_000,
+    (3, 2): 5_000,
+    (3, 1): 500,
+    (2, 2): 200,
+    (2, 1): 20,
+    (1, 2): 10,
+    (1, 1): 1,
+}
+
+# 每个节点只展开分值最高的若干个走法
+BRANCHING = 10
+MAX_DEPTH = 12
+# 每搜索这么多个节点检查一次时间和取消标志。每个节点都要为候选走法打分，
+# 耗时约为零点几毫秒，检查的开销相比之下可以忽略，间隔太大会超出时间预算
+CHECK_INTERVAL = 8
+
+# 各进程使用相同的种子，局面的哈希值在进程之间一致
+_rng = random.Random(0x5EED)
+ZOBRIST = [(0, _rng.getrandbits(64), _rng.getrandbits(64)) for _ in range(CELLS)]
+
+
+def _ray(idx: int, dx: int, dy: int) -> tuple[int, ...]:
+    x, y = idx % BOARD_SIZE, idx // BOARD_SIZE
+    cells = []
+    for step in range(1, 5):
+        nx, ny = x + dx * step, y + dy * step
+        if not (0 <= nx < BOARD_SIZE and 0 <= ny < BOARD_SIZE):
+            break
+        cells.append(ny * BOARD_SIZE + nx)
+    return tuple(cells)
+
+
+# 每个格子在四个方向上的正反两条射线
+_RAYS = [
+    [
+        (_ray(idx, dx, dy), _ray(idx, -dx, -dy))
+        for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1))
+    ]
+    for idx in range(CELLS)
+]
+# 每个格子周围两格以内的格子，用于生成候选走法
+_NEIGHBORS = [
+    tuple(
+        ny * BOARD_SIZE + nx
+        for ny in range(idx // BOARD_SIZE - 2, idx // BOARD_SIZE + 3)
+        for nx in range(idx % BOARD_SIZE - 2, idx % BOARD_SIZE + 3)
+        if 0 <= nx < BOARD_SIZE and 0 <= ny < BOARD_SIZE
+    )
+    for idx in range(CELLS)
+]
+
+
+class SearchStopped(Exception):
+    """时间用完或被取消"""
+
+
+@dataclass
+class SearchResult:
+    move: int | None  # y * 15 + x，没有可走的位置时为 None
+    score: int
+    depth: int  # 完整搜索的深度
+    nodes: int
+    table_hits: int
+    book: bool = False  # 走法来自开局库，没有搜索
+
+
+def hash_board(cells: bytes) -> int:
+    key = 0
+    for idx, stone in enumerate(cells):
+        if stone:
+            key ^= ZOBRIST[idx][stone]
+    return key
+
+
+def move_value(cells: bytearray, idx: int, color: int) -> int:
+    """在 idx 落下 color 后，经过该点的四条线的分值之和"""
+    total = 0
+    for forward, backward in _RAYS[idx]:
+        count = 1
+        open_ends = 0
+        for ray in (forward, backward):
+            for cell in ray:
+                stone = cells[cell]
+                if stone == color:
+                    count += 1
+                    continue
+                if stone == EMPTY:
+                    open_ends += 1
+                break
+        if count >= 5:
+            return FIVE
+        total += _SHAPE_SCORES.get((count, open_ends), 0)
+    return total
+
+
+class Searcher:
+    def __init__(
+        self,
+        cells: bytes,
+        table: SharedTranspositionTable,
+        deadline: float,
+        slot: int | None = None,
+    ):
+        self.cells = bytearray(cells)
+        self.table = table
+        self.deadline = deadline
+        self.slot = slot
+        self.nodes = 0
+        self.stones = {idx for idx, stone in enumerate(self.cells) if stone}
+
+    def _check(self):
+        if time.perf_counter() >= self.deadline:
+            raise SearchStopped()
+        if self.slot is not None and self.table.cancelled(self.slot):
+            raise SearchStopped()
+
+    def _candidates(self) -> set[int]:
+        if not self.stones:
+            return {CELLS // 2}
+        cells = self.cells
+        return {
+            cell
+            for stone in self.stones
+            for cell in _NEIGHBORS[stone]
+            if cells[cell] == EMPTY
+        }
+
+    def _ordered_moves(self, color: int, tt_move: int) -> tuple[list[int], int, int]:
+        """返回 (按分值排序的走法, 己方最好的分值, 对方最好的分值)
+
+        己方能连五时只返回该走法；对方能连五时只返回堵住它的走法"""
+        opponent = 3 - color
+        cells = self.cells
+        scored = []
+        best_mine = best_theirs = 0
+        threats = []
+        for cell in self._candidates():
+            mine = move_value(cells, cell, color)
+            if mine >= FIVE:
+                return [cell], FIVE, 0
+            theirs = move_value(cells, cell, opponent)
+            if theirs >= FIVE:
+                threats.append(cell)
+            best_mine = max(best_mine, mine)
+            best_theirs = max(best_theirs, theirs)
+            scored.append((mine + theirs * 9 // 10, cell))
+        if threats:
+            return threats, best_mine, best_theirs
+        scored.sort(reverse=True)
+        moves = [cell for _, cell in scored[:BRANCHING]]
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        elif tt_move != NO_MOVE and cells[tt_move] == EMPTY:
+            moves.insert(0, tt_move)
+        return moves, best_mine, best_theirs
+
+    def negamax(
+        self, key: int, color: int, depth: int, alpha: int, beta: int, ply: int
+    ) -> tuple[int, int]:
+        """返回 (分值, 最佳走法)，分值以 color 方的视角计算"""
+        self.nodes += 1
+        if self.nodes % CHECK_INTERVAL == 0:
+            self._check()
+
+        original_alpha = alpha
+        tt_move = NO_MOVE
+        entry = self.table.probe(key)
+        if entry is not None:
+            tt_move = entry.move
+            if entry.depth >= depth and ply > 0:
+                if entry.flag == EXACT:
+                    return entry.score, entry.move
+                if entry.flag == LOWER:
+                    alpha = max(alpha, entry.score)
+                elif entry.flag == UPPER:
+                    beta = min(beta, entry.score)
+                if alpha >= beta:
+                    return entry.score, entry.move
+
+        moves, best_mine, best_theirs = self._ordered_moves(color, tt_move)
+        if not moves:
+            return 0, NO_MOVE
+        if best_mine >= FIVE:
+            return WIN_SCORE - ply, moves[0]
+        if depth == 0:
+            # 轮到己方走，己方的威胁比对方同等的威胁更有价值
+            return best_mine - best_theirs * 8 // 10, NO_MOVE
+
+        best_score, best_move = -WIN_SCORE * 2, moves[0]
+        cells = self.cells
+        for move in moves:
+            cells[move] = color
+            self.stones.add(move)
+            try:
+                score, _ = self.negamax(
+                    key ^ ZOBRIST[move][color],
+                    3 - color,
+                    depth - 1,
+                    -beta,
+                    -alpha,
+                    ply + 1,
+                )
+            finally:
+                cells[move] = EMPTY
+                self.stones.discard(move)
+            score = -score
+            if score > best_score:
+                best_score, best_move = score, move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.store(key, best_score, depth, flag, best_move)
+        return best_score, best_move
+
+
+def search(
+    cells: bytes,
+    color: int,
+    budget_ms: float,
+    table: SharedTranspositionTable,
+    slot: int | None = None,
+) -> SearchResult:
+    """迭代加深搜索，在时间预算内返回最后一个完整深度的结果"""
+    searcher = Searcher(
+        cells, table, time.perf_counter() + budget_ms / 1000, slot=slot
+    )
+    key = hash_board(cells)
+    hits_before = table.hits
+    # 第一层都没有搜索完时，返回静态分值最高的走法
+    moves, _, _ = searcher._ordered_moves(color, NO_MOVE)
+    result = SearchResult(
+        move=moves[0] if moves else None, score=0, depth=0, nodes=0, table_hits=0
+    )
+    for depth in range(1, MAX_DEPTH + 1):
+        try:
+            score, move = searcher.negamax(
+                key, color, depth, -WIN_SCORE * 2, WIN_SCORE * 2, 0
+            )
+        except SearchStopped:
+            break
+        result.move = None if move == NO_MOVE else move
+        result.score = score
+        result.depth = depth
+        # 已经找到必胜或必败的走法，再加深也不会改变结果
+        if abs(score) >= WIN_SCORE - MAX_DEPTH:
+            break
+    result.nodes = searcher.nodes
+    result.table_hits = table.hits - hits_before
+    return result
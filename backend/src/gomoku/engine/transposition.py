@@ -0,0 +1,107 @@
+"""共享内存中的置换表
+
+表放在 multiprocessing.shared_memory 中，所有搜索进程读写同一张表，
+不同玩家、不同进程对同一局面的提示可以复用之前的搜索结果。
+
+表不加锁。每个条目 16 字节：(key ^ data, data)，读取时用 data 还原 key 校验，
+并发写入造成的半条目校验失败，视为未命中（无锁散列）。
+
+共享内存的开头是每个搜索槽位的取消标志，之后是置换表。
+"""
+
+import struct
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+# 同时进行的搜索数上限，每个搜索占用一个取消标志
+CANCEL_SLOTS = 256
+
+EXACT = 0
+LOWER = 1  # 分数是下界（发生了 beta 截断）
+UPPER = 2  # 分数是上界（没有走法超过 alpha）
+
+NO_MOVE = 255
+
+_ENTRY = struct.Struct("<QQ")
+_SCORE_OFFSET = 1 << 31
+
+
+@dataclass
+class TableEntry:
+    score: int
+    depth: int
+    flag: int
+    move: int
+
+
+def _pack(score: int, depth: int, flag: int, move: int) -> int:
+    return (score + _SCORE_OFFSET) | depth << 32 | flag << 40 | move << 48
+
+
+def _unpack(data: int) -> TableEntry:
+    return TableEntry(
+        score=(data & 0xFFFFFFFF) - _SCORE_OFFSET,
+        depth=(data >> 32) & 0xFF,
+        flag=(data >> 40) & 0xFF,
+        move=(data >> 48) & 0xFF,
+    )
+
+
+class SharedTranspositionTable:
+    """固定大小的置换表，条目数为 2 的幂"""
+
+    def __init__(self, shm: shared_memory.SharedMemory, entries: int, owner: bool):
+        self.shm = shm
+        self.entries = entries
+        self.owner = owner
+        self._mask = entries - 1
+        self._buf = shm.buf
+        self.hits = 0
+        self.probes = 0
+
+    @staticmethod
+    def size_for(entries: int) -> int:
+        return CANCEL_SLOTS + entries * _ENTRY.size
+
+    @classmethod
+    def create(cls, entries: int) -> "SharedTranspositionTable":
+        """创建新的共享内存，entries 向上取整为 2 的幂"""
+        entries = 1 << max(entries - 1, 1).bit_length()
+        shm = shared_memory.SharedMemory(create=True, size=cls.size_for(entries))
+        return cls(shm, entries, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, entries: int) -> "SharedTranspositionTable":
+        """在搜索进程中打开已有的表，由创建者负责释放"""
+        shm = shared_memory.SharedMemory(name=name, track=False)
+        return cls(shm, entries, owner=False)
+
+    def probe(self, key: int) -> TableEntry | None:
+        self.probes += 1
+        offset = CANCEL_SLOTS + (key & self._mask) * _ENTRY.size
+        stored, data = _ENTRY.unpack_from(self._buf, offset)
+        if stored ^ data != key or data == 0:
+            return None
+        self.hits += 1
+        return _unpack(data)
+
+    def store(self, key: int, score: int, depth: int, flag: int, move: int):
+        """同一位置已有更深的同一局面时保留原条目"""
+        offset = CANCEL_SLOTS + (key & self._mask) * _ENTRY.size
+        stored, data = _ENTRY.unpack_from(self._buf, offset)
+        if stored ^ data == key and data != 0 and (data >> 32) & 0xFF > depth:
+            return
+        data = _pack(score, depth, flag, move)
+        _ENTRY.pack_into(self._buf, offset, key ^ data, data)
+
+    def cancelled(self, slot: int) -> bool:
+        return self._buf[slot] != 0
+
+    def set_cancelled(self, slot: int, value: bool):
+        self._buf[slot] = 1 if value else 0
+
+    def close(self):
+        self._buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,38 @@
+"""搜索进程
+
+进程初始化时打开共享置换表；开局库在导入时用 mmap 打开，与其他进程共享页缓存。
+局面在开局库中时直接返回开局库中局数最多的走法，不再搜索。
+"""
+
+import signal
+
+from gomoku.engine.book import opening_book
+from gomoku.engine.search import SearchResult, search
+from gomoku.engine.transposition import SharedTranspositionTable
+
+# 搜索进程中的置换表，由 init_worker 打开
+_worker_table: SharedTranspositionTable | None = None
+
+
+def init_worker(name: str, entries: int):
+    """搜索进程的初始化函数"""
+    global _worker_table
+    # 停机由主进程负责，Ctrl+C 不应该在搜索进程中抛出异常
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_table = SharedTranspositionTable.attach(name, entries)
+
+
+def run_search(cells: bytes, color: int, budget_ms: float, slot: int) -> SearchResult:
+    """在搜索进程中执行，使用进程初始化时打开的共享置换表"""
+    assert _worker_table is not None, "init_worker was not called"
+    book_moves = opening_book.lookup(cells)
+    if book_moves:
+        return SearchResult(
+            move=book_moves[0].move,
+            score=0,
+            depth=0,
+            nodes=0,
+            table_hits=0,
+            book=True,
+        )
+    return search(cells, color, budget_ms, _worker_table, slot)
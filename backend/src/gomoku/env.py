@@ -13,6 +13,11 @@ def get_env_variable(name: str) -> str:
     return value
 
 
+def get_optional_env_variable(name: str, default: str) -> str:
+    """獲取環境變量的值，如果未設置則返回默認值。"""
+    return os.getenv(name, default)
+
+
 ENV = get_env_variable("ENV")
 SQL_USER = get_env_variable("SQL_USER")
 SQL_PASSWORD = get_env_variable("SQL_PASSWORD")
@@ -20,5 +25,79 @@ SQL_HOST = get_env_variable("SQL_HOST")
 SQL_PORT = get_env_variable("SQL_PORT")
 SQL_DATABASE = get_env_variable("SQL_DATABASE")
 
+# 數據庫連接池：常駐連接數、高峰時可額外創建的連接數、等待連接的超時（秒）、連接回收時間（秒）
+SQL_POOL_SIZE = int(get_optional_env_variable("SQL_POOL_SIZE", "10"))
+SQL_MAX_OVERFLOW = int(get_optional_env_variable("SQL_MAX_OVERFLOW", "20"))
+SQL_POOL_TIMEOUT = float(get_optional_env_variable("SQL_POOL_TIMEOUT", "10"))
+SQL_POOL_RECYCLE = int(get_optional_env_variable("SQL_POOL_RECYCLE", "1800"))
+# 每個連接緩存的預編譯語句數
+SQL_STATEMENT_CACHE_SIZE = int(
+    get_optional_env_variable("SQL_STATEMENT_CACHE_SIZE", "256")
+)
+# 是否打印所有 SQL 語句
+SQL_ECHO = get_optional_env_variable("SQL_ECHO", "false").lower() == "true"
+
 JWT_SECRET = get_env_variable("JWT_SECRET")
 JWT_EXPIRE_MINUTES = int(get_env_variable("JWT_EXPIRE_MINUTES"))
+
+# 事件循環延遲超過該值（毫秒）時，新請求直接返回 503
+LOAD_SHED_LAG_MS = float(get_optional_env_variable("LOAD_SHED_LAG_MS", "250"))
+
+# SSE 空閒時發送心跳注釋的間隔（秒）
+SSE_HEARTBEAT_SECONDS = float(get_optional_env_variable("SSE_HEARTBEAT_SECONDS", "15"))
+
+# 管理接口的令牌，未設置時管理接口不可用
+ADMIN_TOKEN = get_optional_env_variable("ADMIN_TOKEN", "")
+
+# 狀態快照文件路徑，停機時寫入，啟動時恢復
+SNAPSHOT_PATH = get_optional_env_variable("SNAPSHOT_PATH", "../data/server_state.snap")
+
+# 狀態變更日誌目錄，設為空字符串則不記錄日誌
+JOURNAL_DIR = get_optional_env_variable("JOURNAL_DIR", "../data/journal")
+
+# 對局計時：基本時間和每步加秒（秒），默認基本時間為 0，即不計時，需要計時的部署顯式開啟
+GAME_MAIN_TIME_SECONDS = float(get_optional_env_variable("GAME_MAIN_TIME_SECONDS", "0"))
+GAME_INCREMENT_SECONDS = float(get_optional_env_variable("GAME_INCREMENT_SECONDS", "5"))
+
+# 已結束的對局在內存中保留的秒數，供客戶端讀取最終狀態，之後刪除
+FINISHED_GAME_RETENTION_SECONDS = float(
+    get_optional_env_variable("FINISHED_GAME_RETENTION_SECONDS", "60")
+)
+
+# 密碼哈希的線程數，以及排隊的哈希計算數上限，超過上限的登錄和註冊請求直接返回 503
+PASSWORD_HASH_WORKERS = int(get_optional_env_variable("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(
+    get_optional_env_variable("PASSWORD_HASH_MAX_PENDING", "32")
+)
+
+# 流量錄製文件路徑，設為空字符串則不錄製
+TRAFFIC_CAPTURE_PATH = get_optional_env_variable("TRAFFIC_CAPTURE_PATH", "")
+
+# 房間 ID 分配順序的隨機種子，設置後分配順序是確定的，用於重放流量
+_room_id_seed = get_optional_env_variable("ROOM_ID_SEED", "")
+ROOM_ID_SEED = int(_room_id_seed) if _room_id_seed else None
+
+# 走法提示的搜索進程數、共享置換表的條目數（取整為 2 的冪），以及單次提示的最長搜索時間（毫秒）
+HINT_WORKERS = int(get_optional_env_variable("HINT_WORKERS", "2"))
+HINT_TT_ENTRIES = int(get_optional_env_variable("HINT_TT_ENTRIES", "1048576"))
+HINT_MAX_MS = int(get_optional_env_variable("HINT_MAX_MS", "2000"))
+
+# 超過該耗時（毫秒）的請求按接口限流輸出日誌，附帶請求參數，設為 0 則不輸出
+SLOW_REQUEST_MS = float(get_optional_env_variable("SLOW_REQUEST_MS", "500"))
+
+# 開局庫文件路徑，由 scripts/build_opening_book.py 生成，文件不存在時開局庫為空
+OPENING_BOOK_PATH = get_optional_env_variable(
+    "OPENING_BOOK_PATH", "../data/opening_book.bin"
+)
+
+# 空閒對局的溢出文件路徑，內存中的對局超出預算（MiB）時，最久未使用的空閒對局移到該文件；
+# 設為空字符串則所有對局常駐內存
+GAME_SPILL_PATH = get_optional_env_variable("GAME_SPILL_PATH", "../data/games.spill")
+GAME_MEMORY_BUDGET_MB = float(get_optional_env_variable("GAME_MEMORY_BUDGET_MB", "256"))
+
+# 接口文件定義 EXECUTOR 時使用的線程池和進程池大小，以及每個接口默認的同時調用數上限（包括排隊的）
+EXECUTOR_THREAD_WORKERS = int(get_optional_env_variable("EXECUTOR_THREAD_WORKERS", "4"))
+EXECUTOR_PROCESS_WORKERS = int(get_optional_env_variable("EXECUTOR_PROCESS_WORKERS", "2"))
+EXECUTOR_MAX_CONCURRENCY = int(
+    get_optional_env_variable("EXECUTOR_MAX_CONCURRENCY", "16")
+)
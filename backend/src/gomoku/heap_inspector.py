@@ -0,0 +1,231 @@
+"""运行中服务器的内存诊断
+
+`HeapInspector` 默认关闭，由管理接口在运行时开启：
+开启后可以统计各状态容器的对象数和近似大小，并启动 tracemalloc 拍摄快照、
+比较两个快照之间按分配位置统计的差异。关闭时会停止 tracemalloc 并丢弃所有快照。
+"""
+
+import asyncio
+import logging
+import random
+import sys
+import time
+import tracemalloc
+import types
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+# 估算容器大小时抽样的元素数，平均大小乘以元素数即为近似值
+SAMPLE_SIZE = 64
+# 单个元素递归计算大小时访问的对象上限
+MAX_OBJECTS_PER_ITEM = 10_000
+# 最多保留的快照数，超出后丢弃最早的
+MAX_SNAPSHOTS = 8
+# tracemalloc 默认记录的栈帧数
+DEFAULT_FRAMES = 1
+
+# 不计入大小的共享对象，队列和任务会引用事件循环，不能沿着它们计算
+_SKIPPED_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    asyncio.AbstractEventLoop,
+    asyncio.Future,
+    logging.Logger,
+)
+
+
+def deep_sizeof(obj: Any, seen: set[int], limit: int = MAX_OBJECTS_PER_ITEM) -> int:
+    """递归计算对象及其引用对象的大小，seen 中的对象不重复计算"""
+    size = 0
+    stack = [obj]
+    while stack and len(seen) < limit:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIPPED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+        else:
+            if hasattr(obj, "__dict__"):
+                stack.append(vars(obj))
+            for slot in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+    return size
+
+
+def items_iter(container: Any) -> Iterable[Any]:
+    if isinstance(container, dict):
+        return iter(container.items())
+    return iter(container)
+
+
+def approx_size(container: Any, count: int) -> int:
+    """抽样估算容器的总大小，避免在大容器上遍历所有元素"""
+    # 只在前若干个元素中随机抽样，不复制整个容器
+    head = list(islice(items_iter(container), SAMPLE_SIZE * 4))
+    items = random.sample(head, min(SAMPLE_SIZE, len(head)))
+    if not items:
+        return sys.getsizeof(container)
+    total = sum(deep_sizeof(item, set()) for item in items)
+    return sys.getsizeof(container) + total * count // len(items)
+
+
+@dataclass
+class ContainerStats:
+    name: str
+    count: int
+    approx_bytes: int
+
+
+@dataclass
+class AllocationDiff:
+    location: str
+    size_diff: int
+    size: int
+    count_diff: int
+    count: int
+
+
+@dataclass
+class SnapshotInfo:
+    id: int
+    taken_at: float
+    traced_bytes: int
+
+
+class HeapInspector:
+    """默认关闭的内存诊断工具"""
+
+    def __init__(self):
+        self.enabled = False
+        self._snapshots: dict[int, tuple[SnapshotInfo, tracemalloc.Snapshot]] = {}
+        self._next_id = 1
+        # 由本工具启动的 tracemalloc 才由本工具停止
+        self._owns_tracemalloc = False
+
+    def enable(self, frames: int = DEFAULT_FRAMES):
+        """开启诊断并开始跟踪内存分配，frames 越大开销越高"""
+        self.enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._owns_tracemalloc = True
+        logger.info(f"Heap inspection enabled, tracing {frames} frames.")
+
+    def disable(self):
+        """关闭诊断，停止跟踪并释放所有快照"""
+        self.enabled = False
+        self._snapshots.clear()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        logger.info("Heap inspection disabled.")
+
+    def traced_memory(self) -> tuple[int, int]:
+        """tracemalloc 记录的 (当前, 峰值) 字节数，未开启时为 0"""
+        if not tracemalloc.is_tracing():
+            return 0, 0
+        return tracemalloc.get_traced_memory()
+
+    def snapshots(self) -> list[SnapshotInfo]:
+        return [info for info, _ in self._snapshots.values()]
+
+    def take_snapshot(self) -> SnapshotInfo:
+        """拍摄快照，只保留最近的 MAX_SNAPSHOTS 个"""
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            )
+        )
+        info = SnapshotInfo(
+            id=self._next_id,
+            taken_at=time.time(),
+            traced_bytes=tracemalloc.get_traced_memory()[0],
+        )
+        self._next_id += 1
+        self._snapshots[info.id] = (info, snapshot)
+        while len(self._snapshots) > MAX_SNAPSHOTS:
+            del self._snapshots[next(iter(self._snapshots))]
+        return info
+
+    def diff(
+        self, old_id: int, new_id: int, limit: int = 20, key_type: str = "lineno"
+    ) -> list[AllocationDiff] | None:
+        """按分配位置比较两个快照，返回增长最多的若干项，快照不存在时返回 None"""
+        if old_id not in self._snapshots or new_id not in self._snapshots:
+            return None
+        old = self._snapshots[old_id][1]
+        new = self._snapshots[new_id][1]
+        stats = new.compare_to(old, key_type)
+        return [
+            AllocationDiff(
+                location=" <- ".join(
+                    f"{frame.filename}:{frame.lineno}" for frame in stat.traceback
+                ),
+                size_diff=stat.size_diff,
+                size=stat.size,
+                count_diff=stat.count_diff,
+                count=stat.count,
+            )
+            for stat in stats[:limit]
+        ]
+
+    def container_stats(self, server_state, room_id_manager) -> list[ContainerStats]:
+        """统计服务器状态中各容器的对象数和近似大小"""
+        from gomoku.utils.sse import stream_registry
+
+        def stats(name: str, container: Any) -> ContainerStats:
+            count = len(container)
+            return ContainerStats(
+                name=name,
+                count=count,
+                approx_bytes=approx_size(container, count),
+            )
+
+        subscribables = [
+            *server_state._room_state.values(),
+            *server_state._game_state.values(),
+        ]
+        queues = [
+            queue for state in subscribables for queue in state._queues.values()
+        ]
+        streams = list(stream_registry)
+        return [
+            stats("player_state", server_state._player_state),
+            stats("room_state", server_state._room_state),
+            stats("game_state", server_state._game_state.hot),
+            # 磁盘上的对局在内存中只有 ID 到槽位的索引
+            stats("spilled_game_index", server_state._game_state.cold),
+            stats("subscriber_queues", queues),
+            ContainerStats(
+                name="queued_events",
+                count=sum(queue.qsize() for queue in queues),
+                approx_bytes=0,
+            ),
+            stats("sse_streams", streams),
+            stats("game_actors", server_state._game_actors),
+            stats("game_clocks", server_state._clocks),
+            stats("matchmaking_queue", server_state._matchmaking_queue._entries),
+            stats("lobby_rooms", server_state.lobby._rooms),
+            stats("lobby_watchers", server_state.lobby._watchers),
+            stats("room_id_leases", room_id_manager.allocated_ids),
+            stats("room_id_pool", room_id_manager.queue),
+        ]
+
+
+# 全局单例
+heap_inspector = HeapInspector()
@@ -8,8 +8,11 @@ from fastapi.security import APIKeyQuery, HTTPAuthorizationCredentials, HTTPBear
 from jose import ExpiredSignatureError, JWTError, jwt
 
 from gomoku.env import JWT_EXPIRE_MINUTES, JWT_SECRET
+from gomoku.utils.log_sampling import SampledLogger
 
 logger = logging.getLogger(__name__)
+# 每个 SSE 连接都会验证一次令牌，限流输出
+sampled_logger = SampledLogger(logger)
 
 SECRET_KEY = JWT_SECRET
 ALGORITHM = "HS256"
@@ -60,8 +63,8 @@ token_query = APIKeyQuery(name="token", auto_error=True)
 async def get_current_user_from_query(token: str = Security(token_query)) -> str:
     """从 query 参数 `token` 验证 JWT Token"""
     user_id = verify_token(token)
-    logger.info(f"Verifying token from query: {token}, user_id: {user_id}")
     if user_id is None:
+        sampled_logger.info("Rejected invalid token from query")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token"
         )
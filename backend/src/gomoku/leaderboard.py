@@ -0,0 +1,162 @@
+"""排行榜
+
+等级分按 1 分一格落入固定范围的槽位，用树状数组（Fenwick tree）记录每个槽位的人数，
+排名查询和更新都是 O(log 槽位数)，与玩家总数无关。同分（取整后）的玩家名次相同。
+启动时从数据库流式读取全部等级分，之后随对局结果增量更新。
+"""
+
+import logging
+import time
+from typing import Iterable
+
+from sqlalchemy import select
+
+from gomoku.sql.database import async_engine
+from gomoku.sql.models import player_ratings_table
+
+logger = logging.getLogger(__name__)
+
+# 槽位覆盖的等级分范围，超出范围的分数计入两端的槽位
+MIN_RATING = 0
+MAX_RATING = 4000
+SLOTS = MAX_RATING - MIN_RATING + 1
+
+# 启动时每批从数据库读取的行数
+LOAD_BATCH_SIZE = 10000
+
+
+def _slot_of(rating: float) -> int:
+    return min(max(round(rating) - MIN_RATING, 0), SLOTS - 1)
+
+
+class Leaderboard:
+    """支持排名查询的等级分索引"""
+
+    def __init__(self):
+        self._tree = [0] * (SLOTS + 1)  # 树状数组，下标从 1 开始
+        self._slots: dict[int, dict[str, None]] = {}  # 槽位 -> 该槽位的玩家
+        self._ratings: dict[str, float] = {}
+        self._step = 1 << SLOTS.bit_length()
+
+    def __len__(self) -> int:
+        return len(self._ratings)
+
+    def _add(self, slot: int, delta: int):
+        i = slot + 1
+        while i <= SLOTS:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_below(self, slot: int) -> int:
+        """分数低于 slot 的玩家数"""
+        total = 0
+        i = slot
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _find(self, k: int) -> int:
+        """从低到高第 k 名（从 1 开始）所在的槽位"""
+        pos = 0
+        step = self._step
+        while step:
+            nxt = pos + step
+            if nxt <= SLOTS and self._tree[nxt] < k:
+                pos = nxt
+                k -= self._tree[nxt]
+            step >>= 1
+        return pos
+
+    def update(self, player_id: str, rating: float):
+        """设置玩家的等级分"""
+        old = self._ratings.get(player_id)
+        self._ratings[player_id] = rating
+        slot = _slot_of(rating)
+        if old is not None:
+            old_slot = _slot_of(old)
+            if old_slot == slot:
+                return
+            self._remove_from_slot(player_id, old_slot)
+        self._slots.setdefault(slot, {})[player_id] = None
+        self._add(slot, 1)
+
+    def remove(self, player_id: str):
+        rating = self._ratings.pop(player_id, None)
+        if rating is not None:
+            self._remove_from_slot(player_id, _slot_of(rating))
+
+    def _remove_from_slot(self, player_id: str, slot: int):
+        players = self._slots[slot]
+        del players[player_id]
+        if not players:
+            del self._slots[slot]
+        self._add(slot, -1)
+
+    def rank(self, player_id: str) -> int | None:
+        """玩家名次，从 1 开始；不在榜上时返回 None"""
+        rating = self._ratings.get(player_id)
+        if rating is None:
+            return None
+        return len(self._ratings) - self._count_below(_slot_of(rating) + 1) + 1
+
+    def rating(self, player_id: str) -> float | None:
+        return self._ratings.get(player_id)
+
+    def top(self, n: int, offset: int = 0) -> list[tuple[int, str, float]]:
+        """从第 offset + 1 名开始的 n 名玩家，返回 (名次, 玩家 ID, 等级分)"""
+        total = len(self._ratings)
+        result: list[tuple[int, str, float]] = []
+        position = offset + 1  # 下一个要取的位置
+        while len(result) < n and position <= total:
+            slot = self._find(total - position + 1)
+            players = self._slots[slot]
+            rank = total - self._count_below(slot + 1) + 1
+            # 同一槽位内按等级分排序，名次相同
+            ordered = sorted(players, key=self._ratings.__getitem__, reverse=True)
+            skip = position - rank
+            for player_id in ordered[skip : skip + n - len(result)]:
+                result.append((rank, player_id, self._ratings[player_id]))
+            position = rank + len(players)
+        return result
+
+    def load(self, rows: Iterable[tuple[str, float]]):
+        """批量加入玩家，最后以 O(槽位数) 重建树状数组"""
+        for player_id, rating in rows:
+            old = self._ratings.get(player_id)
+            if old is not None:
+                self._slots[_slot_of(old)].pop(player_id)
+            self._ratings[player_id] = rating
+            self._slots.setdefault(_slot_of(rating), {})[player_id] = None
+        self._slots = {slot: players for slot, players in self._slots.items() if players}
+        tree = [0] * (SLOTS + 1)
+        for slot, players in self._slots.items():
+            tree[slot + 1] = len(players)
+        for i in range(1, SLOTS + 1):
+            parent = i + (i & -i)
+            if parent <= SLOTS:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+
+async def load_leaderboard(board: "Leaderboard") -> int:
+    """从数据库流式读取全部等级分，返回读取的行数"""
+    start = time.perf_counter()
+    count = 0
+    # 服务端游标需要在事务中使用，不能用自动提交的只读连接
+    async with async_engine.connect() as conn:
+        result = await conn.stream(
+            select(player_ratings_table.c.player_id, player_ratings_table.c.rating)
+        )
+        async for partition in result.partitions(LOAD_BATCH_SIZE):
+            board.load((row.player_id, row.rating) for row in partition)
+            count += len(partition)
+    logger.info(
+        f"Loaded {count} ratings into leaderboard "
+        f"in {(time.perf_counter() - start) * 1000:.1f}ms"
+    )
+    return count
+
+
+# 全局单例
+leaderboard = Leaderboard()
@@ -1,4 +1,5 @@
 import logging
+from contextlib import asynccontextmanager
 from dataclasses import asdict
 from pathlib import Path
 from typing import Literal
@@ -12,23 +13,99 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 from gomoku.api_loader import load_api_routes
+from gomoku.engine.hints import hint_service
+from gomoku.env import (
+    GAME_MEMORY_BUDGET_MB,
+    GAME_SPILL_PATH,
+    JOURNAL_DIR,
+    SNAPSHOT_PATH,
+    TRAFFIC_CAPTURE_PATH,
+)
 from gomoku.jwt import get_current_user
+from gomoku.leaderboard import leaderboard, load_leaderboard
+from gomoku.match_history import match_history_writer
+from gomoku.offload import endpoint_executor
+from gomoku.passwords import password_hasher
+from gomoku.rate_limit import LoadSheddingMiddleware
+from gomoku.rating import rating_store
+from gomoku.state.journal import Journal, replay_journal
+from gomoku.state.room_id_manager import room_id_manager
 from gomoku.state.server_state import server_state
+from gomoku.state.snapshot import (
+    decode_spilled_game,
+    encode_spilled_game,
+    restore_snapshot,
+    write_snapshot,
+)
+from gomoku.state.traffic import TrafficRecorder
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动时从快照恢复状态并重放之后的日志，停机时排空并写入快照
+    snapshot_path = Path(SNAPSHOT_PATH)
+    generation = 0
+    # 在恢复之前启用，恢复大量对局时超出预算的部分直接写入磁盘
+    if GAME_SPILL_PATH:
+        server_state.enable_game_spill(
+            Path(GAME_SPILL_PATH),
+            int(GAME_MEMORY_BUDGET_MB * 2**20),
+            encode_spilled_game,
+            decode_spilled_game,
+        )
+    if snapshot_path.exists():
+        stats = restore_snapshot(server_state, room_id_manager, snapshot_path)
+        generation = stats.journal_generation
+    if JOURNAL_DIR:
+        journal_dir = Path(JOURNAL_DIR)
+        replay_journal(server_state, journal_dir, generation)
+        server_state.journal = Journal(journal_dir, generation)
+    try:
+        await load_leaderboard(leaderboard)
+    except Exception:
+        logger.error("Failed to load leaderboard, starting empty", exc_info=True)
+    # 重放完成后再注册，避免重复计算已结束对局的等级分
+    server_state.game_finished_listeners.append(rating_store.on_game_finished)
+    server_state.game_finished_listeners.append(match_history_writer.on_game_finished)
+    # 同样在重放之后开始录制，只录制本次运行收到的调用
+    recorder = None
+    if TRAFFIC_CAPTURE_PATH:
+        recorder = TrafficRecorder(Path(TRAFFIC_CAPTURE_PATH))
+        recorder.attach(server_state)
+    yield
+    if recorder is not None:
+        await recorder.close()
+    server_state.start_draining()
+    write_snapshot(server_state, room_id_manager, snapshot_path)
+    server_state.close_game_spill()
+    if server_state.journal is not None:
+        await server_state.journal.close()
+    await rating_store.close()
+    await match_history_writer.close()
+    password_hasher.close()
+    hint_service.close()
+    endpoint_executor.close()
+
+
 app = FastAPI(
     title="五子棋游戏服务器",
     description="五子棋游戏服务器",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # 开发环境允许所有来源的请求
 origins = ["*"]
 
+# 事件循环过载时尽早拒绝请求。后添加的中间件在外层，先添加它，
+# 让 CORS 包在外面，浏览器才能读到 503 和 Retry-After
+app.add_middleware(LoadSheddingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -0,0 +1,195 @@
+"""对局历史
+
+对局结束后为双方各生成一行记录，由后台任务批量写入 player_games 表，
+写入失败的记录会留到下一批重试。
+
+查询使用 (finished_at, game_id) 作为游标的键集分页：每页都从主键索引上的
+游标位置开始向前扫描 limit 行，与页码无关，不会像 OFFSET 一样越翻越慢。
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from gomoku.sql.database import async_engine
+from gomoku.sql.models import player_games_table
+from gomoku.state.server_state import GameState
+
+logger = logging.getLogger(__name__)
+
+# 批量写入的间隔，单位秒
+FLUSH_INTERVAL = 2.0
+
+_columns = player_games_table.c
+_HISTORY_COLUMNS = (
+    _columns.finished_at,
+    _columns.game_id,
+    _columns.opponent_id,
+    _columns.color,
+    _columns.result,
+    _columns.reason,
+    _columns.moves,
+)
+_ORDER = (_columns.finished_at.desc(), _columns.game_id.desc())
+
+# 第一页和之后的页各构造一次，只有参数不同
+_SELECT_FIRST_PAGE = (
+    select(*_HISTORY_COLUMNS)
+    .where(_columns.player_id == bindparam("player_id"))
+    .order_by(*_ORDER)
+    .limit(bindparam("limit"))
+)
+_SELECT_NEXT_PAGE = (
+    select(*_HISTORY_COLUMNS)
+    .where(
+        _columns.player_id == bindparam("player_id"),
+        tuple_(_columns.finished_at, _columns.game_id)
+        < tuple_(bindparam("finished_at"), bindparam("game_id")),
+    )
+    .order_by(*_ORDER)
+    .limit(bindparam("limit"))
+)
+
+
+@dataclass
+class HistoryEntry:
+    game_id: str
+    finished_at: datetime
+    opponent_id: str
+    color: str
+    result: str  # win / loss / draw
+    reason: str
+    moves: bytes
+
+
+def encode_cursor(entry: HistoryEntry) -> str:
+    return f"{entry.finished_at.isoformat()}_{entry.game_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str] | None:
+    """格式不正确时返回 None"""
+    finished_at, sep, game_id = cursor.partition("_")
+    if not sep or not game_id:
+        return None
+    try:
+        return datetime.fromisoformat(finished_at), game_id
+    except ValueError:
+        return None
+
+
+def history_rows(game: GameState, finished_at: datetime) -> list[dict]:
+    """对局结束时为双方各生成一行"""
+    moves = bytes(game.moves)
+    rows = []
+    for color, player, opponent in (
+        ("black", game.black_player_id, game.white_player_id),
+        ("white", game.white_player_id, game.black_player_id),
+    ):
+        if game.winner is None:
+            result = "draw"
+        else:
+            result = "win" if game.winner == color else "loss"
+        rows.append(
+            {
+                "player_id": player,
+                "finished_at": finished_at,
+                "game_id": game.id,
+                "opponent_id": opponent,
+                "color": color,
+                "result": result,
+                "reason": game.reason or "draw",
+                "moves": moves,
+            }
+        )
+    return rows
+
+
+async def load_history(
+    conn: AsyncConnection,
+    player_id: str,
+    limit: int,
+    after: tuple[datetime, str] | None = None,
+) -> list[HistoryEntry]:
+    """按结束时间从新到旧读取玩家的对局，after 为上一页最后一条的游标
+
+    conn 应为只读连接（get_readonly_connection），不开启事务"""
+    params = {"player_id": player_id, "limit": limit}
+    if after is None:
+        stmt = _SELECT_FIRST_PAGE
+    else:
+        stmt = _SELECT_NEXT_PAGE
+        params["finished_at"], params["game_id"] = after
+    result = await conn.execute(stmt, params)
+    return [
+        HistoryEntry(
+            game_id=row.game_id,
+            finished_at=row.finished_at,
+            opponent_id=row.opponent_id,
+            color=row.color,
+            result=row.result,
+            reason=row.reason,
+            moves=row.moves,
+        )
+        for row in result
+    ]
+
+
+class MatchHistoryWriter:
+    """对局历史的批量写入"""
+
+    def __init__(self):
+        self._rows: list[dict] = []
+        self._pending = asyncio.Event()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    def on_game_finished(self, game: GameState):
+        # 与 DateTime 列一致，使用不带时区的 UTC 时间
+        finished_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        self._rows.extend(history_rows(game, finished_at))
+        self._pending.set()
+
+    async def flush(self):
+        """把所有未写入的记录写入数据库"""
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        # 重试时可能重复写入同一行
+        stmt = insert(player_games_table).on_conflict_do_nothing()
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(stmt, rows)
+        except Exception:
+            self._rows = rows + self._rows
+            raise
+        logger.info(f"Wrote {len(rows)} match history rows")
+
+    async def close(self):
+        self._flush_task.cancel()
+        try:
+            await self.flush()
+        except Exception:
+            logger.error("Failed to write match history on close", exc_info=True)
+
+    async def _flush_loop(self):
+        while True:
+            await self._pending.wait()
+            # 等待一段时间，把更多对局合并到同一批
+            await asyncio.sleep(FLUSH_INTERVAL)
+            self._pending.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.error("Failed to write match history", exc_info=True)
+                self._pending.set()
+
+    def __del__(self):
+        self._flush_task.cancel()
+
+
+# 全局单例
+match_history_writer = MatchHistoryWriter()
@@ -0,0 +1,134 @@
+"""在有界的线程池或进程池中执行接口的 handle
+
+接口文件定义 `EXECUTOR = "thread"` 或 `"process"` 时，handle 为普通函数（def），
+认证、限流等依赖仍在事件循环上解析，只有 handle 本身在池中执行：
+
+- thread: 所有接口共享一个线程池，适合释放 GIL 的计算（哈希、压缩）或同步 I/O。
+  handle 与事件循环并行执行，不要修改服务器状态
+- process: 所有接口共享一个 spawn 的进程池，适合纯 Python 的计算。参数和返回值
+  必须可以 pickle，进程中没有服务器状态，需要的数据由参数或依赖传入
+
+每个接口已提交但尚未完成的调用数（包括排队的）不超过 `MAX_CONCURRENCY`，超过时
+直接返回 503，一个慢接口不会占满整个池。从提交到开始执行的时间记录为 queue 阶段。
+"""
+
+import asyncio
+import functools
+import importlib
+import inspect
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+
+from gomoku.env import EXECUTOR_PROCESS_WORKERS, EXECUTOR_THREAD_WORKERS
+from gomoku.tracing import current_trace
+
+logger = logging.getLogger(__name__)
+
+EXECUTORS = ("thread", "process")
+
+
+def _timed_call(fn, kwargs: dict):
+    """在池中执行，返回 (开始执行的时间, 结果)
+
+    time.monotonic 在 Linux 上是系统范围的时钟，可以与其他进程中的时间相减"""
+    return time.monotonic(), fn(**kwargs)
+
+
+async def _import_modules(modules: tuple[str, ...]):
+    for module in modules:
+        importlib.import_module(module)
+
+
+def init_process_worker(modules: tuple[str, ...]):
+    """导入接口文件，pickle 按模块和名称引用 handle
+
+    接口文件导入的全局单例需要事件循环，导入完成后 asyncio.run 会取消它们的后台任务"""
+    asyncio.run(_import_modules(modules))
+
+
+class EndpointExecutor:
+    """接口共享的线程池和进程池，各自在第一次使用时创建"""
+
+    def __init__(
+        self,
+        thread_workers: int = EXECUTOR_THREAD_WORKERS,
+        process_workers: int = EXECUTOR_PROCESS_WORKERS,
+    ):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self._threads: ThreadPoolExecutor | None = None
+        self._processes: ProcessPoolExecutor | None = None
+        # 进程池的工作进程需要导入的接口文件
+        self._process_modules: list[str] = []
+        # 接口 -> 已提交但尚未完成的调用数，包括正在执行的
+        self.pending: dict[str, int] = {}
+
+    def _pool(self, kind: str) -> Executor:
+        if kind == "thread":
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(
+                    max_workers=self.thread_workers, thread_name_prefix="endpoint"
+                )
+            return self._threads
+        if self._processes is None:
+            # spawn 的子进程不继承事件循环和服务器状态
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_process_worker,
+                initargs=(tuple(self._process_modules),),
+            )
+            logger.info(f"Started {self.process_workers} endpoint worker processes")
+        return self._processes
+
+    def _release(self, endpoint: str):
+        self.pending[endpoint] -= 1
+
+    def wrap(self, handle, kind: str, endpoint: str, max_concurrency: int):
+        """把普通函数 handle 包装为在池中执行的异步 handler"""
+        if kind not in EXECUTORS:
+            raise ValueError(f"未知的 EXECUTOR {kind!r}，可选 {EXECUTORS}")
+        if inspect.iscoroutinefunction(handle):
+            raise ValueError("定义了 EXECUTOR 的 handle 必须是普通函数（def）")
+        if kind == "process":
+            self._process_modules.append(handle.__module__)
+        self.pending[endpoint] = 0
+
+        @functools.wraps(handle)
+        async def offloaded_handler(**kwargs):
+            if self.pending[endpoint] >= max_concurrency:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many requests in progress.",
+                    headers={"Retry-After": "1"},
+                )
+            loop = asyncio.get_running_loop()
+            self.pending[endpoint] += 1
+            submitted = time.monotonic()
+            work = self._pool(kind).submit(_timed_call, handle, kwargs)
+            # 调用结束之后才归还名额，请求被取消时调用可能仍在执行
+            work.add_done_callback(
+                lambda _: loop.call_soon_threadsafe(self._release, endpoint)
+            )
+            started, result = await asyncio.wrap_future(work)
+            trace = current_trace.get()
+            if trace is not None:
+                trace.queue = max(started - submitted, 0.0)
+            return result
+
+        return offloaded_handler
+
+    def close(self):
+        """取消排队的调用，等待工作进程执行完当前调用后退出"""
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=True, cancel_futures=True)
+
+
+# 全局单例
+endpoint_executor = EndpointExecutor()
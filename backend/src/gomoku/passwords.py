@@ -0,0 +1,120 @@
+"""密码哈希
+
+使用 hashlib.scrypt，它在计算时释放 GIL，因此放在线程池中执行就不会阻塞事件循环。
+线程数限制同时进行的哈希计算，排队的请求数超过上限时直接拒绝，
+登录高峰时只有登录请求变慢或失败，SSE 推送和其他请求不受影响。
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from gomoku.env import PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_WORKERS
+
+# scrypt 参数：每次计算约占用 128 * N * r = 16 MiB 内存
+SCRYPT_N = 2**14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# 存储格式：scrypt$N$r$p$salt$hash，salt 和 hash 为 base64
+SCHEME = "scrypt"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode(),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=256 * n * r,
+        dklen=KEY_BYTES,
+    )
+
+
+def hash_password(password: str) -> str:
+    """计算密码哈希，耗时较长，不要在事件循环上直接调用"""
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return "$".join(
+        [
+            SCHEME,
+            str(SCRYPT_N),
+            str(SCRYPT_R),
+            str(SCRYPT_P),
+            _b64encode(salt),
+            _b64encode(key),
+        ]
+    )
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    """校验密码，使用哈希中记录的参数，格式不正确时返回 False"""
+    try:
+        scheme, n, r, p, salt, key = encoded.split("$")
+        if scheme != SCHEME:
+            return False
+        expected = base64.b64decode(key)
+        actual = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+class PasswordHasherBusy(Exception):
+    """排队的哈希计算过多"""
+
+
+class PasswordHasher:
+    """在有界线程池中计算和校验密码哈希"""
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+    ):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        # 已提交但尚未完成的计算数，包括正在执行的
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self):
+        self._pending -= 1
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            raise PasswordHasherBusy()
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        work = self._executor.submit(fn, *args)
+        # 计算结束之后才归还名额，请求被取消时计算可能仍在排队或执行
+        work.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return await asyncio.wrap_future(work)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, password: str, encoded: str) -> bool:
+        return await self._run(verify_password, password, encoded)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 全局单例
+password_hasher = PasswordHasher()
@@ -0,0 +1,207 @@
+"""限流与过载保护
+
+- 按玩家 ID 和 IP 的令牌桶限流，由 api 模块中的 `RATE_LIMIT` 配置
+- 每个玩家同时打开的 SSE 流数量上限，由 `MAX_STREAMS_PER_PLAYER` 配置
+- 事件循环延迟过高时，在中间件中直接返回 503
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from fastapi import HTTPException, status
+
+from gomoku.env import LOAD_SHED_LAG_MS
+
+logger = logging.getLogger(__name__)
+
+# 同一 IP 下可能有多个玩家（NAT），IP 桶的容量和速率按该倍数放大
+IP_LIMIT_FACTOR = 10
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """端点的令牌桶限流配置"""
+
+    rate: float  # 每秒补充的令牌数
+    burst: int  # 桶容量，即允许的突发请求数
+
+
+class TokenBucketLimiter:
+    """令牌桶限流器，令牌在访问时按时间差惰性补充"""
+
+    def __init__(self):
+        # key -> [剩余令牌, 上次补充时间, 桶满所需秒数]
+        self._buckets: dict[tuple[str, str, str], list[float]] = {}
+        self._cleanup_task = asyncio.create_task(self._cleanup_idle_buckets())
+
+    def try_acquire(
+        self, endpoint: str, kind: str, key: str, rate: float, burst: float
+    ) -> bool:
+        """尝试取出一个令牌，返回是否成功"""
+        now = time.monotonic()
+        bucket_key = (endpoint, kind, key)
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = [burst, now, burst / rate]
+            self._buckets[bucket_key] = bucket
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def check(self, endpoint: str, limit: RateLimit, ip: str | None, player_id=None):
+        """检查玩家和 IP 两个维度的令牌桶，任一耗尽则返回 429"""
+        if player_id is not None and not self.try_acquire(
+            endpoint, "player", player_id, limit.rate, limit.burst
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests.",
+            )
+        if ip is not None and not self.try_acquire(
+            endpoint,
+            "ip",
+            ip,
+            limit.rate * IP_LIMIT_FACTOR,
+            limit.burst * IP_LIMIT_FACTOR,
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests.",
+            )
+
+    async def _cleanup_idle_buckets(self):
+        """定期删除已经补满的桶，它们与新建的桶没有区别"""
+        while True:
+            await asyncio.sleep(60)
+            now = time.monotonic()
+            idle_keys = [
+                key
+                for key, (_, last, refill_time) in self._buckets.items()
+                if now - last > refill_time
+            ]
+            for key in idle_keys:
+                del self._buckets[key]
+
+    def __del__(self):
+        self._cleanup_task.cancel()
+
+
+class StreamSlot:
+    """一个已占用的 SSE 流名额，release 可重复调用"""
+
+    def __init__(self, limiter: "StreamLimiter", player_id: str):
+        self._limiter = limiter
+        self._player_id = player_id
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._limiter._release(self._player_id)
+
+
+class StreamLimiter:
+    """限制每个玩家同时打开的 SSE 流数量"""
+
+    def __init__(self):
+        self._counts: dict[str, int] = {}
+
+    def acquire(self, player_id: str, max_streams: int) -> StreamSlot | None:
+        count = self._counts.get(player_id, 0)
+        if count >= max_streams:
+            return None
+        self._counts[player_id] = count + 1
+        return StreamSlot(self, player_id)
+
+    def _release(self, player_id: str):
+        count = self._counts.get(player_id, 0) - 1
+        if count > 0:
+            self._counts[player_id] = count
+        else:
+            self._counts.pop(player_id, None)
+
+    def wrap_body(
+        self, body: AsyncIterator[bytes], slot: StreamSlot
+    ) -> AsyncIterator[bytes]:
+        """流结束或被丢弃时归还名额"""
+
+        async def iterate():
+            try:
+                async for chunk in body:
+                    yield chunk
+            finally:
+                slot.release()
+
+        wrapped = iterate()
+        # 如果连接在开始迭代前就断开，生成器的 finally 不会执行
+        weakref.finalize(wrapped, slot.release)
+        return wrapped
+
+
+class LoopLagMonitor:
+    """通过定时睡眠的超时量估算事件循环延迟"""
+
+    INTERVAL = 0.1  # 采样间隔，单位秒
+
+    def __init__(self):
+        self.lag = 0.0  # 最近一次采样的延迟，单位秒
+        self._task = asyncio.create_task(self._monitor())
+
+    @property
+    def overloaded(self) -> bool:
+        return self.lag * 1000 > LOAD_SHED_LAG_MS
+
+    async def _monitor(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.INTERVAL)
+            lag = loop.time() - start - self.INTERVAL
+            if lag * 1000 > LOAD_SHED_LAG_MS and not self.overloaded:
+                logger.warning(f"Event loop lag {lag * 1000:.0f}ms, shedding load")
+            self.lag = max(lag, 0.0)
+
+    def __del__(self):
+        self._task.cancel()
+
+
+class LoadSheddingMiddleware:
+    """事件循环过载时直接拒绝新的 HTTP 请求，不进入路由和依赖解析"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and loop_lag_monitor.overloaded:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": status.HTTP_503_SERVICE_UNAVAILABLE,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"retry-after", b"1"),
+                    ],
+                }
+            )
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": b'{"detail":"Server overloaded."}',
+                }
+            )
+            return
+        await self.app(scope, receive, send)
+
+
+# 全局单例
+rate_limiter = TokenBucketLimiter()
+stream_limiter = StreamLimiter()
+loop_lag_monitor = LoopLagMonitor()
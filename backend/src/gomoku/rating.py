@@ -0,0 +1,194 @@
+"""玩家等级分（Elo）
+
+等级分缓存在内存中，匹配时直接读取。对局结果按结束顺序排队，
+后台任务先从数据库读取缓存中没有的玩家等级分，再计算并更新缓存，
+读取失败时稍后重试，不会用默认等级分覆盖数据库中的记录。
+另一个后台任务把一段时间内的变更合并成一条批量 upsert 写入数据库，
+写入失败的变更会留到下一批重试。
+"""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import func
+
+from gomoku.leaderboard import leaderboard
+from gomoku.sql.database import async_engine, readonly_engine
+from gomoku.sql.models import player_ratings_table
+from gomoku.state.matchmaking import DEFAULT_RATING
+from gomoku.state.server_state import GameState
+
+logger = logging.getLogger(__name__)
+
+# 新玩家分数变化更快
+PROVISIONAL_GAMES = 30
+K_PROVISIONAL = 40.0
+K_ESTABLISHED = 20.0
+
+# 批量写入的间隔，单位秒
+FLUSH_INTERVAL = 2.0
+
+
+@dataclass
+class Rating:
+    rating: float = DEFAULT_RATING
+    games: int = 0
+
+    @property
+    def k(self) -> float:
+        return K_PROVISIONAL if self.games < PROVISIONAL_GAMES else K_ESTABLISHED
+
+
+def expected_score(rating: float, opponent: float) -> float:
+    return 1.0 / (1.0 + 10.0 ** ((opponent - rating) / 400.0))
+
+
+def update_elo(a: Rating, b: Rating, score_a: float) -> tuple[Rating, Rating]:
+    """score_a 为 a 方得分：胜 1，和 0.5，负 0"""
+    expected_a = expected_score(a.rating, b.rating)
+    new_a = Rating(a.rating + a.k * (score_a - expected_a), a.games + 1)
+    new_b = Rating(b.rating + b.k * (expected_a - score_a), b.games + 1)
+    return new_a, new_b
+
+
+class RatingStore:
+    """等级分缓存和批量写入"""
+
+    def __init__(self):
+        self._ratings: dict[str, Rating] = {}
+        self._dirty: set[str] = set()
+        self._pending = asyncio.Event()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        # 尚未计算的对局结果 (黑方, 白方, 黑方得分)，按结束顺序排列
+        self._results: deque[tuple[str, str, float]] = deque()
+        self._results_ready = asyncio.Event()
+        self._apply_task = asyncio.create_task(self._apply_loop())
+
+    async def fetch(self, player_id: str) -> Rating:
+        """读取玩家等级分并缓存，已缓存时不访问数据库，查询失败时抛出异常"""
+        rating = self._ratings.get(player_id)
+        if rating is not None:
+            return rating
+        async with readonly_engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    select(
+                        player_ratings_table.c.rating, player_ratings_table.c.games
+                    ).where(player_ratings_table.c.player_id == player_id)
+                )
+            ).first()
+        rating = Rating() if row is None else Rating(row.rating, row.games)
+        # 查询期间可能已有对局结果写入缓存
+        return self._ratings.setdefault(player_id, rating)
+
+    async def load(self, player_id: str) -> Rating:
+        """读取玩家等级分，查询失败时返回默认等级分，但不写入缓存"""
+        try:
+            return await self.fetch(player_id)
+        except Exception:
+            logger.warning(f"Failed to load rating of {player_id}", exc_info=True)
+            return Rating()
+
+    def on_game_finished(self, game: GameState):
+        """对局结束后排队更新双方等级分"""
+        if game.winner is None:
+            score = 0.5
+        else:
+            score = 1.0 if game.winner == "black" else 0.0
+        self._results.append((game.black_player_id, game.white_player_id, score))
+        self._results_ready.set()
+
+    async def _apply_next(self):
+        """计算最早的一局结果，双方等级分都读取成功后才出队，失败时抛出异常"""
+        black, white, score = self._results[0]
+        black_rating = await self.fetch(black)
+        white_rating = await self.fetch(white)
+        self._results.popleft()
+        new_black, new_white = update_elo(black_rating, white_rating, score)
+        self._ratings[black] = new_black
+        self._ratings[white] = new_white
+        leaderboard.update(black, new_black.rating)
+        leaderboard.update(white, new_white.rating)
+        self._dirty.update((black, white))
+        self._pending.set()
+
+    async def flush(self):
+        """把所有未写入的变更写入数据库"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        rows = [
+            {
+                "player_id": player_id,
+                "rating": self._ratings[player_id].rating,
+                "games": self._ratings[player_id].games,
+            }
+            for player_id in dirty
+        ]
+        stmt = insert(player_ratings_table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[player_ratings_table.c.player_id],
+            set_={
+                "rating": stmt.excluded.rating,
+                "games": stmt.excluded.games,
+                "updated_at": func.now(),
+            },
+        )
+        try:
+            async with async_engine.begin() as conn:
+                await conn.execute(stmt, rows)
+        except Exception:
+            self._dirty |= dirty
+            raise
+        logger.info(f"Wrote {len(rows)} rating updates")
+
+    async def close(self):
+        self._apply_task.cancel()
+        self._flush_task.cancel()
+        try:
+            while self._results:
+                await self._apply_next()
+        except Exception:
+            logger.error(
+                f"Dropping {len(self._results)} game results on close", exc_info=True
+            )
+        try:
+            await self.flush()
+        except Exception:
+            logger.error("Failed to write rating updates on close", exc_info=True)
+
+    async def _flush_loop(self):
+        while True:
+            await self._pending.wait()
+            # 等待一段时间，把更多对局结果合并到同一批
+            await asyncio.sleep(FLUSH_INTERVAL)
+            self._pending.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.error("Failed to write rating updates", exc_info=True)
+                self._pending.set()
+
+    async def _apply_loop(self):
+        while True:
+            await self._results_ready.wait()
+            self._results_ready.clear()
+            while self._results:
+                try:
+                    await self._apply_next()
+                except Exception:
+                    # 保持顺序，同一玩家后面的对局要在这一局之后计算
+                    logger.error("Failed to load ratings, retrying", exc_info=True)
+                    await asyncio.sleep(FLUSH_INTERVAL)
+
+    def __del__(self):
+        self._flush_task.cancel()
+        self._apply_task.cancel()
+
+
+# 全局单例
+rating_store = RatingStore()
@@ -1,8 +1,19 @@
 # models.py
-from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    Integer,
+    LargeBinary,
+    MetaData,
+    PrimaryKeyConstraint,
+    String,
+    Table,
+)
 from sqlalchemy.sql import func
 
-from backend.src.gomoku.utils.not_null_column import NotNullColumn
+from gomoku.utils.not_null_column import NotNullColumn
 
 # MetaData 對象是所有表定義的容器
 metadata = MetaData()
@@ -18,3 +29,37 @@ users_table = Table(
     NotNullColumn("created_at", DateTime, server_default=func.now()),
     NotNullColumn("updated_at", DateTime),
 )
+
+# 定義玩家等級分表，以玩家 ID（JWT 中的 sub）為主鍵
+player_ratings_table = Table(
+    "player_ratings",
+    metadata,
+    NotNullColumn("player_id", String(64), primary_key=True),
+    NotNullColumn("rating", Float),
+    NotNullColumn("games", Integer, server_default="0"),
+    NotNullColumn("updated_at", DateTime, server_default=func.now()),
+)
+
+# 定義對局歷史表，每局對局為雙方各寫一行
+# 主鍵 (player_id, finished_at, game_id) 同時是分頁的鍵，INCLUDE 其餘列構成覆蓋索引，
+# 歷史查詢只需掃描索引，不訪問表數據
+player_games_table = Table(
+    "player_games",
+    metadata,
+    NotNullColumn("player_id", String(64)),
+    NotNullColumn("finished_at", DateTime),
+    NotNullColumn("game_id", String(36)),
+    NotNullColumn("opponent_id", String(64)),
+    NotNullColumn("color", String(5)),
+    NotNullColumn("result", String(4)),
+    NotNullColumn("reason", String(8)),
+    # 落子順序，每步一個字節：y * 15 + x
+    NotNullColumn("moves", LargeBinary),
+    PrimaryKeyConstraint(
+        "player_id",
+        "finished_at",
+        "game_id",
+        name="pk_player_games",
+        postgresql_include=["opponent_id", "color", "result", "reason", "moves"],
+    ),
+)
@@ -0,0 +1,149 @@
+# users.py
+"""users 表的讀寫，按 ID 讀取用戶經過帶過期時間的進程內緩存"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.sql import func
+
+from gomoku.sql.database import async_engine
+from gomoku.sql.models import users_table
+
+# 緩存條目的有效期（秒）和最大條目數
+USER_CACHE_TTL = 60.0
+USER_CACHE_MAX_SIZE = 10000
+
+# 熱點查詢只構造一次，SQLAlchemy 的編譯緩存和 asyncpg 的預編譯語句緩存都能命中
+_SELECT_USER = select(
+    users_table.c.id,
+    users_table.c.name,
+    users_table.c.email,
+    users_table.c.created_at,
+).where(users_table.c.id == bindparam("user_id"))
+_SELECT_USER_BY_NAME = select(users_table.c.id, users_table.c.password_hash).where(
+    users_table.c.name == bindparam("name")
+)
+
+
+class UserCache:
+    """用戶行的 TTL + LRU 緩存，不包含密碼哈希
+
+    創建或更新用戶後調用 invalidate。同一用戶的並發查詢只訪問一次數據庫；
+    invalidate 會移除進行中的查詢，失效前開始的查詢結果不會寫入緩存。"""
+
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_size: int = USER_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[int, tuple[float, Row | None]] = OrderedDict()
+        self._inflight: dict[int, asyncio.Future[Row | None]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, user_id: int) -> tuple[bool, Row | None]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return False, None
+        expires_at, row = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return False, None
+        self._entries.move_to_end(user_id)
+        return True, row
+
+    def _store(self, user_id: int, row: Row | None):
+        self._entries[user_id] = (time.monotonic() + self.ttl, row)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get(self, conn: AsyncConnection, user_id: int) -> Row | None:
+        found, row = self._lookup(user_id)
+        if found:
+            self.hits += 1
+            return row
+        self.misses += 1
+        inflight = self._inflight.get(user_id)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        future: asyncio.Future[Row | None] = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = future
+        try:
+            result = await conn.execute(_SELECT_USER, {"user_id": user_id})
+            row = result.first()
+        except BaseException as e:
+            if self._inflight.get(user_id) is future:
+                del self._inflight[user_id]
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # 沒有其他等待者時避免 "exception was never retrieved" 警告
+                future.exception()
+            raise
+        # 查詢期間調用過 invalidate 時，future 已被移除，結果可能是舊數據
+        if self._inflight.get(user_id) is future:
+            del self._inflight[user_id]
+            self._store(user_id, row)
+        future.set_result(row)
+        return row
+
+    def invalidate(self, user_id: int):
+        self._entries.pop(user_id, None)
+        # 之後的讀取重新查詢，不再等待失效前發出的查詢
+        self._inflight.pop(user_id, None)
+
+
+async def get_user(conn: AsyncConnection, user_id: int) -> Row | None:
+    """按 ID 讀取用戶（不含密碼哈希），優先使用緩存"""
+    return await user_cache.get(conn, user_id)
+
+
+async def get_login(conn: AsyncConnection, name: str) -> Row | None:
+    """按用戶名讀取 ID 和密碼哈希，不經過緩存，總是讀到最新的密碼"""
+    result = await conn.execute(_SELECT_USER_BY_NAME, {"name": name})
+    return result.first()
+
+
+async def create_user(name: str, email: str, password_hash: str) -> int | None:
+    """在獨立事務中創建用戶，返回新用戶的 ID，用戶名或郵箱已存在時返回 None"""
+    try:
+        async with async_engine.begin() as conn:
+            result = await conn.execute(
+                insert(users_table)
+                .values(
+                    name=name,
+                    email=email,
+                    password_hash=password_hash,
+                    updated_at=func.now(),
+                )
+                .returning(users_table.c.id)
+            )
+            user_id = result.scalar_one()
+    except IntegrityError:
+        return None
+    # 創建前查詢過該 ID 時，緩存中是不存在的結果
+    user_cache.invalidate(user_id)
+    return user_id
+
+
+async def update_user(user_id: int, **values: Any) -> bool:
+    """在獨立事務中更新用戶，提交後使緩存失效，返回是否找到該用戶"""
+    async with async_engine.begin() as conn:
+        result = await conn.execute(
+            update(users_table)
+            .where(users_table.c.id == user_id)
+            .values(**values, updated_at=func.now())
+        )
+    # 提交之後再失效，否則並發讀取可能把提交前的舊數據重新放入緩存
+    user_cache.invalidate(user_id)
+    return result.rowcount > 0
+
+
+# 全局單例
+user_cache = UserCache()
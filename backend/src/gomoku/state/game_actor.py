@@ -0,0 +1,78 @@
+"""对局 actor
+
+每局游戏有一个命令队列，命令按提交顺序逐个执行，同一局游戏的命令之间不会交错。
+命令可以是普通函数或协程函数；协程命令中可以 await `offload` 把耗时计算放到执行器中，
+等待期间该局的后续命令继续排队，其他对局和事件循环不受影响。
+
+执行命令的任务在有命令时才创建，队列清空后退出，空闲的对局不占用任务。
+"""
+
+import asyncio
+import inspect
+import logging
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class GameActor:
+    """一局游戏的串行命令队列"""
+
+    def __init__(self, game_id: str, executor: Executor | None = None):
+        self.game_id = game_id
+        self._executor = executor  # None 表示事件循环默认的线程池
+        self._queue: deque[tuple[Callable[..., Any], tuple, asyncio.Future]] = deque()
+        self._worker: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        """排队中的命令数"""
+        return len(self._queue)
+
+    @property
+    def busy(self) -> bool:
+        """有命令在排队或正在执行"""
+        return self._worker is not None or bool(self._queue)
+
+    def submit(self, fn: Callable[..., Any], *args) -> asyncio.Future:
+        """提交一条命令，返回其结果的 future"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((fn, args, future))
+        if self._worker is None:
+            self._worker = loop.create_task(self._run())
+        return future
+
+    async def call(self, fn: Callable[..., Any], *args) -> Any:
+        """提交一条命令并等待其完成"""
+        return await self.submit(fn, *args)
+
+    async def offload(self, fn: Callable[..., Any], *args) -> Any:
+        """在执行器中运行耗时函数，只应在本 actor 的命令中调用"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, fn, *args
+        )
+
+    async def _run(self):
+        try:
+            while self._queue:
+                fn, args, future = self._queue.popleft()
+                if future.cancelled():
+                    continue
+                try:
+                    result = fn(*args)
+                    if inspect.isawaitable(result):
+                        result = await result
+                except Exception as e:
+                    if future.cancelled():
+                        logger.error(
+                            f"Command failed in game {self.game_id}", exc_info=True
+                        )
+                    else:
+                        future.set_exception(e)
+                    continue
+                if not future.cancelled():
+                    future.set_result(result)
+        finally:
+            self._worker = None
@@ -0,0 +1,125 @@
+"""对局计时
+
+所有对局的超时检测共用一个最小堆和一个 `loop.call_at` 定时器，
+而不是为每局游戏创建一个 sleep 任务。落子后旧的截止时间不会从堆中删除，
+而是通过版本号判定为过期，过期条目过多时整体重建堆。
+"""
+
+import asyncio
+import heapq
+from dataclasses import dataclass, field
+from typing import Callable, Literal
+
+Color = Literal["black", "white"]
+
+
+@dataclass(frozen=True)
+class TimeControl:
+    """基本时间加每步加秒（Fischer 计时）"""
+
+    main_time: float  # 秒
+    increment: float = 0.0  # 秒
+
+
+@dataclass
+class GameClock:
+    """一局游戏的双方剩余时间"""
+
+    time_control: TimeControl
+    remaining: dict[Color, float]
+    turn_started_at: float  # 当前回合开始时的事件循环时间
+    version: int = 0  # 每次换手加一，用于识别过期的截止时间
+
+    @classmethod
+    def start(cls, time_control: TimeControl, now: float) -> "GameClock":
+        return cls(
+            time_control=time_control,
+            remaining={
+                "black": time_control.main_time,
+                "white": time_control.main_time,
+            },
+            turn_started_at=now,
+        )
+
+    def time_left(self, color: Color, now: float, to_move: Color) -> float:
+        """color 方此刻的剩余时间"""
+        if color == to_move:
+            return self.remaining[color] - (now - self.turn_started_at)
+        return self.remaining[color]
+
+    def charge(self, color: Color, now: float) -> bool:
+        """扣除 color 方本回合用时并加秒，超时返回 False"""
+        left = self.remaining[color] - (now - self.turn_started_at)
+        if left <= 0:
+            self.remaining[color] = 0.0
+            return False
+        self.remaining[color] = left + self.time_control.increment
+        self.turn_started_at = now
+        self.version += 1
+        return True
+
+    def deadline(self, color: Color) -> float:
+        """轮到 color 方时的超时时刻"""
+        return self.turn_started_at + self.remaining[color]
+
+
+@dataclass(order=True)
+class _Deadline:
+    at: float
+    game_id: str = field(compare=False)
+    version: int = field(compare=False)
+
+
+class ClockScheduler:
+    """所有对局共享的超时定时器"""
+
+    def __init__(self, on_timeout: Callable[[str, int], None]):
+        # on_timeout(game_id, version) 在截止时间到达时调用，由调用方检查版本
+        self._on_timeout = on_timeout
+        self._heap: list[_Deadline] = []
+        self._live: dict[str, int] = {}  # game_id -> 当前有效的版本
+        self._timer: asyncio.TimerHandle | None = None
+        self._timer_at = float("inf")
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def schedule(self, game_id: str, at: float, version: int):
+        """设置某局游戏的截止时间，覆盖之前的设置"""
+        self._live[game_id] = version
+        heapq.heappush(self._heap, _Deadline(at, game_id, version))
+        if len(self._heap) > 2 * len(self._live) + 64:
+            self._compact()
+        if at < self._timer_at:
+            self._arm(at)
+
+    def cancel(self, game_id: str):
+        self._live.pop(game_id, None)
+
+    def _compact(self):
+        self._heap = [
+            d for d in self._heap if self._live.get(d.game_id) == d.version
+        ]
+        heapq.heapify(self._heap)
+
+    def _arm(self, at: float):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_at(at, self._fire)
+        self._timer_at = at
+
+    def _fire(self):
+        self._timer = None
+        self._timer_at = float("inf")
+        now = asyncio.get_running_loop().time()
+        while self._heap and self._heap[0].at <= now:
+            deadline = heapq.heappop(self._heap)
+            if self._live.get(deadline.game_id) == deadline.version:
+                del self._live[deadline.game_id]
+                self._on_timeout(deadline.game_id, deadline.version)
+        while self._heap and self._live.get(self._heap[0].game_id) != (
+            self._heap[0].version
+        ):
+            heapq.heappop(self._heap)
+        if self._heap:
+            self._arm(self._heap[0].at)
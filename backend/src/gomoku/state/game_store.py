@@ -0,0 +1,211 @@
+"""分层的对局存储
+
+长时间没有落子的对局（如通信对局）不必常驻内存。`TieredGameStore` 按最近使用顺序
+（LRU）在内存中保留不超过内存预算的对局，超出预算时把最久未使用的空闲对局编码后
+写入磁盘上的溢出文件，下次落子或订阅时透明地读回内存。
+
+- 空闲指没有订阅者、actor 中没有排队的命令，由 ServerState 判断
+- 溢出文件由定长槽位组成，读回后槽位放入空闲列表供下次写入复用，文件不需要整理
+- 内存中只为磁盘上的对局保留 ID 到槽位的索引，每局约一百多字节
+- 读写都是对页缓存的小块同步 I/O，不经过线程池
+- 溢出文件只是缓存，不保证持久：停机时写入的快照包含所有对局，启动时清空
+
+未启用溢出文件时，所有对局都在内存中。
+"""
+
+import logging
+import os
+import struct
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Generic, Iterator, TypeVar
+
+from gomoku.state.subscribable_state import SubscribableState
+from gomoku.utils.log_sampling import SampledLogger
+
+logger = logging.getLogger(__name__)
+sampled_logger = SampledLogger(logger)
+
+S = TypeVar("S")
+E = TypeVar("E")
+
+# 每个槽位的字节数，编码后超过槽位的对局留在内存中
+SLOT_SIZE = 512
+_LENGTH = struct.Struct("<H")
+
+# 内存中每局对局约占用的字节数（棋盘的嵌套列表、落子列表和订阅状态），
+# 用于把内存预算换算为对局数
+HOT_GAME_BYTES = 8 * 1024
+
+# 每次淘汰时，除了需要淘汰的数量外最多再检查的对局数，跳过的忙碌对局移到最近使用的一端
+EVICT_SCAN = 64
+
+
+class TieredGameStore(Generic[S, E]):
+    """对局 ID -> SubscribableState，内存中放不下的空闲对局存放在磁盘上"""
+
+    def __init__(
+        self,
+        can_evict: Callable[[str, SubscribableState[S, E]], bool],
+        on_evicted: Callable[[str], None] | None = None,
+    ):
+        # can_evict 只做判断，不应有副作用；对局写入磁盘后才调用 on_evicted
+        self._can_evict = can_evict
+        self._on_evicted = on_evicted
+        # 内存中的对局，最久未使用的在前
+        self.hot: OrderedDict[str, SubscribableState[S, E]] = OrderedDict()
+        # 磁盘上的对局 ID -> 槽位
+        self.cold: dict[str, int] = {}
+        self._free_slots: list[int] = []
+        self._slots = 0
+        self._fd: int | None = None
+        self.path: Path | None = None
+        self.max_hot: int | None = None
+        self._encode: Callable[[S], bytes] | None = None
+        self._decode: Callable[[bytes], S] | None = None
+        self.evictions = 0
+        self.faults = 0
+
+    def enable_spill(
+        self,
+        path: Path,
+        memory_budget: int,
+        encode: Callable[[S], bytes],
+        decode: Callable[[bytes], S],
+    ):
+        """启用溢出文件，已有的内容会被清空"""
+        self.close()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        self.path = path
+        self.max_hot = max(memory_budget // HOT_GAME_BYTES, 1)
+        self._encode = encode
+        self._decode = decode
+        logger.info(f"Spilling idle games to {path}, keeping {self.max_hot} in memory")
+        self._evict()
+
+    def __len__(self) -> int:
+        return len(self.hot) + len(self.cold)
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self.hot or game_id in self.cold
+
+    def __getitem__(self, game_id: str) -> SubscribableState[S, E]:
+        """取得对局，在磁盘上时读回内存"""
+        state = self.hot.get(game_id)
+        if state is not None:
+            self.hot.move_to_end(game_id)
+            return state
+        slot = self.cold[game_id]
+        state = SubscribableState(self._read(slot))
+        del self.cold[game_id]
+        self._free_slots.append(slot)
+        self.faults += 1
+        self.hot[game_id] = state
+        self._evict(keep=game_id)
+        return state
+
+    def get(self, game_id: str) -> SubscribableState[S, E] | None:
+        try:
+            return self[game_id]
+        except KeyError:
+            return None
+
+    def __delitem__(self, game_id: str):
+        """删除对局，在磁盘上时只释放槽位，不读回内存"""
+        if self.hot.pop(game_id, None) is None:
+            self._free_slots.append(self.cold.pop(game_id))
+
+    def __setitem__(self, game_id: str, state: SubscribableState[S, E]):
+        slot = self.cold.pop(game_id, None)
+        if slot is not None:
+            self._free_slots.append(slot)
+        self.hot[game_id] = state
+        self.hot.move_to_end(game_id)
+        self._evict(keep=game_id)
+
+    def values(self) -> Iterator[SubscribableState[S, E]]:
+        """内存中的对局，磁盘上的对局没有订阅者"""
+        return iter(self.hot.values())
+
+    def iter_data(self) -> Iterator[S]:
+        """所有对局的数据，磁盘上的对局解码后不放回内存，用于写快照"""
+        for state in self.hot.values():
+            yield state.data
+        for slot in list(self.cold.values()):
+            yield self._read(slot)
+
+    def clear(self):
+        self.hot.clear()
+        self.cold.clear()
+        self._free_slots.clear()
+        self._slots = 0
+        if self._fd is not None:
+            os.ftruncate(self._fd, 0)
+
+    def close(self):
+        """关闭并删除溢出文件，磁盘上的对局随之丢失，应在写入快照之后调用"""
+        if self._fd is None:
+            return
+        os.close(self._fd)
+        self._fd = None
+        assert self.path is not None
+        self.path.unlink(missing_ok=True)
+        self.cold.clear()
+        self._free_slots.clear()
+        self._slots = 0
+        self.max_hot = None
+
+    def _read(self, slot: int) -> S:
+        assert self._fd is not None and self._decode is not None
+        data = os.pread(self._fd, SLOT_SIZE, slot * SLOT_SIZE)
+        (length,) = _LENGTH.unpack_from(data)
+        return self._decode(data[_LENGTH.size : _LENGTH.size + length])
+
+    def _write(self, state: SubscribableState[S, E]) -> int | None:
+        """写入一个空闲槽位，返回槽位；对局太大或写入失败时返回 None"""
+        assert self._fd is not None and self._encode is not None
+        payload = self._encode(state.data)
+        if len(payload) > SLOT_SIZE - _LENGTH.size:
+            return None
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = self._slots
+            self._slots += 1
+        try:
+            os.pwrite(self._fd, _LENGTH.pack(len(payload)) + payload, slot * SLOT_SIZE)
+        except OSError:
+            sampled_logger.warning("Failed to spill a game to %s", self.path)
+            self._free_slots.append(slot)
+            return None
+        return slot
+
+    def _evict(self, keep: str | None = None):
+        """把超出预算的最久未使用的空闲对局写入磁盘"""
+        if self.max_hot is None:
+            return
+        excess = len(self.hot) - self.max_hot
+        if excess <= 0:
+            return
+        busy = []
+        for game_id in list(islice(self.hot, excess + EVICT_SCAN)):
+            if excess <= 0:
+                break
+            state = self.hot[game_id]
+            if game_id == keep or not self._can_evict(game_id, state):
+                busy.append(game_id)
+                continue
+            slot = self._write(state)
+            if slot is None:
+                busy.append(game_id)
+                continue
+            del self.hot[game_id]
+            self.cold[game_id] = slot
+            self.evictions += 1
+            excess -= 1
+            if self._on_evicted is not None:
+                self._on_evicted(game_id)
+        for game_id in busy:
+            self.hot.move_to_end(game_id)
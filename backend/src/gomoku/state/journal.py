@@ -0,0 +1,308 @@
+"""状态变更日志（预写日志）
+
+ServerState 每执行成功一条改变状态的命令，就向日志追加一条记录。
+追加只写入内存缓冲区，后台任务把一段时间内的记录合并成一批，
+在线程中写入并 fsync（组提交），因此落子等操作不会因磁盘 I/O 阻塞事件循环。
+崩溃时最多丢失最近一个提交间隔内的记录。
+写入失败的一批记录留在缓冲区中，稍后连同新的记录一起重试。
+
+日志按代（generation）分文件。写快照时切换到新一代，快照中记录该代号，
+启动时先恢复快照，再重放同一代的日志。
+
+    文件头: MAGIC + 版本号(u16) + 代号(u64)
+    记录:   长度(u32) + CRC32(u32) + 命令(u8) + 参数
+"""
+
+import asyncio
+import logging
+import os
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from gomoku.state.game_clock import TimeControl
+from gomoku.state.server_state import ServerState
+from gomoku.state.snapshot import Reader, Writer
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"GMKJ"
+VERSION = 1
+
+# 组提交的聚合时间，单位秒
+GROUP_COMMIT_INTERVAL = 0.005
+# 写入失败后重试的间隔，单位秒
+RETRY_INTERVAL = 1.0
+
+_HEADER = struct.Struct("<4sHQ")
+_RECORD_HEADER = struct.Struct("<II")
+
+# 命令名 -> (编号, 参数格式)，s 为字符串，b 为布尔，i 为小整数，f 为浮点数
+OPS: dict[str, tuple[int, str]] = {
+    "create_room": (1, "ss"),
+    "join_room": (2, "ss"),
+    "leave_room": (3, "s"),
+    "set_ready": (4, "sb"),
+    "kick_player": (5, "ss"),
+    "start_game": (6, "ss"),
+    "make_move": (7, "sii"),
+    "join_matchmaking": (14, "sf"),
+    "leave_matchmaking": (9, "s"),
+    "match_players": (10, "sss"),
+    "start_timed_game": (11, "ssff"),
+    "set_clock": (12, "ssf"),
+    "finish_game": (13, "sss"),
+}
+_OPS_BY_CODE = {code: (name, fmt) for name, (code, fmt) in OPS.items()}
+# 旧格式的命令，仍可重放
+_OPS_BY_CODE[8] = ("join_matchmaking", "s")
+
+
+class JournalError(Exception):
+    """日志文件损坏或版本不兼容"""
+
+
+def encode_command(op: str, *args) -> bytes:
+    code, fmt = OPS[op]
+    w = Writer()
+    w.u8(code)
+    for kind, arg in zip(fmt, args, strict=True):
+        if kind == "s":
+            w.string(arg)
+        elif kind == "f":
+            w.f64(arg)
+        else:
+            w.u8(int(arg))
+    return bytes(w.buf)
+
+
+def decode_command(data: bytes) -> tuple[str, list]:
+    r = Reader(data)
+    op, fmt = _OPS_BY_CODE[r.u8()]
+    args: list = []
+    for kind in fmt:
+        if kind == "s":
+            args.append(r.string())
+        elif kind == "b":
+            args.append(bool(r.u8()))
+        elif kind == "f":
+            args.append(r.f64())
+        else:
+            args.append(r.u8())
+    return op, args
+
+
+def journal_path(directory: Path, generation: int) -> Path:
+    return directory / f"journal-{generation:08d}.log"
+
+
+def read_commands(f: BinaryIO) -> Iterator[tuple[int, str, list]]:
+    """逐条读取命令，返回 (记录结束位置, 命令名, 参数)
+
+    遇到不完整或校验失败的记录即停止，这通常是崩溃时写了一半的尾部"""
+    pos = _HEADER.size
+    while True:
+        header = f.read(_RECORD_HEADER.size)
+        if len(header) != _RECORD_HEADER.size:
+            return
+        length, crc = _RECORD_HEADER.unpack(header)
+        payload = f.read(length)
+        if len(payload) != length or zlib.crc32(payload) != crc:
+            logger.warning(f"Journal truncated at offset {pos}")
+            return
+        pos += _RECORD_HEADER.size + length
+        op, args = decode_command(payload)
+        yield pos, op, args
+
+
+def apply_command(state: ServerState, op: str, args: list) -> bool:
+    """在 state 上重放一条命令，返回是否成功"""
+    if op == "create_room":
+        return state.create_room(args[0], room_id=args[1]) is not None
+    if op == "start_game":
+        return state.start_game(args[0], game_id=args[1]) is not None
+    if op == "start_timed_game":
+        player_id, game_id, main_time, increment = args
+        time_control = TimeControl(main_time, increment)
+        return state.start_game(player_id, game_id, time_control) is not None
+    if op == "finish_game":
+        game_id, winner, reason = args
+        return state.finish_game(game_id, winner or None, reason)
+    if op == "match_players":
+        player1, player2, room_id = args
+        for player in (player1, player2):
+            if player in state._matchmaking_queue:
+                state._matchmaking_queue.remove(player)
+        state.match_players(player1, player2, room_id)
+        return True
+    return getattr(state, op)(*args)
+
+
+class Journal:
+    """追加写入的状态变更日志，带组提交"""
+
+    def __init__(self, directory: Path, generation: int):
+        self.directory = directory
+        self.generation = generation
+        self._buffer: list[bytes] = []
+        self._appended = 0  # 已追加的记录数
+        self._durable = 0  # 已 fsync 的记录数
+        self._failures = 0  # 写入失败的次数，用于唤醒等待落盘的 flush
+        self._size: int | None = None  # 当前文件中已 fsync 的字节数
+        self._switch_to: int | None = None
+        self._pending = asyncio.Event()
+        self._flushed = asyncio.Condition()
+        self._file: BinaryIO | None = None
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    def append(self, op: str, *args):
+        """追加一条命令，只写入内存缓冲区"""
+        payload = encode_command(op, *args)
+        self._buffer.append(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+        self._buffer.append(payload)
+        self._appended += 1
+        self._pending.set()
+
+    def switch_generation(self, generation: int):
+        """切换到新一代日志，缓冲区中的记录已包含在快照中，直接丢弃"""
+        self._buffer.clear()
+        self._durable = self._appended
+        self.generation = generation
+        self._switch_to = generation
+        self._pending.set()
+
+    async def flush(self):
+        """等待目前已追加的记录全部落盘，期间写入失败时抛出 JournalError"""
+        target = self._appended
+        failures = self._failures
+        self._pending.set()
+        async with self._flushed:
+            await self._flushed.wait_for(
+                lambda: self._durable >= target or self._failures != failures
+            )
+        if self._durable < target:
+            raise JournalError("Failed to write journal")
+
+    async def close(self):
+        try:
+            await self.flush()
+        except JournalError:
+            logger.error("Closing journal with unwritten records")
+        self._flush_task.cancel()
+        if self._file is not None:
+            await asyncio.to_thread(self._file.close)
+            self._file = None
+
+    async def _flush_loop(self):
+        while True:
+            await self._pending.wait()
+            # 等待一小段时间，让更多记录进入同一批
+            await asyncio.sleep(GROUP_COMMIT_INTERVAL)
+            self._pending.clear()
+            batch = b"".join(self._buffer)
+            self._buffer.clear()
+            count = self._appended
+            switch_to, self._switch_to = self._switch_to, None
+            try:
+                await asyncio.to_thread(self._write_batch, batch, switch_to)
+            except Exception:
+                logger.error("Failed to write journal batch", exc_info=True)
+                # 写入期间切换了代时，这批记录已包含在快照中，不再重试
+                if self._switch_to is None:
+                    self._switch_to = switch_to
+                    self._buffer.insert(0, batch)
+                async with self._flushed:
+                    self._failures += 1
+                    self._flushed.notify_all()
+                await asyncio.sleep(RETRY_INTERVAL)
+                self._pending.set()
+                continue
+            async with self._flushed:
+                self._durable = max(self._durable, count)
+                self._flushed.notify_all()
+
+    def _write_batch(self, batch: bytes, switch_to: int | None):
+        """在线程中执行：必要时切换文件，然后写入并 fsync"""
+        if switch_to is not None:
+            self._close_file()
+            self._file = self._open(switch_to, truncate=True)
+            self._remove_older(switch_to)
+        if self._file is None:
+            self._file = self._open(self.generation, truncate=False)
+        if batch:
+            try:
+                self._file.write(batch)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError:
+                # 文件中可能有写了一半的记录，重试时重新打开并截掉
+                self._close_file()
+                raise
+            assert self._size is not None
+            self._size += len(batch)
+
+    def _close_file(self):
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        self._file = None
+
+    def _open(self, generation: int, truncate: bool) -> BinaryIO:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = journal_path(self.directory, generation)
+        if truncate or not path.exists():
+            f = open(path, "wb")
+            f.write(_HEADER.pack(MAGIC, VERSION, generation))
+            f.flush()
+            self._size = _HEADER.size
+            return f
+        f = open(path, "ab")
+        if self._size is None:
+            self._size = path.stat().st_size
+        else:
+            f.truncate(self._size)
+        return f
+
+    def _remove_older(self, generation: int):
+        for path in self.directory.glob("journal-*.log"):
+            if path != journal_path(self.directory, generation):
+                path.unlink(missing_ok=True)
+
+    def __del__(self):
+        self._flush_task.cancel()
+
+
+def replay_journal(state: ServerState, directory: Path, generation: int) -> int:
+    """重放指定代的日志，并截掉损坏的尾部，返回重放的命令数"""
+    path = journal_path(directory, generation)
+    if not path.exists():
+        return 0
+    start = time.perf_counter()
+    journal, state.journal = state.journal, None
+    count = 0
+    end = _HEADER.size
+    try:
+        with open(path, "rb") as f:
+            magic, version, file_generation = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise JournalError(f"Unsupported journal file {path}")
+            if file_generation != generation:
+                raise JournalError(f"Journal generation mismatch in {path}")
+            for end, op, args in read_commands(f):
+                if not apply_command(state, op, args):
+                    logger.warning(f"Journal command {op} {args} failed on replay")
+                count += 1
+    finally:
+        state.journal = journal
+    with open(path, "r+b") as f:
+        f.truncate(end)
+    logger.info(
+        f"Replayed {count} journal commands from {path} "
+        f"in {(time.perf_counter() - start) * 1000:.1f}ms"
+    )
+    return count
@@ -0,0 +1,128 @@
+"""大厅：可加入的房间索引
+
+ServerState 在每次改变房间的操作后调用 `update` 或 `remove`，大厅只保存有空位、
+尚未开始游戏的房间，不需要扫描全部房间。房间按进入大厅的先后排序，
+分页使用序号游标。
+
+变更以差量事件推送给观察者：每次变更只编码一次 SSE 帧，
+所有观察者的队列共享同一个 bytes 对象。
+"""
+
+import asyncio
+import bisect
+from dataclasses import dataclass
+from typing import Literal
+
+from gomoku.utils.encoder import camel_encoded
+from gomoku.utils.sse import encode_frame
+
+
+@camel_encoded
+@dataclass
+class LobbyRoom:
+    id: str
+    host: str
+    players: int
+    capacity: int
+    seq: int  # 进入大厅的序号，用作分页游标
+
+
+@camel_encoded
+@dataclass
+class LobbyEventInitial:
+    rooms: list[LobbyRoom]
+    type: Literal["initial"] = "initial"
+
+
+@camel_encoded
+@dataclass
+class LobbyEventAdded:
+    """房间进入大厅，或大厅中的房间信息有变化"""
+
+    room: LobbyRoom
+    type: Literal["added"] = "added"
+
+
+@camel_encoded
+@dataclass
+class LobbyEventRemoved:
+    room_id: str
+    type: Literal["removed"] = "removed"
+
+
+class Lobby:
+    """可加入房间的索引和差量推送"""
+
+    def __init__(self):
+        self._rooms: dict[str, LobbyRoom] = {}
+        # (序号, 房间 ID)，按序号递增，已移出大厅的条目留到压缩时再删除
+        self._index: list[tuple[int, str]] = []
+        self._next_seq = 1
+        self._watchers: dict[str, asyncio.Queue[bytes]] = {}
+        self._initial_frame: bytes | None = None
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def update(self, room_id: str, host: str, players: list[str | None]):
+        """根据房间当前状态加入、更新或移出大厅"""
+        count = sum(1 for player in players if player is not None)
+        if count == 0 or count >= len(players):
+            self.remove(room_id)
+            return
+        room = self._rooms.get(room_id)
+        if room is not None:
+            if room.host == host and room.players == count:
+                return
+            room.host = host
+            room.players = count
+        else:
+            room = LobbyRoom(room_id, host, count, len(players), self._next_seq)
+            self._next_seq += 1
+            self._rooms[room_id] = room
+            self._index.append((room.seq, room_id))
+        self._publish(LobbyEventAdded(room=room))
+
+    def remove(self, room_id: str):
+        if self._rooms.pop(room_id, None) is None:
+            return
+        if len(self._index) > 2 * len(self._rooms) + 64:
+            self._index = [(room.seq, room.id) for room in self._rooms.values()]
+        self._publish(LobbyEventRemoved(room_id=room_id))
+
+    def clear(self):
+        self._rooms.clear()
+        self._index.clear()
+        self._initial_frame = None
+
+    def page(self, after: int, limit: int) -> list[LobbyRoom]:
+        """序号大于 after 的前 limit 个房间"""
+        rooms: list[LobbyRoom] = []
+        i = bisect.bisect_right(self._index, after, key=lambda entry: entry[0])
+        while i < len(self._index) and len(rooms) < limit:
+            seq, room_id = self._index[i]
+            room = self._rooms.get(room_id)
+            if room is not None and room.seq == seq:
+                rooms.append(room)
+            i += 1
+        return rooms
+
+    def subscribe(self, queue_id: str) -> tuple[asyncio.Queue[bytes], bytes]:
+        """订阅大厅变更，返回队列和已编码的当前房间列表"""
+        if self._initial_frame is None:
+            self._initial_frame = encode_frame(
+                LobbyEventInitial(rooms=list(self._rooms.values()))
+            )
+        queue = self._watchers.setdefault(queue_id, asyncio.Queue())
+        return queue, self._initial_frame
+
+    def unsubscribe(self, queue_id: str):
+        self._watchers.pop(queue_id, None)
+
+    def _publish(self, event: LobbyEventAdded | LobbyEventRemoved):
+        self._initial_frame = None
+        if not self._watchers:
+            return
+        frame = encode_frame(event)
+        for queue in self._watchers.values():
+            queue.put_nowait(frame)
@@ -0,0 +1,121 @@
+"""按分数分桶的匹配队列
+
+玩家按分数落入宽度为 BUCKET_WIDTH 的桶中，每个桶内按加入顺序排队。
+每轮匹配先在桶内两两配对（分差必然小于桶宽），之后每个桶最多剩一人，
+再让这些剩余玩家按等待时间从长到短，在随等待时间变宽的分差窗口内寻找最近的对手。
+因此一轮匹配的开销只与配对数和非空桶数有关，与排队总人数无关。
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterator
+
+# 新玩家的初始分数
+DEFAULT_RATING = 1500.0
+
+# 桶宽，单位为分
+BUCKET_WIDTH = 50
+# 初始搜索窗口（分差），不能小于桶宽
+BASE_WINDOW = 50.0
+# 每等待一秒窗口扩大的分数
+WINDOW_GROWTH_PER_SECOND = 10.0
+# 窗口上限
+MAX_WINDOW = 400.0
+
+
+@dataclass(slots=True)
+class QueueEntry:
+    player_id: str
+    rating: float
+    joined_at: float  # 事件循环时间
+
+    def window(self, now: float) -> float:
+        """当前可接受的最大分差"""
+        waited = max(now - self.joined_at, 0.0)
+        return min(BASE_WINDOW + WINDOW_GROWTH_PER_SECOND * waited, MAX_WINDOW)
+
+
+class MatchmakingQueue:
+    """分桶匹配队列"""
+
+    def __init__(self):
+        self._entries: dict[str, QueueEntry] = {}
+        # 桶编号 -> 按加入顺序排列的玩家
+        self._buckets: dict[int, OrderedDict[str, QueueEntry]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, player_id: object) -> bool:
+        return player_id in self._entries
+
+    def __iter__(self) -> Iterator[QueueEntry]:
+        return iter(list(self._entries.values()))
+
+    def clear(self):
+        self._entries.clear()
+        self._buckets.clear()
+
+    def add(self, player_id: str, rating: float, joined_at: float) -> bool:
+        if player_id in self._entries:
+            return False
+        entry = QueueEntry(player_id, rating, joined_at)
+        self._entries[player_id] = entry
+        bucket = self._buckets.setdefault(_bucket_of(rating), OrderedDict())
+        bucket[player_id] = entry
+        return True
+
+    def remove(self, player_id: str) -> bool:
+        entry = self._entries.pop(player_id, None)
+        if entry is None:
+            return False
+        key = _bucket_of(entry.rating)
+        bucket = self._buckets[key]
+        del bucket[player_id]
+        if not bucket:
+            del self._buckets[key]
+        return True
+
+    def pair(self, now: float) -> list[tuple[str, str]]:
+        """取出本轮能配对的玩家，先加入（等待更久）的玩家在前"""
+        pairs: list[tuple[str, str]] = []
+        # 桶内配对
+        for bucket in self._buckets.values():
+            while len(bucket) >= 2:
+                first = bucket.popitem(last=False)[1]
+                second = bucket.popitem(last=False)[1]
+                pairs.append((first.player_id, second.player_id))
+        for first, second in pairs:
+            del self._entries[first]
+            del self._entries[second]
+        # 跨桶配对，每个非空桶只剩一人
+        singles = sorted(
+            (bucket[next(iter(bucket))] for bucket in self._buckets.values() if bucket),
+            key=lambda entry: entry.joined_at,
+        )
+        matched: set[str] = set()
+        for entry in singles:
+            if entry.player_id in matched:
+                continue
+            window = entry.window(now)
+            best = None
+            for other in singles:
+                if other is entry or other.player_id in matched:
+                    continue
+                diff = abs(other.rating - entry.rating)
+                if diff <= window and (
+                    best is None or diff < abs(best.rating - entry.rating)
+                ):
+                    best = other
+            if best is not None:
+                matched.add(entry.player_id)
+                matched.add(best.player_id)
+                pairs.append((entry.player_id, best.player_id))
+        for player_id in matched:
+            self.remove(player_id)
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket}
+        return pairs
+
+
+def _bucket_of(rating: float) -> int:
+    return int(rating // BUCKET_WIDTH)
@@ -3,28 +3,41 @@ import logging
 import random
 from collections import deque
 
+from gomoku.env import ROOM_ID_SEED
+
 logger = logging.getLogger(__name__)
 
 LEASE_DURATION = 1000 * 60  # 房间ID租赁时长，单位秒
 
 
 class RoomIDManager:
-    def __init__(self):
-        ids = [f"{i:06d}" for i in range(1000000)]
-        random.shuffle(ids)
-        self.queue = deque(ids)
-
+    def __init__(self, seed: int | None = None):
+        self.queue: deque[str] = deque()
         self.allocated_ids = {}
+        self.reseed(seed)
         self._cleanup_expired_ids_task = asyncio.create_task(
             self._cleanup_expired_ids()
         )
 
+    def reseed(self, seed: int | None):
+        """重新打乱 ID 队列并清空已分配的 ID，相同的种子得到相同的分配顺序"""
+        ids = [f"{i:06d}" for i in range(1000000)]
+        random.Random(seed).shuffle(ids)
+        self.queue = deque(ids)
+        self.allocated_ids.clear()
+
     def acquire_room_id(self) -> str:
-        if not self.queue:
-            raise RuntimeError("No available room IDs")
-        room_id = self.queue.popleft()
+        while self.queue:
+            room_id = self.queue.popleft()
+            # 从快照恢复的 ID 仍留在队列中，跳过已分配的
+            if room_id not in self.allocated_ids:
+                self.allocated_ids[room_id] = asyncio.get_event_loop().time()
+                return room_id
+        raise RuntimeError("No available room IDs")
+
+    def claim_room_id(self, room_id: str):
+        """将指定的 ID 标记为已分配，队列中的副本会在分配时被跳过"""
         self.allocated_ids[room_id] = asyncio.get_event_loop().time()
-        return room_id
 
     def release_room_id(self, room_id: str):
         self.queue.append(room_id)
@@ -38,6 +51,18 @@ class RoomIDManager:
                 f"Attempted to renew lease for unallocated room ID: {room_id}"
             )
 
+    def export_leases(self) -> list[tuple[str, float]]:
+        """导出已分配的 ID 及其租约已持续的秒数"""
+        now = asyncio.get_event_loop().time()
+        return [
+            (room_id, now - lease_time)
+            for room_id, lease_time in self.allocated_ids.items()
+        ]
+
+    def restore_lease(self, room_id: str, age: float):
+        """恢复一个已分配的 ID，队列中的副本会在分配时被跳过"""
+        self.allocated_ids[room_id] = asyncio.get_event_loop().time() - age
+
     async def _cleanup_expired_ids(self):
         while True:
             await asyncio.sleep(60)  # 每分钟检查一次
@@ -56,4 +81,4 @@ class RoomIDManager:
 
 
 # 全局单例
-room_id_manager = RoomIDManager()
+room_id_manager = RoomIDManager(ROOM_ID_SEED)
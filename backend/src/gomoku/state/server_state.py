@@ -3,16 +3,36 @@
 import asyncio
 import logging
 import uuid
-from collections import deque
-from dataclasses import dataclass
-from typing import Literal
-
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Literal
+
+from gomoku.env import (
+    FINISHED_GAME_RETENTION_SECONDS,
+    GAME_INCREMENT_SECONDS,
+    GAME_MAIN_TIME_SECONDS,
+)
+from gomoku.state.game_actor import GameActor
+from gomoku.state.game_clock import ClockScheduler, GameClock, TimeControl
+from gomoku.state.game_store import TieredGameStore
+from gomoku.state.lobby import Lobby
+from gomoku.state.matchmaking import DEFAULT_RATING, MatchmakingQueue
 from gomoku.state.room_id_manager import room_id_manager
 from gomoku.state.subscribable_state import SubscribableState
+from gomoku.utils.encoder import camel_encoded
+from gomoku.utils.log_sampling import SampledLogger
+from gomoku.utils.sse import CLOSE
+
+if TYPE_CHECKING:
+    from gomoku.state.journal import Journal
 
 logger = logging.getLogger(__name__)
+# 请求失败的原因在每次调用时都可能输出，限流
+sampled_logger = SampledLogger(logger)
 
 
+@camel_encoded
 @dataclass
 class PlayerStateInRoom:
 
@@ -21,6 +41,7 @@ class PlayerStateInRoom:
     status: Literal["in_room"] = "in_room"
 
 
+@camel_encoded
 @dataclass
 class PlayerStateInGame:
 
@@ -29,6 +50,7 @@ class PlayerStateInGame:
     status: Literal["in_game"] = "in_game"
 
 
+@camel_encoded
 @dataclass
 class PlayerStateMatchmaking:
 
@@ -39,6 +61,67 @@ class PlayerStateMatchmaking:
 PlayerState = PlayerStateInRoom | PlayerStateInGame | PlayerStateMatchmaking
 
 
+@camel_encoded
+@dataclass
+class PlayerStateIdle:
+    """不在房间、对局或匹配中的玩家，不存入状态表"""
+
+    id: str
+    status: Literal["idle"] = "idle"
+
+
+PlayerStateEvent = PlayerState | PlayerStateIdle
+
+
+class PlayerStateMap(dict[str, PlayerState]):
+    """玩家状态表
+
+    条目被创建、替换或删除时，把该玩家的新状态推送给他的订阅者，删除即回到空闲状态。
+    状态对象不会被原地修改，只通过赋值和 del 更新。"""
+
+    def __init__(self):
+        super().__init__()
+        self._watchers: dict[str, dict[str, asyncio.Queue[PlayerStateEvent]]] = {}
+
+    def __setitem__(self, player_id: str, state: PlayerState):
+        super().__setitem__(player_id, state)
+        self._publish(player_id, state)
+
+    def __delitem__(self, player_id: str):
+        super().__delitem__(player_id)
+        self._publish(player_id, PlayerStateIdle(id=player_id))
+
+    def clear(self):
+        player_ids = list(self)
+        super().clear()
+        for player_id in player_ids:
+            self._publish(player_id, PlayerStateIdle(id=player_id))
+
+    def current(self, player_id: str) -> PlayerStateEvent:
+        return self.get(player_id) or PlayerStateIdle(id=player_id)
+
+    def subscribe(
+        self, player_id: str, queue_id: str
+    ) -> tuple[asyncio.Queue[PlayerStateEvent], PlayerStateEvent]:
+        queue: asyncio.Queue[PlayerStateEvent] = asyncio.Queue()
+        self._watchers.setdefault(player_id, {})[queue_id] = queue
+        return queue, self.current(player_id)
+
+    def unsubscribe(self, player_id: str, queue_id: str):
+        watchers = self._watchers.get(player_id)
+        if watchers is not None:
+            watchers.pop(queue_id, None)
+            if not watchers:
+                del self._watchers[player_id]
+
+    def _publish(self, player_id: str, state: PlayerStateEvent):
+        watchers = self._watchers.get(player_id)
+        if watchers:
+            for queue in watchers.values():
+                queue.put_nowait(state)
+
+
+@camel_encoded
 @dataclass
 class RoomState:
     """游戏房间的状态"""
@@ -47,19 +130,38 @@ class RoomState:
     players: list[str | None]  # 玩家 ID 列表
     host: str  # 房主 ID
     ready: dict[str, bool]  # 玩家准备状态，房主默认已准备
+    version: int = 0  # 每次变更加一，客户端据此发现遗漏的差量
 
 
+@camel_encoded
 @dataclass
 class RoomStateChangeUpdate:
     new_state: RoomState
     type: Literal["update"] = "update"
 
 
+@camel_encoded(omit_none=True)
+@dataclass
+class RoomStateChangeDiff:
+    """房间的字段级差量，只包含有变化的字段
+
+    version 为应用该差量后的版本，不等于客户端已知版本加一时应重新获取完整状态"""
+
+    version: int
+    players: list[str | None] | None = None
+    host: str | None = None
+    ready: dict[str, bool] | None = None  # 有变化的准备状态
+    ready_removed: list[str] | None = None  # 被移除准备状态的玩家
+    type: Literal["diff"] = "diff"
+
+
+@camel_encoded
 @dataclass
 class RoomStateChangeDelete:
     type: Literal["delete"] = "delete"
 
 
+@camel_encoded
 @dataclass
 class RoomStateChangeGameStart:
     game_id: str
@@ -67,10 +169,14 @@ class RoomStateChangeGameStart:
 
 
 RoomStateChange = (
-    RoomStateChangeUpdate | RoomStateChangeDelete | RoomStateChangeGameStart
+    RoomStateChangeUpdate
+    | RoomStateChangeDiff
+    | RoomStateChangeDelete
+    | RoomStateChangeGameStart
 )
 
 
+@camel_encoded
 @dataclass
 class GameState:
     """游戏的状态"""
@@ -80,8 +186,17 @@ class GameState:
     black_player_id: str
     white_player_id: str
     current_turn: Literal["black", "white"]
+    # 双方截至上一步的剩余时间（秒），不计时的对局为 None
+    black_time_left: float | None = None
+    white_time_left: float | None = None
+    status: Literal["playing", "finished"] = "playing"
+    winner: Literal["black", "white"] | None = None
+    reason: Literal["five", "timeout", "draw"] | None = None
+    # 落子顺序，每步记为 y * 棋盘边长 + x
+    moves: list[int] = field(default_factory=list)
 
 
+@camel_encoded
 @dataclass
 class GameStateChange:
     """游戏状态变更消息"""
@@ -89,28 +204,112 @@ class GameStateChange:
     who: Literal["black", "white"]
     x: int
     y: int
+    time_left: float | None = None  # 落子方加秒后的剩余时间
+    type: Literal["move"] = "move"
+
+
+@camel_encoded
+@dataclass
+class GameStateChangeGameOver:
+    """游戏结束消息"""
 
+    winner: Literal["black", "white"] | None
+    reason: Literal["five", "timeout", "draw"]
+    type: Literal["game_over"] = "game_over"
+
+
+GameEvent = GameStateChange | GameStateChangeGameOver
 
 SubscribableRoomState = SubscribableState[RoomState, RoomStateChange]
-SubscribableGameState = SubscribableState[GameState, GameStateChange]
+SubscribableGameState = SubscribableState[GameState, GameEvent]
+
+
+def default_time_control() -> TimeControl | None:
+    """新对局使用的计时规则"""
+    if GAME_MAIN_TIME_SECONDS <= 0:
+        return None
+    return TimeControl(GAME_MAIN_TIME_SECONDS, GAME_INCREMENT_SECONDS)
 
 
 class ServerState:
     def __init__(self):
-        self._player_state: dict[str, PlayerState] = {}
+        self._player_state = PlayerStateMap()
         self._room_state: dict[str, SubscribableRoomState] = {}
-        self._game_state: dict[str, SubscribableGameState] = {}
-        self._matchmaking_queue: deque[str] = deque()
+        # 空闲的对局在内存超出预算时移到磁盘，访问时透明地读回
+        self._game_state: TieredGameStore[GameState, GameEvent] = TieredGameStore(
+            self._can_evict_game, self._on_game_evicted
+        )
+        self._matchmaking_queue = MatchmakingQueue()
         self._matchmaking_task = asyncio.create_task(self._matchmakeing_loop())
+        # 排空模式下不再创建新的房间和游戏，已有的游戏继续进行
+        self.draining = False
+        # 状态变更日志，为 None 时不记录
+        self.journal: "Journal | None" = None
+        # 每局游戏的命令队列，落子和超时判负都经由它串行执行
+        self._game_actors: dict[str, GameActor] = {}
+        # actor 卸载耗时计算使用的执行器，None 表示默认线程池
+        self.executor: Executor | None = None
+        # 有空位的房间索引
+        self.lobby = Lobby()
+        # 计时对局的时钟，超时由共享的定时器检测
+        self._clocks: dict[str, GameClock] = {}
+        self._clock_scheduler = ClockScheduler(self._on_clock_timeout)
+        # 已结束对局的删除时间，同样共用一个定时器
+        self._retention_scheduler = ClockScheduler(self._on_retention_expired)
+        # 对局结束时的回调，例如更新等级分。重放日志时不应注册
+        self.game_finished_listeners: list[Callable[[GameState], None]] = []
+
+    def _journal_append(self, op: str, *args):
+        """记录一条成功执行的状态变更命令"""
+        if self.journal is not None:
+            self.journal.append(op, *args)
+
+    def _sync_lobby(self, room_id: str):
+        """房间变化后更新大厅索引"""
+        room = self._room_state.get(room_id)
+        if room is None:
+            self.lobby.remove(room_id)
+        else:
+            self.lobby.update(room_id, room.data.host, room.data.players)
+
+    def _notify_room_diff(
+        self,
+        room_id: str,
+        players: bool = False,
+        host: bool = False,
+        ready: dict[str, bool] | None = None,
+        ready_removed: list[str] | None = None,
+    ):
+        """递增房间版本并推送差量，players/host 为 True 时附带其当前值"""
+        room = self._room_state[room_id]
+        room_state = room.data
+        room_state.version += 1
+        room.notify(
+            RoomStateChangeDiff(
+                version=room_state.version,
+                players=list(room_state.players) if players else None,
+                host=room_state.host if host else None,
+                ready=ready,
+                ready_removed=ready_removed,
+            )
+        )
+
+    def start_draining(self):
+        """进入排空模式，准备停机"""
+        self.draining = True
+        logger.info("Server state is draining")
 
-    def join_matchmaking(self, player_id: str) -> bool:
-        """玩家加入匹配队列"""
+    def join_matchmaking(self, player_id: str, rating: float = DEFAULT_RATING) -> bool:
+        """玩家以给定的等级分加入匹配队列"""
+        if self.draining:
+            return False
         if player_id in self._player_state:
             return False  # 玩家已在房间或游戏中
         if player_id in self._matchmaking_queue:
             return False  # 玩家已在匹配队列中
-        self._matchmaking_queue.append(player_id)
+        self._matchmaking_queue.add(player_id, rating, self._now())
         self._player_state[player_id] = PlayerStateMatchmaking(id=player_id)
+        self._journal_append("join_matchmaking", player_id, rating)
         return True
 
     def leave_matchmaking(self, player_id: str) -> bool:
@@ -119,33 +318,47 @@ class ServerState:
             return False  # 玩家不在匹配队列中
         self._matchmaking_queue.remove(player_id)
         del self._player_state[player_id]
+        self._journal_append("leave_matchmaking", player_id)
         return True
 
     async def _matchmakeing_loop(self):
         """匹配循环，每隔一段时间检查匹配队列，进行匹配"""
         while True:
             await asyncio.sleep(1)  # 每秒检查一次
-            while len(self._matchmaking_queue) >= 2:
-                player1 = self._matchmaking_queue.popleft()
-                player2 = self._matchmaking_queue.popleft()
+            if self.draining or len(self._matchmaking_queue) < 2:
+                continue
+            pairs = self._matchmaking_queue.pair(self._now())
+            for player1, player2 in pairs:
                 room_id = room_id_manager.acquire_room_id()
-                room = RoomState(
-                    id=room_id,
-                    players=[player1, player2],
-                    host=player1,
-                    ready={player1: True, player2: True},
-                )
-                self._room_state[room_id] = SubscribableRoomState(room)
-                self._player_state[player1] = PlayerStateInRoom(
-                    id=player1, room_id=room_id
-                )
-                self._player_state[player2] = PlayerStateInRoom(
-                    id=player2, room_id=room_id
-                )
+                self.match_players(player1, player2, room_id)
+            if pairs:
                 logger.info(
-                    f"Matched players {player1} and {player2} into room {room_id}"
+                    f"Matched {len(pairs)} pairs, "
+                    f"{len(self._matchmaking_queue)} players still queued"
                 )
 
+    def match_players(self, player1: str, player2: str, room_id: str):
+        """将已移出匹配队列的两名玩家放入新房间"""
+        room = RoomState(
+            id=room_id,
+            players=[player1, player2],
+            host=player1,
+            ready={player1: True, player2: True},
+        )
+        self._room_state[room_id] = SubscribableRoomState(room)
+        self._player_state[player1] = PlayerStateInRoom(id=player1, room_id=room_id)
+        self._player_state[player2] = PlayerStateInRoom(id=player2, room_id=room_id)
+        self._journal_append("match_players", player1, player2, room_id)
+
+    def subscribe_player(
+        self, player_id: str, queue_id: str
+    ) -> tuple[asyncio.Queue[PlayerStateEvent], PlayerStateEvent]:
+        """订阅玩家自己的状态变化"""
+        return self._player_state.subscribe(player_id, queue_id)
+
+    def unsubscribe_player(self, player_id: str, queue_id: str):
+        self._player_state.unsubscribe(player_id, queue_id)
+
     def subscribe_room(
         self, room_id: str, queue_id: str
     ) -> tuple[asyncio.Queue[RoomStateChange], RoomState]:
@@ -153,25 +366,36 @@ class ServerState:
         return self._room_state[room_id].subscribe(queue_id)
 
     def unsubscribe_room(self, room_id: str, queue_id: str):
-        """取消订阅房间状态更新"""
-        self._room_state[room_id].unsubscribe(queue_id)
+        """取消订阅房间状态更新，房间可能已被删除"""
+        room = self._room_state.get(room_id)
+        if room is not None:
+            room.unsubscribe(queue_id)
 
     def subscribe_game(
         self, game_id: str, queue_id: str
-    ) -> tuple[asyncio.Queue[GameStateChange], GameState]:
+    ) -> tuple[asyncio.Queue[GameEvent], GameState]:
         """订阅游戏状态更新"""
         return self._game_state[game_id].subscribe(queue_id)
 
     def unsubscribe_game(self, game_id: str, queue_id: str):
-        """取消订阅游戏状态更新"""
-        self._game_state[game_id].unsubscribe(queue_id)
+        """取消订阅游戏状态更新，游戏可能已被删除"""
+        game = self._game_state.get(game_id)
+        if game is not None:
+            game.unsubscribe(queue_id)
 
-    def create_room(self, player_id: str) -> str | None:
-        """玩家创建房间，然后以房主身份加入房间"""
+    def create_room(self, player_id: str, room_id: str | None = None) -> str | None:
+        """玩家创建房间，然后以房主身份加入房间
+
+        指定 room_id 时使用该 ID（用于重放日志），否则分配新的 ID"""
+        if self.draining:
+            return None
         if player_id in self._player_state:
             return None  # 玩家已在房间或游戏中
 
-        room_id = room_id_manager.acquire_room_id()
+        if room_id is None:
+            room_id = room_id_manager.acquire_room_id()
+        else:
+            room_id_manager.claim_room_id(room_id)
         if room_id in self._room_state:
             # 理论上不应该发生，但以防万一
             return None
@@ -184,6 +408,8 @@ class ServerState:
         )
         self._room_state[room_id] = SubscribableRoomState(room)
         self._player_state[player_id] = PlayerStateInRoom(id=player_id, room_id=room_id)
+        self._sync_lobby(room_id)
+        self._journal_append("create_room", player_id, room_id)
         return room_id
 
     def join_room(self, player_id: str, room_id: str) -> bool:
@@ -198,9 +424,11 @@ class ServerState:
                 self._player_state[player_id] = PlayerStateInRoom(
                     id=player_id, room_id=room_id
                 )
-                self._room_state[room_id].notify(
-                    RoomStateChangeUpdate(new_state=room_state)
+                self._notify_room_diff(
+                    room_id, players=True, ready={player_id: False}
                 )
+                self._sync_lobby(room_id)
+                self._journal_append("join_room", player_id, room_id)
                 return True
         return False  # 房间已满
 
@@ -218,26 +446,32 @@ class ServerState:
                 room_state.players[i] = None
                 break
         # 从准备状态中删除
-        if player_id in room_state.ready:
-            del room_state.ready[player_id]
+        had_ready = room_state.ready.pop(player_id, None) is not None
         # 如果是房主，且还有其他玩家，选择新房主
-        if room_state.host == player_id:
+        host_changed = room_state.host == player_id
+        if host_changed:
             remaining_players = [p for p in room_state.players if p is not None]
             if remaining_players:
                 room_state.host = remaining_players[0]
             else:
                 # 房间空了，删除房间
-                del self._room_state[room_id]
+                self._room_state.pop(room_id).notify(RoomStateChangeDelete())
                 del self._player_state[player_id]
-                self._room_state[room_id].notify(RoomStateChangeDelete())
+                self._sync_lobby(room_id)
+                self._journal_append("leave_room", player_id)
                 return True
         # 删除玩家状态
         del self._player_state[player_id]
         # 通知房间更新
         if room_id in self._room_state:
-            self._room_state[room_id].notify(
-                RoomStateChangeUpdate(new_state=room_state)
+            self._notify_room_diff(
+                room_id,
+                players=True,
+                host=host_changed,
+                ready_removed=[player_id] if had_ready else None,
             )
+        self._sync_lobby(room_id)
+        self._journal_append("leave_room", player_id)
         return True
 
     def set_ready(self, player_id: str, ready: bool) -> bool:
@@ -248,7 +482,8 @@ class ServerState:
         room_id = state.room_id
         room_state = self._room_state[room_id].data
         room_state.ready[player_id] = ready
-        self._room_state[room_id].notify(RoomStateChangeUpdate(new_state=room_state))
+        self._notify_room_diff(room_id, ready={player_id: ready})
+        self._journal_append("set_ready", player_id, ready)
         return True
 
     def kick_player(self, player_id: str, kicked_player_id: str) -> bool:
@@ -265,29 +500,45 @@ class ServerState:
         for i in range(len(room_state.players)):
             if room_state.players[i] == kicked_player_id:
                 room_state.players[i] = None
-                if kicked_player_id in room_state.ready:
-                    del room_state.ready[kicked_player_id]
+                had_ready = room_state.ready.pop(kicked_player_id, None) is not None
                 del self._player_state[kicked_player_id]
-                self._room_state[room_id].notify(
-                    RoomStateChangeUpdate(new_state=room_state)
+                self._notify_room_diff(
+                    room_id,
+                    players=True,
+                    ready_removed=[kicked_player_id] if had_ready else None,
                 )
+                self._sync_lobby(room_id)
+                self._journal_append("kick_player", player_id, kicked_player_id)
                 return True
         return False  # 未找到被踢玩家
 
-    def start_game(self, player_id: str) -> str | None:
-        """玩家开始游戏，必须要求房间内所有玩家都已准备"""
+    def start_game(
+        self,
+        player_id: str,
+        game_id: str | None = None,
+        time_control: TimeControl | None = None,
+    ) -> str | None:
+        """玩家开始游戏，必须要求房间内所有玩家都已准备
+
+        指定 game_id 时使用该 ID（用于重放日志），否则生成新的 ID；
+        time_control 为 None 时不计时"""
+        if self.draining:
+            sampled_logger.info("Server is draining, refusing to start a game")
+            return None
         state = self._player_state.get(player_id)
         if state is None or state.status != "in_room":
-            logger.info(f"Player {player_id} is not in a room")
+            sampled_logger.info("Player %s is not in a room", player_id)
             return None
         room_id = state.room_id
         if room_id not in self._room_state:
-            logger.info(f"Room {room_id} does not exist")
+            sampled_logger.info("Room %s does not exist", room_id)
             return None
         room_state = self._room_state[room_id].data
         # 检查玩家是否是房主
         if room_state.host != player_id:
-            logger.info(f"Player {player_id} is not the host of room {room_id}")
+            sampled_logger.info(
+                "Player %s is not the host of room %s", player_id, room_id
+            )
             return None
         # 检查房间有两人，且都不是 None
         if (
@@ -295,14 +546,16 @@ class ServerState:
             or room_state.players[0] is None
             or room_state.players[1] is None
         ):
-            logger.info(f"Room {room_id} does not have two players")
+            sampled_logger.info("Room %s does not have two players", room_id)
             return None
         # 检查所有玩家都准备好
         for player in room_state.players:
             if player is not None and (
                 player != room_state.host and not room_state.ready.get(player, False)
             ):
-                logger.info(f"Player {player} is not ready in room {room_id}")
+                sampled_logger.info(
+                    "Player %s is not ready in room %s", player, room_id
+                )
                 return None
         # 创建游戏状态
         board: list[list[Literal["black", "white", "empty"]]] = [
@@ -311,7 +564,8 @@ class ServerState:
         black_player = room_state.players[0]
         white_player = room_state.players[1]
 
-        game_id = str(uuid.uuid4())
+        if game_id is None:
+            game_id = str(uuid.uuid4())
         game = GameState(
             id=game_id,
             board=board,
@@ -320,6 +574,9 @@ class ServerState:
             current_turn="black",
         )
         self._game_state[game_id] = SubscribableGameState(game)
+        if time_control is not None:
+            game.black_time_left = game.white_time_left = time_control.main_time
+            self.start_clock(game_id, GameClock.start(time_control, self._now()))
         # 更新玩家状态
         for player in room_state.players:
             if player is not None:
@@ -329,16 +586,81 @@ class ServerState:
         # 删除房间状态
         self._room_state[room_id].notify(RoomStateChangeGameStart(game_id=game_id))
         del self._room_state[room_id]
+        self._sync_lobby(room_id)
+        if time_control is None:
+            self._journal_append("start_game", player_id, game_id)
+        else:
+            self._journal_append(
+                "start_timed_game",
+                player_id,
+                game_id,
+                time_control.main_time,
+                time_control.increment,
+            )
         return game_id
 
+    def enable_game_spill(
+        self,
+        path: Path,
+        memory_budget: int,
+        encode: Callable[[GameState], bytes],
+        decode: Callable[[bytes], GameState],
+    ):
+        """内存中的对局超出 memory_budget 字节时，把空闲的对局写入 path"""
+        self._game_state.enable_spill(path, memory_budget, encode, decode)
+
+    def close_game_spill(self):
+        """关闭溢出文件，磁盘上的对局随之丢失，应在写入快照之后调用"""
+        self._game_state.close()
+
+    def _can_evict_game(self, game_id: str, game: SubscribableGameState) -> bool:
+        """没有订阅者、actor 空闲的对局可以移到磁盘"""
+        if game.subscribers:
+            return False
+        actor = self._game_actors.get(game_id)
+        return actor is None or not actor.busy
+
+    def _on_game_evicted(self, game_id: str):
+        """对局已写入磁盘，释放其 actor，下次落子时重新创建"""
+        self._game_actors.pop(game_id, None)
+
+    def _game_actor(self, game_id: str) -> GameActor:
+        actor = self._game_actors.get(game_id)
+        if actor is None:
+            actor = self._game_actors[game_id] = GameActor(game_id, self.executor)
+        return actor
+
+    async def submit_move(self, player_id: str, x: int, y: int) -> bool:
+        """通过对局的 actor 落子，同一局的落子按到达顺序执行"""
+        state = self._player_state.get(player_id)
+        if state is None or state.status != "in_game":
+            return False
+        return await self._game_actor(state.game_id).call(
+            self.make_move, player_id, x, y
+        )
+
+    async def run_in_game(self, game_id: str, fn: Callable, *args):
+        """在对局的 actor 中把 fn(*args) 放到执行器中运行
+
+        运行期间该局的落子排队等待，其他对局照常进行。fn 在其他线程或进程中执行，
+        只能读取传入的参数，不能修改服务器状态。"""
+        if game_id not in self._game_state:
+            raise KeyError(game_id)
+        actor = self._game_actor(game_id)
+        return await actor.call(actor.offload, fn, *args)
+
     def make_move(self, player_id: str, x: int, y: int) -> bool:
-        """玩家在游戏中落子"""
+        """玩家在游戏中落子
+
+        在线上应通过 submit_move 调用，直接调用用于重放日志和基准测试"""
         state = self._player_state.get(player_id)
         if state is None or state.status != "in_game":
             return False
 
         game_id = state.game_id
         game_state = self._game_state[game_id].data
+        if game_state.status != "playing":
+            return False
 
         # 检查是否轮到该玩家落子
         if (
@@ -350,10 +672,26 @@ class ServerState:
         ):
             return False
         # 检查落子位置是否合法
+        if not (0 <= y < len(game_state.board) and 0 <= x < len(game_state.board[y])):
+            return False
         if game_state.board[y][x] != "empty":
             return False
+        # 扣除本回合用时，已经超时则判负
+        mover = game_state.current_turn
+        clock = self._clocks.get(game_id)
+        time_left = None
+        if clock is not None:
+            if not clock.charge(mover, self._now()):
+                self.finish_game(game_id, _opponent(mover), "timeout")
+                return False
+            time_left = clock.remaining[mover]
+            if mover == "black":
+                game_state.black_time_left = time_left
+            else:
+                game_state.white_time_left = time_left
         # 落子
         game_state.board[y][x] = game_state.current_turn
+        game_state.moves.append(y * len(game_state.board) + x)
         # 切换回合
         game_state.current_turn = (
             "white" if game_state.current_turn == "black" else "black"
@@ -364,13 +702,146 @@ class ServerState:
                 who="black" if game_state.current_turn == "white" else "white",
                 x=x,
                 y=y,
+                time_left=time_left,
             )
         )
+        self._journal_append("make_move", player_id, x, y)
+        if clock is not None:
+            self._journal_append("set_clock", game_id, mover, clock.remaining[mover])
+            self._clock_scheduler.schedule(
+                game_id, clock.deadline(game_state.current_turn), clock.version
+            )
+        # 判断胜负
+        if _has_five(game_state.board, x, y):
+            self.finish_game(game_id, mover, "five")
+        elif all(cell != "empty" for row in game_state.board for cell in row):
+            self.finish_game(game_id, None, "draw")
         return True
 
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def start_clock(self, game_id: str, clock: GameClock):
+        """为对局设置时钟并安排超时检测"""
+        game_state = self._game_state[game_id].data
+        self._clocks[game_id] = clock
+        self._clock_scheduler.schedule(
+            game_id, clock.deadline(game_state.current_turn), clock.version
+        )
+
+    def set_clock(self, game_id: str, color: Literal["black", "white"], left: float):
+        """设置某方的剩余时间（用于重放日志）"""
+        clock = self._clocks.get(game_id)
+        if clock is None:
+            return False
+        clock.remaining[color] = left
+        game_state = self._game_state[game_id].data
+        if color == "black":
+            game_state.black_time_left = left
+        else:
+            game_state.white_time_left = left
+        self._clock_scheduler.schedule(
+            game_id, clock.deadline(game_state.current_turn), clock.version
+        )
+        return True
+
+    def _on_clock_timeout(self, game_id: str, version: int):
+        """共享定时器到期回调，交给对局的 actor 执行，排在已到达的落子之后"""
+        if game_id in self._game_state:
+            self._game_actor(game_id).submit(self._flag_fall, game_id, version)
+
+    def _flag_fall(self, game_id: str, version: int):
+        """当前行棋方超时判负"""
+        clock = self._clocks.get(game_id)
+        game = self._game_state.get(game_id)
+        if clock is None or game is None or clock.version != version:
+            return
+        loser = game.data.current_turn
+        clock.remaining[loser] = 0.0
+        logger.info(f"Player {loser} flagged in game {game_id}")
+        self.finish_game(game_id, _opponent(loser), "timeout")
+
+    def finish_game(
+        self,
+        game_id: str,
+        winner: Literal["black", "white"] | None,
+        reason: Literal["five", "timeout", "draw"],
+    ) -> bool:
+        """结束对局，通知订阅者，双方玩家回到空闲状态"""
+        game = self._game_state.get(game_id)
+        if game is None or game.data.status != "playing":
+            return False
+        game_state = game.data
+        game_state.status = "finished"
+        game_state.winner = winner
+        game_state.reason = reason
+        self._clock_scheduler.cancel(game_id)
+        # 队列中剩余的命令仍会执行，它们会看到对局已结束
+        self._game_actors.pop(game_id, None)
+        clock = self._clocks.pop(game_id, None)
+        if clock is not None:
+            game_state.black_time_left = max(clock.remaining["black"], 0.0)
+            game_state.white_time_left = max(clock.remaining["white"], 0.0)
+        for player in (game_state.black_player_id, game_state.white_player_id):
+            player_state = self._player_state.get(player)
+            if player_state is not None and getattr(player_state, "game_id", None) == (
+                game_id
+            ):
+                del self._player_state[player]
+        game.notify(GameStateChangeGameOver(winner=winner, reason=reason))
+        # 五连和平局在重放落子时会再次判定，只有超时需要记录
+        if reason == "timeout":
+            self._journal_append("finish_game", game_id, winner or "", reason)
+        for listener in self.game_finished_listeners:
+            try:
+                listener(game_state)
+            except Exception:
+                logger.error(f"Game finished listener failed: {game_id}", exc_info=True)
+        # 保留一段时间供客户端读取最终状态，对局记录已由监听者（对局历史）保存
+        self._retention_scheduler.schedule(
+            game_id, self._now() + FINISHED_GAME_RETENTION_SECONDS, 0
+        )
+        return True
+
+    def _on_retention_expired(self, game_id: str, version: int):
+        self.remove_finished_game(game_id)
+
+    def remove_finished_game(self, game_id: str):
+        """删除已结束的对局，关闭仍在订阅的流"""
+        game = self._game_state.hot.get(game_id)
+        if game is not None:
+            if game.data.status != "finished":
+                return
+            game.notify(CLOSE)
+        if game_id in self._game_state:
+            del self._game_state[game_id]
+
     def __del__(self):
         self._matchmaking_task.cancel()
 
 
+def _has_five(board: list[list[Literal["black", "white", "empty"]]], x: int, y: int):
+    """检查 (x, y) 处的棋子是否连成五子"""
+    color = board[y][x]
+    for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+        count = 1
+        for sign in (1, -1):
+            cx, cy = x + sign * dx, y + sign * dy
+            while (
+                0 <= cy < len(board)
+                and 0 <= cx < len(board[cy])
+                and board[cy][cx] == color
+            ):
+                count += 1
+                cx, cy = cx + sign * dx, cy + sign * dy
+        if count >= 5:
+            return True
+    return False
+
+
+def _opponent(color: Literal["black", "white"]) -> Literal["black", "white"]:
+    return "white" if color == "black" else "black"
+
+
 # 全局单例
 server_state = ServerState()
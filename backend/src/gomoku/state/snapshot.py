@@ -0,0 +1,465 @@
+"""服务器状态快照
+
+快照是一个二进制文件，由文件头和一系列记录组成，写入和读取都逐条进行，
+不会在内存中构造完整的快照：
+
+    文件头: MAGIC + 版本号(u16)
+    记录:   类型(u8) + 长度(u32) + 内容
+    结尾:   类型为 RECORD_END 的空记录
+
+字符串编码为 长度(u16) + UTF-8 字节。
+"""
+
+import logging
+import math
+import os
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator, Literal
+
+from gomoku.state.game_clock import GameClock, TimeControl
+from gomoku.state.matchmaking import DEFAULT_RATING, QueueEntry
+from gomoku.state.room_id_manager import RoomIDManager
+from gomoku.state.server_state import (
+    GameState,
+    PlayerState,
+    PlayerStateInGame,
+    PlayerStateInRoom,
+    PlayerStateMatchmaking,
+    RoomState,
+    ServerState,
+    SubscribableGameState,
+    SubscribableRoomState,
+)
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"GMKS"
+VERSION = 5
+# 版本 1 没有日志代号记录，版本 2 没有对局结果和时钟，
+# 版本 3 的匹配记录没有等级分，版本 4 的对局记录没有结束原因和落子顺序，仍可读取
+SUPPORTED_VERSIONS = (1, 2, 3, 4, 5)
+
+RECORD_END = 0
+RECORD_PLAYER = 1
+RECORD_ROOM = 2
+RECORD_GAME = 3
+RECORD_MATCHMAKING = 4
+RECORD_ROOM_LEASE = 5
+RECORD_JOURNAL_GENERATION = 6
+RECORD_CLOCK = 7
+
+BOARD_SIZE = 15
+
+_HEADER = struct.Struct("<4sH")
+_RECORD_HEADER = struct.Struct("<BI")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_F64 = struct.Struct("<d")
+_U64 = struct.Struct("<Q")
+
+_PLAYER_STATUS = ["in_room", "in_game", "in_matchmaking"]
+_STONES: list[Literal["empty", "black", "white"]] = ["empty", "black", "white"]
+_STONE_CODES = {stone: i for i, stone in enumerate(_STONES)}
+_REASONS: list[Literal["five", "timeout", "draw"] | None] = [
+    None,
+    "five",
+    "timeout",
+    "draw",
+]
+_REASON_CODES = {reason: i for i, reason in enumerate(_REASONS)}
+
+
+class SnapshotError(Exception):
+    """快照文件损坏或版本不兼容"""
+
+
+class Writer:
+    """向 bytearray 追加基本类型"""
+
+    def __init__(self):
+        self.buf = bytearray()
+
+    def u8(self, value: int):
+        self.buf += _U8.pack(value)
+
+    def f64(self, value: float):
+        self.buf += _F64.pack(value)
+
+    def string(self, value: str):
+        data = value.encode()
+        self.buf += _U16.pack(len(data))
+        self.buf += data
+
+    def opt_string(self, value: str | None):
+        if value is None:
+            self.u8(0)
+        else:
+            self.u8(1)
+            self.string(value)
+
+
+class Reader:
+    """从 bytes 中依次读取基本类型"""
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def u8(self) -> int:
+        (value,) = _U8.unpack_from(self.data, self.pos)
+        self.pos += 1
+        return value
+
+    def f64(self) -> float:
+        (value,) = _F64.unpack_from(self.data, self.pos)
+        self.pos += 8
+        return value
+
+    def string(self) -> str:
+        (length,) = _U16.unpack_from(self.data, self.pos)
+        start = self.pos + 2
+        self.pos = start + length
+        return bytes(self.data[start : self.pos]).decode()
+
+    def opt_string(self) -> str | None:
+        return self.string() if self.u8() else None
+
+    def raw(self, length: int) -> bytes:
+        start = self.pos
+        self.pos += length
+        return bytes(self.data[start : self.pos])
+
+
+def pack_board(board: list[list[Literal["black", "white", "empty"]]]) -> bytes:
+    """每个格子 2 位，4 格一字节"""
+    codes = [_STONE_CODES[cell] for row in board for cell in row]
+    codes += [0] * (-len(codes) % 4)
+    return bytes(
+        codes[i] | codes[i + 1] << 2 | codes[i + 2] << 4 | codes[i + 3] << 6
+        for i in range(0, len(codes), 4)
+    )
+
+
+def unpack_board(data: bytes) -> list[list[Literal["black", "white", "empty"]]]:
+    cells = [_STONES[(byte >> shift) & 3] for byte in data for shift in (0, 2, 4, 6)]
+    return [
+        cells[row * BOARD_SIZE : (row + 1) * BOARD_SIZE] for row in range(BOARD_SIZE)
+    ]
+
+
+def encode_player(player: PlayerState) -> bytes:
+    w = Writer()
+    w.u8(_PLAYER_STATUS.index(player.status))
+    w.string(player.id)
+    if isinstance(player, PlayerStateInRoom):
+        w.string(player.room_id)
+    elif isinstance(player, PlayerStateInGame):
+        w.string(player.game_id)
+    return bytes(w.buf)
+
+
+def decode_player(data: bytes) -> PlayerState:
+    r = Reader(data)
+    status = _PLAYER_STATUS[r.u8()]
+    player_id = r.string()
+    if status == "in_room":
+        return PlayerStateInRoom(id=player_id, room_id=r.string())
+    if status == "in_game":
+        return PlayerStateInGame(id=player_id, game_id=r.string())
+    return PlayerStateMatchmaking(id=player_id)
+
+
+def encode_room(room: RoomState) -> bytes:
+    w = Writer()
+    w.string(room.id)
+    w.u8(len(room.players))
+    for player in room.players:
+        w.opt_string(player)
+    w.string(room.host)
+    w.u8(len(room.ready))
+    for player, ready in room.ready.items():
+        w.string(player)
+        w.u8(ready)
+    return bytes(w.buf)
+
+
+def decode_room(data: bytes) -> RoomState:
+    r = Reader(data)
+    room_id = r.string()
+    players = [r.opt_string() for _ in range(r.u8())]
+    host = r.string()
+    ready = {}
+    for _ in range(r.u8()):
+        player = r.string()
+        ready[player] = bool(r.u8())
+    return RoomState(id=room_id, players=players, host=host, ready=ready)
+
+
+def encode_game(game: GameState) -> bytes:
+    w = Writer()
+    w.string(game.id)
+    w.string(game.black_player_id)
+    w.string(game.white_player_id)
+    w.u8(_STONE_CODES[game.current_turn])
+    w.buf += pack_board(game.board)
+    w.u8(game.status == "finished")
+    w.u8(_STONE_CODES[game.winner or "empty"])
+    w.u8(_REASON_CODES[game.reason])
+    w.u8(len(game.moves))
+    w.buf += bytes(game.moves)
+    return bytes(w.buf)
+
+
+def decode_game(data: bytes) -> GameState:
+    r = Reader(data)
+    game_id = r.string()
+    black = r.string()
+    white = r.string()
+    current_turn = _STONES[r.u8()]
+    board = unpack_board(r.raw((BOARD_SIZE * BOARD_SIZE + 3) // 4))
+    game = GameState(
+        id=game_id,
+        board=board,
+        black_player_id=black,
+        white_player_id=white,
+        current_turn=current_turn,  # type: ignore
+    )
+    # 版本 3 起记录对局结果
+    if r.pos < len(data):
+        if r.u8():
+            game.status = "finished"
+        winner = _STONES[r.u8()]
+        game.winner = None if winner == "empty" else winner
+    # 版本 5 起记录结束原因和落子顺序
+    if r.pos < len(data):
+        game.reason = _REASONS[r.u8()]
+        game.moves = list(r.raw(r.u8()))
+    return game
+
+
+def encode_spilled_game(game: GameState) -> bytes:
+    """写入溢出文件的对局，另外记录双方剩余时间（快照中由时钟记录恢复）"""
+    w = Writer()
+    for left in (game.black_time_left, game.white_time_left):
+        w.f64(math.nan if left is None else left)
+    return bytes(w.buf) + encode_game(game)
+
+
+def decode_spilled_game(data: bytes) -> GameState:
+    r = Reader(data)
+    black_left = r.f64()
+    white_left = r.f64()
+    game = decode_game(r.raw(len(data) - r.pos))
+    game.black_time_left = None if math.isnan(black_left) else black_left
+    game.white_time_left = None if math.isnan(white_left) else white_left
+    return game
+
+
+def encode_clock(game_id: str, clock: GameClock, to_move: str, now: float) -> bytes:
+    """记录双方剩余时间，当前行棋方已用的时间计入其中"""
+    w = Writer()
+    w.string(game_id)
+    w.f64(clock.time_control.main_time)
+    w.f64(clock.time_control.increment)
+    for color in ("black", "white"):
+        w.f64(clock.time_left(color, now, to_move))  # type: ignore
+    return bytes(w.buf)
+
+
+def decode_clock(data: bytes, now: float) -> tuple[str, GameClock]:
+    """恢复的时钟从 now 开始计算当前回合，停机期间不计时"""
+    r = Reader(data)
+    game_id = r.string()
+    time_control = TimeControl(main_time=r.f64(), increment=r.f64())
+    remaining = {"black": r.f64(), "white": r.f64()}
+    return game_id, GameClock(time_control, remaining, turn_started_at=now)  # type: ignore
+
+
+def encode_matchmaking(entry: QueueEntry, now: float) -> bytes:
+    w = Writer()
+    w.string(entry.player_id)
+    w.f64(entry.rating)
+    w.f64(now - entry.joined_at)
+    return bytes(w.buf)
+
+
+def decode_matchmaking(data: bytes) -> tuple[str, float, float]:
+    """返回 (玩家 ID, 等级分, 已等待秒数)，旧快照只有玩家 ID"""
+    r = Reader(data)
+    player_id = r.string()
+    if r.pos < len(data):
+        return player_id, r.f64(), r.f64()
+    return player_id, DEFAULT_RATING, 0.0
+
+
+def encode_lease(room_id: str, age: float) -> bytes:
+    w = Writer()
+    w.string(room_id)
+    w.f64(age)
+    return bytes(w.buf)
+
+
+def decode_lease(data: bytes) -> tuple[str, float]:
+    r = Reader(data)
+    return r.string(), r.f64()
+
+
+def iter_records(
+    state: ServerState, room_ids: RoomIDManager, journal_generation: int | None
+) -> Iterator[tuple[int, bytes]]:
+    """逐条生成快照记录"""
+    if journal_generation is not None:
+        yield RECORD_JOURNAL_GENERATION, _U64.pack(journal_generation)
+    for player in state._player_state.values():
+        yield RECORD_PLAYER, encode_player(player)
+    for room in state._room_state.values():
+        yield RECORD_ROOM, encode_room(room.data)
+    # 磁盘上的对局解码后直接写入，不读回内存。已结束的对局即将删除，不写入
+    to_move: dict[str, str] = {}
+    for game in state._game_state.iter_data():
+        if game.status == "finished":
+            continue
+        yield RECORD_GAME, encode_game(game)
+        if game.id in state._clocks:
+            to_move[game.id] = game.current_turn
+    for game_id, clock in state._clocks.items():
+        yield RECORD_CLOCK, encode_clock(game_id, clock, to_move[game_id], state._now())
+    for entry in state._matchmaking_queue:
+        yield RECORD_MATCHMAKING, encode_matchmaking(entry, state._now())
+    for room_id, age in room_ids.export_leases():
+        yield RECORD_ROOM_LEASE, encode_lease(room_id, age)
+
+
+@dataclass
+class SnapshotStats:
+    records: int
+    bytes: int
+    seconds: float
+    journal_generation: int = 0  # 快照之后的变更记录在这一代日志中
+
+
+def write_records(f: BinaryIO, records: Iterator[tuple[int, bytes]]) -> int:
+    """写入文件头和所有记录，返回记录数"""
+    f.write(_HEADER.pack(MAGIC, VERSION))
+    count = 0
+    for tag, payload in records:
+        f.write(_RECORD_HEADER.pack(tag, len(payload)))
+        f.write(payload)
+        count += 1
+    f.write(_RECORD_HEADER.pack(RECORD_END, 0))
+    return count
+
+
+def read_records(f: BinaryIO) -> Iterator[tuple[int, bytes]]:
+    """校验文件头并逐条读取记录"""
+    header = f.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise SnapshotError("Truncated snapshot header")
+    magic, version = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise SnapshotError("Not a snapshot file")
+    if version not in SUPPORTED_VERSIONS:
+        raise SnapshotError(f"Unsupported snapshot version {version}")
+    while True:
+        record_header = f.read(_RECORD_HEADER.size)
+        if len(record_header) != _RECORD_HEADER.size:
+            raise SnapshotError("Truncated snapshot record")
+        tag, length = _RECORD_HEADER.unpack(record_header)
+        if tag == RECORD_END:
+            return
+        payload = f.read(length)
+        if len(payload) != length:
+            raise SnapshotError("Truncated snapshot record")
+        yield tag, payload
+
+
+def write_snapshot(
+    state: ServerState, room_ids: RoomIDManager, path: Path
+) -> SnapshotStats:
+    """将当前状态写入快照文件，先写临时文件再原子替换
+
+    如果启用了日志，快照完成后日志切换到新一代，旧日志中的记录已包含在快照中"""
+    start = time.perf_counter()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    generation = None if state.journal is None else state.journal.generation + 1
+    with open(tmp_path, "wb") as f:
+        count = write_records(f, iter_records(state, room_ids, generation))
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    os.replace(tmp_path, path)
+    if state.journal is not None and generation is not None:
+        state.journal.switch_generation(generation)
+    stats = SnapshotStats(
+        records=count,
+        bytes=size,
+        seconds=time.perf_counter() - start,
+        journal_generation=generation or 0,
+    )
+    logger.info(
+        f"Wrote snapshot {path}: {stats.records} records, {stats.bytes} bytes "
+        f"in {stats.seconds * 1000:.1f}ms"
+    )
+    return stats
+
+
+def restore_snapshot(
+    state: ServerState, room_ids: RoomIDManager, path: Path
+) -> SnapshotStats:
+    """从快照文件恢复状态，替换 state 中的现有内容"""
+    start = time.perf_counter()
+    state._player_state.clear()
+    state._room_state.clear()
+    state._game_state.clear()
+    state._matchmaking_queue.clear()
+    state._clocks.clear()
+    state.lobby.clear()
+    clocks: list[tuple[str, GameClock]] = []
+    count = 0
+    journal_generation = 0
+    with open(path, "rb") as f:
+        for tag, payload in read_records(f):
+            count += 1
+            if tag == RECORD_PLAYER:
+                player = decode_player(payload)
+                state._player_state[player.id] = player
+            elif tag == RECORD_ROOM:
+                room = decode_room(payload)
+                state._room_state[room.id] = SubscribableRoomState(room)
+                state.lobby.update(room.id, room.host, room.players)
+            elif tag == RECORD_GAME:
+                game = decode_game(payload)
+                state._game_state[game.id] = SubscribableGameState(game)
+            elif tag == RECORD_MATCHMAKING:
+                player_id, rating, waited = decode_matchmaking(payload)
+                state._matchmaking_queue.add(player_id, rating, state._now() - waited)
+            elif tag == RECORD_ROOM_LEASE:
+                room_ids.restore_lease(*decode_lease(payload))
+            elif tag == RECORD_JOURNAL_GENERATION:
+                (journal_generation,) = _U64.unpack(payload)
+            elif tag == RECORD_CLOCK:
+                clocks.append(decode_clock(payload, state._now()))
+            else:
+                logger.warning(f"Skipping unknown snapshot record type {tag}")
+        size = f.tell()
+    # 时钟记录在对局记录之后，但仍等全部读完再启动计时
+    for game_id, clock in clocks:
+        game = state._game_state[game_id].data
+        game.black_time_left = clock.remaining["black"]
+        game.white_time_left = clock.remaining["white"]
+        state.start_clock(game_id, clock)
+    stats = SnapshotStats(
+        records=count,
+        bytes=size,
+        seconds=time.perf_counter() - start,
+        journal_generation=journal_generation,
+    )
+    logger.info(
+        f"Restored snapshot {path}: {stats.records} records "
+        f"in {stats.seconds * 1000:.1f}ms"
+    )
+    return stats
@@ -2,7 +2,10 @@ import asyncio
 import logging
 from typing import Any, Callable, Generic, TypeVar
 
+from gomoku.utils.log_sampling import SampledLogger
+
 logger = logging.getLogger(__name__)
+sampled_logger = SampledLogger(logger)
 
 S = TypeVar("S")  # State 类型
 E = TypeVar("E")  # Event/Message 类型
@@ -15,6 +18,10 @@ class SubscribableState(Generic[S, E]):
         self.data = data
         self._queues: dict[str, asyncio.Queue[E]] = {}
 
+    @property
+    def subscribers(self) -> int:
+        return len(self._queues)
+
     def subscribe(self, queue_id: str) -> tuple[asyncio.Queue[E], S]:
         """为玩家订阅消息队列
 
@@ -36,4 +43,4 @@ class SubscribableState(Generic[S, E]):
             try:
                 queue.put_nowait(event)
             except asyncio.QueueFull:
-                logger.warning("A player's queue is full; dropping event.")
+                sampled_logger.warning("A player's queue is full; dropping event.")
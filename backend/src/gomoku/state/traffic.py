@@ -0,0 +1,271 @@
+"""流量录制
+
+`TrafficRecorder` 挂到 ServerState 上后，记录每一次改变状态的调用（无论成功与否）、
+调用时间和结果，用于之后以相同的负载重放。玩家 ID 按首次出现的顺序替换为
+p1、p2……，录制文件中不包含真实的玩家 ID。
+
+匹配由服务器决定，也作为一条记录（match_players）写入，进程内重放时直接按录制的
+结果配对，不运行匹配循环，因此重放是确定的。
+
+    文件头: MAGIC + 版本号(u16)
+    记录:   长度(u16) + 时间(f64，相对录制开始的秒数) + 命令(u8) + 参数
+            + 是否成功(u8) + [新房间 ID]
+"""
+
+import asyncio
+import functools
+import inspect
+import logging
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator
+
+from gomoku.state.journal import apply_command
+from gomoku.state.room_id_manager import room_id_manager
+from gomoku.state.server_state import ServerState
+from gomoku.state.snapshot import Reader, Writer
+from gomoku.utils.log_sampling import SampledLogger
+
+logger = logging.getLogger(__name__)
+sampled_logger = SampledLogger(logger)
+
+MAGIC = b"GMKT"
+VERSION = 1
+
+# 写入文件的间隔，单位秒
+FLUSH_INTERVAL = 1.0
+
+_HEADER = struct.Struct("<4sH")
+_LENGTH = struct.Struct("<H")
+
+# 小整数参数（落子坐标）超出 u8 范围时记为该值，它同样不在棋盘上，重放时也会失败
+OUT_OF_RANGE = 255
+
+# 命令名 -> (编号, 参数格式)，p 为玩家 ID（匿名化），r 为房间 ID，
+# b 为布尔，i 为小整数，f 为浮点数
+OPS: dict[str, tuple[int, str]] = {
+    "create_room": (1, "p"),
+    "join_room": (2, "pr"),
+    "leave_room": (3, "p"),
+    "set_ready": (4, "pb"),
+    "kick_player": (5, "pp"),
+    "start_game": (6, "p"),
+    "make_move": (7, "pii"),
+    "join_matchmaking": (8, "pf"),
+    "leave_matchmaking": (9, "p"),
+    "match_players": (10, "pp"),
+}
+_OPS_BY_CODE = {code: (name, fmt) for name, (code, fmt) in OPS.items()}
+# 成功时会产生新房间的命令，记录中附带房间 ID
+ROOM_RESULT_OPS = ("create_room", "match_players")
+
+
+@dataclass
+class TrafficRecord:
+    time: float
+    op: str
+    args: list
+    success: bool
+    room_id: str | None = None
+
+
+def encode_record(record: TrafficRecord) -> bytes:
+    code, fmt = OPS[record.op]
+    w = Writer()
+    w.f64(record.time)
+    w.u8(code)
+    for kind, arg in zip(fmt, record.args, strict=True):
+        if kind in "pr":
+            w.string(arg)
+        elif kind == "f":
+            w.f64(arg)
+        else:
+            w.u8(int(arg))
+    w.u8(record.success)
+    if record.op in ROOM_RESULT_OPS and record.success:
+        w.string(record.room_id or "")
+    return _LENGTH.pack(len(w.buf)) + bytes(w.buf)
+
+
+def decode_record(data: bytes) -> TrafficRecord:
+    r = Reader(data)
+    t = r.f64()
+    op, fmt = _OPS_BY_CODE[r.u8()]
+    args: list = []
+    for kind in fmt:
+        if kind in "pr":
+            args.append(r.string())
+        elif kind == "b":
+            args.append(bool(r.u8()))
+        elif kind == "f":
+            args.append(r.f64())
+        else:
+            args.append(r.u8())
+    record = TrafficRecord(time=t, op=op, args=args, success=bool(r.u8()))
+    if op in ROOM_RESULT_OPS and record.success:
+        record.room_id = r.string()
+    return record
+
+
+def read_capture(path: Path) -> Iterator[TrafficRecord]:
+    """按时间顺序读取录制的调用，忽略写了一半的尾部"""
+    with open(path, "rb") as f:
+        magic, version = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Unsupported traffic capture {path}")
+        while True:
+            header = f.read(_LENGTH.size)
+            if len(header) != _LENGTH.size:
+                return
+            (length,) = _LENGTH.unpack(header)
+            payload = f.read(length)
+            if len(payload) != length:
+                return
+            yield decode_record(payload)
+
+
+def apply_record(
+    state: ServerState, record: TrafficRecord, room_ids: dict[str, str]
+) -> bool:
+    """在 state 上重放一条录制的调用，返回是否成功
+
+    room_ids 把录制时的房间 ID 映射为重放时分配的房间 ID，由本函数维护"""
+    args = list(record.args)
+    if record.op == "join_room":
+        room_id = room_ids.get(args[1])
+        if room_id is None:
+            return False
+        args[1] = room_id
+    if record.op == "match_players":
+        # 按录制时的结果配对，房间 ID 由重放时的房间 ID 管理器分配
+        if not record.success:
+            return False
+        room_id = room_id_manager.acquire_room_id()
+        apply_command(state, "match_players", [*args, room_id])
+        room_ids[record.room_id] = room_id
+        return True
+    result = getattr(state, record.op)(*args)
+    if record.op == "create_room" and result is not None and record.room_id:
+        room_ids[record.room_id] = result
+    return result is not None and result is not False
+
+
+class TrafficRecorder:
+    """把 ServerState 上改变状态的调用录制到文件"""
+
+    def __init__(self, path: Path, clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.clock = clock
+        self.records = 0
+        self._start = clock()
+        self._players: dict[str, str] = {}
+        self._buffer: list[bytes] = []
+        self._state: ServerState | None = None
+        self._file = None
+        # 关闭时的写入可能与后台线程中尚未完成的写入重叠
+        self._write_lock = threading.Lock()
+        self._pending = asyncio.Event()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    def anonymize(self, player_id: str) -> str:
+        anonymous = self._players.get(player_id)
+        if anonymous is None:
+            anonymous = self._players[player_id] = f"p{len(self._players) + 1}"
+        return anonymous
+
+    def attach(self, state: ServerState):
+        """包装 state 上的命令方法，之后的调用都会被录制"""
+        self._state = state
+        for op in OPS:
+            setattr(state, op, self._wrap(op, getattr(state, op)))
+
+    def detach(self):
+        """恢复原来的方法"""
+        if self._state is not None:
+            for op in OPS:
+                self._state.__dict__.pop(op, None)
+            self._state = None
+
+    def _wrap(self, op: str, method):
+        fmt = OPS[op][1]
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def recorded(*args, **kwargs):
+            result = method(*args, **kwargs)
+            # 录制失败不能影响调用本身
+            try:
+                # 补全省略的默认参数，只记录格式中列出的参数
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                self._record(op, fmt, tuple(bound.arguments.values()), result)
+            except Exception as e:
+                sampled_logger.warning("Failed to record %s call: %r", op, e)
+            return result
+
+        return recorded
+
+    def _record(self, op: str, fmt: str, args: tuple, result):
+        if op == "match_players":
+            success, room_id = True, args[2]
+        else:
+            success = result is not None and result is not False
+            room_id = result if op == "create_room" and success else None
+        recorded_args = []
+        for kind, arg in zip(fmt, args[: len(fmt)]):
+            if kind == "p":
+                arg = self.anonymize(arg)
+            elif kind == "i" and not 0 <= arg < OUT_OF_RANGE:
+                arg = OUT_OF_RANGE
+                success = False
+            recorded_args.append(arg)
+        record = TrafficRecord(
+            time=self.clock() - self._start,
+            op=op,
+            args=recorded_args,
+            success=success,
+            room_id=room_id,
+        )
+        self._buffer.append(encode_record(record))
+        self.records += 1
+        self._pending.set()
+
+    async def close(self):
+        self.detach()
+        self._flush_task.cancel()
+        await asyncio.to_thread(self._write, self._take_buffer())
+        with self._write_lock:
+            self._file.close()
+            self._file = None
+        logger.info(f"Recorded {self.records} calls to {self.path}")
+
+    def _take_buffer(self) -> bytes:
+        data = b"".join(self._buffer)
+        self._buffer.clear()
+        return data
+
+    def _write(self, data: bytes):
+        """在线程中执行，不需要 fsync，丢失尾部只会让录制短一点"""
+        with self._write_lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "wb")
+                self._file.write(_HEADER.pack(MAGIC, VERSION))
+            self._file.write(data)
+            self._file.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await self._pending.wait()
+            await asyncio.sleep(FLUSH_INTERVAL)
+            self._pending.clear()
+            try:
+                await asyncio.to_thread(self._write, self._take_buffer())
+            except OSError:
+                logger.error("Failed to write traffic capture", exc_info=True)
+
+    def __del__(self):
+        self._flush_task.cancel()
@@ -0,0 +1,262 @@
+"""按接口统计请求各阶段的耗时
+
+api_loader 生成的每个路由都使用 `TracedRoute`，每个请求记录以下阶段（span）：
+
+- auth: 认证依赖（校验 JWT）的耗时
+- queue: 定义了 EXECUTOR 的接口从提交到池中开始执行的等待时间，包含在 handler 中
+- handler: 接口文件中 handle 的耗时，返回 EncodedResponse 的接口包含编码时间
+- serialize: handle 返回后校验并序列化响应模型的耗时
+- total: 从路由开始处理请求到生成响应，包括解析请求体和限流
+- first_byte: 流式响应（SSE）从开始处理请求到发出第一个数据块
+
+每个接口的每个阶段对应一个固定分桶的直方图，记录一次只需一次二分查找。
+超过 SLOW_REQUEST_MS 的请求按接口限流输出日志，附带 handle 的参数，
+密码、令牌等字段的值不写入日志。
+"""
+
+import bisect
+import contextvars
+import functools
+import logging
+import time
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+from gomoku.env import SLOW_REQUEST_MS
+from gomoku.utils.log_sampling import SampledLogger
+
+logger = logging.getLogger(__name__)
+sampled_logger = SampledLogger(logger)
+
+# 直方图桶的上界，单位毫秒：0.01, 0.025, 0.05, 0.1 …… 5000，最后一个桶没有上界
+BUCKET_BOUNDS_MS = tuple(m * 10**e for e in range(-2, 4) for m in (1, 2.5, 5))
+_BUCKET_BOUNDS = tuple(bound / 1000 for bound in BUCKET_BOUNDS_MS)
+
+SPANS = ("auth", "queue", "handler", "serialize", "total", "first_byte")
+
+# 慢请求日志中每个参数的最大长度
+MAX_ARGUMENT_REPR = 200
+# 名称中含有这些词的参数、模型字段和字典键不写入慢请求日志
+SENSITIVE_NAMES = ("password", "token", "secret")
+REDACTED = "***"
+
+
+class LatencyHistogram:
+    """固定分桶的耗时直方图，分位数取所在桶的上界"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """返回秒数，落在最后一个桶时返回最大值"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if index == len(_BUCKET_BOUNDS):
+                    return self.max
+                return min(_BUCKET_BOUNDS[index], self.max)
+        return self.max
+
+
+class RouteTrace:
+    """一个请求的计时，通过 contextvar 传给认证依赖和 handle 的包装"""
+
+    __slots__ = (
+        "endpoint",
+        "start",
+        "auth",
+        "queue",
+        "handler",
+        "handler_end",
+        "arguments",
+    )
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.auth = 0.0
+        self.queue: float | None = None
+        self.handler: float | None = None
+        self.handler_end = 0.0
+        self.arguments: dict | None = None
+
+
+current_trace: contextvars.ContextVar[RouteTrace | None] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+
+
+def is_sensitive(name: str) -> bool:
+    name = name.lower()
+    return any(word in name for word in SENSITIVE_NAMES)
+
+
+def format_value(value) -> str:
+    """类似 repr，名称敏感的模型字段和字典键的值替换为 ***"""
+    if isinstance(value, BaseModel):
+        fields = ", ".join(
+            f"{name}={REDACTED if is_sensitive(name) else format_value(field)}"
+            for name, field in value
+        )
+        return f"{type(value).__name__}({fields})"
+    if isinstance(value, dict):
+        items = ", ".join(
+            f"{key!r}: "
+            + (REDACTED if is_sensitive(str(key)) else format_value(item))
+            for key, item in value.items()
+        )
+        return "{" + items + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(format_value(item) for item in value) + "]"
+    return repr(value)
+
+
+def format_arguments(arguments: dict | None) -> str:
+    if not arguments:
+        return "{}"
+    return (
+        "{"
+        + ", ".join(
+            f"{name}="
+            + (REDACTED if is_sensitive(name) else format_value(value))[
+                :MAX_ARGUMENT_REPR
+            ]
+            for name, value in arguments.items()
+        )
+        + "}"
+    )
+
+
+class RouteMetrics:
+    """各接口各阶段的直方图"""
+
+    def __init__(self, slow_threshold_ms: float = SLOW_REQUEST_MS):
+        # 0 表示不输出慢请求日志
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.since = time.time()
+        # (接口, 阶段) -> 直方图
+        self.histograms: dict[tuple[str, str], LatencyHistogram] = {}
+
+    def record(self, endpoint: str, span: str, seconds: float):
+        key = (endpoint, span)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def finish(self, trace: RouteTrace, end: float):
+        """路由生成响应后调用"""
+        endpoint = trace.endpoint
+        total = end - trace.start
+        self.record(endpoint, "total", total)
+        if trace.auth:
+            self.record(endpoint, "auth", trace.auth)
+        if trace.queue is not None:
+            self.record(endpoint, "queue", trace.queue)
+        if trace.handler is not None:
+            self.record(endpoint, "handler", trace.handler)
+            self.record(endpoint, "serialize", end - trace.handler_end)
+        if self.slow_threshold and total >= self.slow_threshold:
+            # 模板中包含接口路径，每个接口单独限流
+            sampled_logger.warning(
+                f"Slow request {endpoint}: total %.1fms auth %.1fms "
+                "queue %.1fms handler %.1fms args %s",
+                total * 1000,
+                trace.auth * 1000,
+                (trace.queue or 0.0) * 1000,
+                (trace.handler or 0.0) * 1000,
+                format_arguments(trace.arguments),
+            )
+
+    def first_byte(self, trace: RouteTrace):
+        """流式响应发出第一个数据块时调用"""
+        elapsed = time.perf_counter() - trace.start
+        self.record(trace.endpoint, "first_byte", elapsed)
+        if self.slow_threshold and elapsed >= self.slow_threshold:
+            sampled_logger.warning(
+                f"Slow first byte {trace.endpoint}: %.1fms args %s",
+                elapsed * 1000,
+                format_arguments(trace.arguments),
+            )
+
+    def wrap_body(
+        self, body: AsyncIterator[bytes], trace: RouteTrace
+    ) -> AsyncIterator[bytes]:
+        async def iterate():
+            first = True
+            async for chunk in body:
+                if first:
+                    first = False
+                    self.first_byte(trace)
+                yield chunk
+
+        return iterate()
+
+    def reset(self):
+        self.histograms.clear()
+        self.since = time.time()
+
+
+def time_dependency(dependency):
+    """包装认证依赖，把耗时累加到当前请求的 auth 阶段
+
+    同一个依赖必须始终使用同一个包装，FastAPI 才能在一个请求内缓存它的结果"""
+
+    @functools.wraps(dependency)
+    async def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await dependency(*args, **kwargs)
+        finally:
+            trace = current_trace.get()
+            if trace is not None:
+                trace.auth += time.perf_counter() - start
+
+    return timed
+
+
+class TracedRoute(APIRoute):
+    """为每个请求建立 RouteTrace，并在生成响应后记录各阶段耗时"""
+
+    def get_route_handler(self):
+        route_handler = super().get_route_handler()
+        endpoint = self.path
+
+        async def traced_route_handler(request):
+            trace = RouteTrace(endpoint)
+            token = current_trace.set(trace)
+            try:
+                response = await route_handler(request)
+            finally:
+                current_trace.reset(token)
+                route_metrics.finish(trace, time.perf_counter())
+            if isinstance(response, StreamingResponse):
+                response.body_iterator = route_metrics.wrap_body(
+                    response.body_iterator, trace
+                )
+            return response
+
+        return traced_route_handler
+
+
+# 全局单例
+route_metrics = RouteMetrics()
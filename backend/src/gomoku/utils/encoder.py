@@ -0,0 +1,166 @@
+"""为 dataclass 预编译 camelCase JSON 编码器
+
+用 `@camel_encoded` 装饰 dataclass 后，会在定义时把字段名转换为 camelCase，
+并根据字段类型生成专用的编码函数。编码时直接拼接 JSON 文本并输出 bytes，
+不再经过 `asdict` 和中间字典。
+"""
+
+import dataclasses
+import json
+import types
+import typing
+from json.encoder import encode_basestring
+from typing import Any, Callable, Literal, TypeVar, Union
+
+T = TypeVar("T")
+
+Encoder = Callable[[Any], str]
+
+# 已编译的编码器，键为 dataclass 类型
+_encoders: dict[type, Encoder] = {}
+
+
+def to_camel_case(s: str) -> str:
+    parts = s.split("_")
+    return parts[0] + "".join(word.capitalize() for word in parts[1:])
+
+
+def _encode_bool(value: bool) -> str:
+    return "true" if value else "false"
+
+
+def _encode_any(value: Any) -> str:
+    """未知类型的兜底编码，已注册的 dataclass 仍走预编译路径"""
+    encoder = _encoders.get(type(value))
+    if encoder is not None:
+        return encoder(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _encode_dispatch(value: Any) -> str:
+    """联合类型按运行时类型分发"""
+    if value is None:
+        return "null"
+    return _encoders.get(type(value), _encode_any)(value)
+
+
+def _compile_type(tp: Any) -> Encoder:
+    """根据类型注解生成值编码函数"""
+    if tp is str:
+        return encode_basestring
+    if tp is bool:
+        return _encode_bool
+    if tp is int:
+        return int.__repr__
+    if tp is float:
+        return float.__repr__
+    if tp is type(None):
+        return lambda _: "null"
+    if tp in _encoders:
+        return _encoders[tp]
+
+    origin = typing.get_origin(tp)
+    args = typing.get_args(tp)
+
+    if origin is Literal:
+        if all(isinstance(a, str) for a in args):
+            table = {a: encode_basestring(a) for a in args}
+            return table.__getitem__
+        return _encode_any
+
+    if origin is Union or origin is types.UnionType:
+        non_none = [a for a in args if a is not type(None)]
+        if len(non_none) == 1:
+            inner = _compile_type(non_none[0])
+            return lambda v: "null" if v is None else inner(v)
+        return _encode_dispatch
+
+    if origin is list and len(args) == 1:
+        inner = _compile_type(args[0])
+        return lambda v: "[" + ",".join(map(inner, v)) + "]"
+
+    if origin is tuple and args:
+        # tuple[X, ...]：变长，每个元素同一类型
+        if len(args) == 2 and args[1] is Ellipsis:
+            inner = _compile_type(args[0])
+            return lambda v: "[" + ",".join(map(inner, v)) + "]"
+        # tuple[X, Y]：定长，每个位置各自的编码器
+        if Ellipsis not in args:
+            inners = tuple(_compile_type(a) for a in args)
+
+            def encode_tuple(v) -> str:
+                if len(v) != len(inners):
+                    return _encode_any(v)
+                return "[" + ",".join(f(item) for f, item in zip(inners, v)) + "]"
+
+            return encode_tuple
+        return _encode_any
+
+    if origin is dict and len(args) == 2:
+        inner = _compile_type(args[1])
+        return lambda v: (
+            "{"
+            + ",".join(
+                encode_basestring(k) + ":" + inner(item) for k, item in v.items()
+            )
+            + "}"
+        )
+
+    return _encode_any
+
+
+def _compile_dataclass(cls: type, omit_none: bool) -> Encoder:
+    """生成形如 `'{"id":' + f0(obj.id) + ...` 的专用编码函数"""
+    hints = typing.get_type_hints(cls)
+    namespace: dict[str, Any] = {}
+    lines = ["def encode(obj):"]
+
+    if omit_none:
+        lines.append("    parts = []")
+        for i, field in enumerate(dataclasses.fields(cls)):
+            namespace[f"f{i}"] = _compile_type(hints[field.name])
+            key = encode_basestring(to_camel_case(field.name)) + ":"
+            lines.append(f"    v = obj.{field.name}")
+            lines.append("    if v is not None:")
+            lines.append(f"        parts.append({key!r} + f{i}(v))")
+        lines.append('    return "{" + ",".join(parts) + "}"')
+    else:
+        pieces = []
+        for i, field in enumerate(dataclasses.fields(cls)):
+            namespace[f"f{i}"] = _compile_type(hints[field.name])
+            sep = "{" if i == 0 else ","
+            key = sep + encode_basestring(to_camel_case(field.name)) + ":"
+            pieces.append(f"{key!r} + f{i}(obj.{field.name})")
+        if pieces:
+            lines.append("    return " + " + ".join(pieces) + " + '}'")
+        else:
+            lines.append("    return '{}'")
+
+    exec("\n".join(lines), namespace)
+    return namespace["encode"]
+
+
+def camel_encoded(cls: type[T] | None = None, *, omit_none: bool = False):
+    """为 dataclass 注册预编译的 camelCase 编码器
+
+    omit_none=True 时值为 None 的字段不会出现在输出中"""
+
+    def wrap(cls: type[T]) -> type[T]:
+        if not dataclasses.is_dataclass(cls):
+            raise TypeError(f"{cls.__name__} is not a dataclass")
+        _encoders[cls] = _compile_dataclass(cls, omit_none)
+        return cls
+
+    if cls is None:
+        return wrap
+    return wrap(cls)
+
+
+def encode_str(obj: Any) -> str:
+    """将已注册的 dataclass 编码为 JSON 字符串"""
+    return _encoders[type(obj)](obj)
+
+
+def encode(obj: Any) -> bytes:
+    """将已注册的 dataclass 编码为 UTF-8 JSON bytes"""
+    return _encoders[type(obj)](obj).encode()
@@ -0,0 +1,47 @@
+"""高频日志的限流
+
+每个请求都可能触发的日志不应逐条输出。`SampledLogger` 按消息模板限流：
+每个模板在一个时间窗口内只输出第一条，窗口结束后的下一条会附带期间被省略的条数。
+消息需要使用 %-格式的模板和参数，模板本身作为限流的键。
+"""
+
+import logging
+import time
+
+# 默认的限流窗口，单位秒
+DEFAULT_INTERVAL = 10.0
+
+
+class SampledLogger:
+    """按消息模板限流的日志包装"""
+
+    def __init__(self, logger: logging.Logger, interval: float = DEFAULT_INTERVAL):
+        self.logger = logger
+        self.interval = interval
+        # 消息模板 -> (窗口开始时间, 窗口内被省略的条数)
+        self._windows: dict[str, tuple[float, int]] = {}
+
+    def _log(self, level: int, msg: str, args: tuple):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        window = self._windows.get(msg)
+        if window is not None and now - window[0] < self.interval:
+            self._windows[msg] = (window[0], window[1] + 1)
+            return
+        self._windows[msg] = (now, 0)
+        suppressed = window[1] if window is not None else 0
+        if suppressed:
+            msg = f"{msg} (%d similar messages suppressed)"
+            args = (*args, suppressed)
+        # stacklevel 让日志中的行号指向调用方
+        self.logger.log(level, msg, *args, stacklevel=3)
+
+    def debug(self, msg: str, *args):
+        self._log(logging.DEBUG, msg, args)
+
+    def info(self, msg: str, *args):
+        self._log(logging.INFO, msg, args)
+
+    def warning(self, msg: str, *args):
+        self._log(logging.WARNING, msg, args)
@@ -1,25 +1,208 @@
-import json
-from typing import Any, AsyncGenerator
+import asyncio
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Callable, Iterator
 
+from fastapi.responses import Response
 
-def to_camel_case(s: str) -> str:
-    parts = s.split("_")
-    return parts[0] + "".join(word.capitalize() for word in parts[1:])
+from gomoku.env import SSE_HEARTBEAT_SECONDS
+from gomoku.utils.encoder import encode
+from gomoku.utils.log_sampling import SampledLogger
 
+logger = logging.getLogger(__name__)
+sampled_logger = SampledLogger(logger)
 
-def convert_keys_to_camel_case(obj):
-    if isinstance(obj, dict):
-        return {to_camel_case(k): convert_keys_to_camel_case(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_keys_to_camel_case(item) for item in obj]
-    else:
-        return obj
+# 心跳帧为 SSE 注释，客户端 EventSource 会忽略
+HEARTBEAT_FRAME = b":\n\n"
+
+# 连续这么多次心跳未被发出时，认为连接已失效
+MAX_MISSED_HEARTBEATS = 2
+
+# 时间轮的槽数，每个心跳周期内所有流被分散到各槽依次检查
+WHEEL_SLOTS = 16
+
+
+class Heartbeat:
+    """放入订阅队列的心跳标记"""
+
+
+class Close:
+    """放入订阅队列的关闭标记，流收到后正常结束"""
+
+
+HEARTBEAT = Heartbeat()
+CLOSE = Close()
+
+
+class SSEStream:
+    """一个打开的 SSE 流"""
+
+    __slots__ = (
+        "kind",
+        "queue",
+        "release",
+        "task",
+        "opened_at",
+        "active",
+        "missed",
+        "slot",
+    )
+
+    def __init__(
+        self,
+        kind: str,
+        queue: asyncio.Queue,
+        release: Callable[[], None] | None,
+        opened_at: float,
+        slot: int,
+    ):
+        self.kind = kind
+        self.queue = queue
+        self.release = release  # 释放订阅队列，只会被调用一次
+        self.task = asyncio.current_task()
+        self.opened_at = opened_at
+        self.active = True  # 自上次检查以来是否发出过帧
+        self.missed = 0  # 连续未被发出的心跳数
+        self.slot = slot
+
+    def mark_sent(self):
+        """发出了一个事件帧"""
+        self.active = True
+
+    def mark_heartbeat_sent(self):
+        """心跳标记已被消费并发出"""
+        self.missed = 0
+
+    def close(self):
+        """释放订阅队列，可重复调用"""
+        release, self.release = self.release, None
+        if release is not None:
+            release()
+
+
+@dataclass
+class StreamStats:
+    count: int
+    oldest_age: float
+    median_age: float
+
+
+class StreamRegistry:
+    """所有打开的 SSE 流，由一个共享的时间轮驱动心跳
+
+    每个 tick 只检查一个槽中的流：空闲的流会收到一个心跳标记，
+    心跳标记长时间未被消费的流（客户端不再读取）会被取消。"""
+
+    def __init__(self):
+        self._wheel: list[set[SSEStream]] = [set() for _ in range(WHEEL_SLOTS)]
+        self._next_slot = 0
+        self._tick_task = asyncio.create_task(self._tick())
+
+    @contextmanager
+    def track(
+        self,
+        kind: str,
+        queue: asyncio.Queue,
+        release: Callable[[], None] | None = None,
+    ) -> Iterator[SSEStream]:
+        """在流的生命周期内登记该流，结束或判定失效时调用 release 释放订阅"""
+        slot = self._next_slot
+        self._next_slot = (self._next_slot + 1) % WHEEL_SLOTS
+        stream = SSEStream(
+            kind, queue, release, asyncio.get_running_loop().time(), slot
+        )
+        self._wheel[slot].add(stream)
+        try:
+            yield stream
+        finally:
+            self._wheel[slot].discard(stream)
+            stream.close()
+
+    def close_all(self) -> int:
+        """通知所有流结束，客户端会自动重连，返回流的数量"""
+        count = 0
+        for stream in self:
+            stream.queue.put_nowait(CLOSE)
+            count += 1
+        return count
+
+    def __iter__(self) -> Iterator[SSEStream]:
+        for streams in self._wheel:
+            yield from streams
+
+    def stats(self) -> dict[str, StreamStats]:
+        """按类型统计流数量和存活时长"""
+        now = asyncio.get_running_loop().time()
+        ages: dict[str, list[float]] = {}
+        for stream in self:
+            ages.setdefault(stream.kind, []).append(now - stream.opened_at)
+        result = {}
+        for kind, kind_ages in ages.items():
+            kind_ages.sort()
+            result[kind] = StreamStats(
+                count=len(kind_ages),
+                oldest_age=kind_ages[-1],
+                median_age=kind_ages[len(kind_ages) // 2],
+            )
+        return result
+
+    async def _tick(self):
+        interval = SSE_HEARTBEAT_SECONDS / WHEEL_SLOTS
+        slot = 0
+        while True:
+            await asyncio.sleep(interval)
+            for stream in list(self._wheel[slot]):
+                if stream.missed >= MAX_MISSED_HEARTBEATS:
+                    sampled_logger.info("Closing stalled %s stream", stream.kind)
+                    self._wheel[slot].discard(stream)
+                    # 生成器挂起在 yield 处，可能要等垃圾回收才会执行 finally，
+                    # 因此先释放订阅队列，再取消发送任务
+                    stream.close()
+                    if stream.task is not None:
+                        stream.task.cancel()
+                elif stream.missed > 0:
+                    # 上一个心跳仍未发出
+                    stream.missed += 1
+                elif stream.active:
+                    stream.active = False
+                else:
+                    stream.missed = 1
+                    stream.queue.put_nowait(HEARTBEAT)
+            slot = (slot + 1) % WHEEL_SLOTS
+
+    def __del__(self):
+        self._tick_task.cancel()
+
+
+def encode_frame(event: Any) -> bytes:
+    """将 `@camel_encoded` 的事件对象编码为 SSE 帧"""
+    return b"data: " + encode(event) + b"\n\n"
 
 
 async def sse_event_generator(
     generator: AsyncGenerator[Any, None],
-) -> AsyncGenerator[str, None]:
+) -> AsyncGenerator[bytes, None]:
+    """将事件对象编码为 SSE 帧，心跳标记编码为注释
+
+    bytes 视为已编码好的帧，原样发出，用于多个流共享同一个编码结果"""
     async for event in generator:
-        camel_event = convert_keys_to_camel_case(event)
-        json_str = json.dumps(camel_event, ensure_ascii=False, separators=(",", ":"))
-        yield f"data: {json_str}\n\n"
+        if event is HEARTBEAT:
+            yield HEARTBEAT_FRAME
+        elif isinstance(event, bytes):
+            yield event
+        else:
+            yield encode_frame(event)
+
+
+class EncodedResponse(Response):
+    """使用预编译编码器序列化 dataclass 的 JSON 响应"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return encode(content)
+
+
+# 全局单例
+stream_registry = StreamRegistry()